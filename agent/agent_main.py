@@ -1,11 +1,30 @@
 import os
+import json
 import logging
 import re
+import ast
+import hashlib
+from collections import OrderedDict
+import time
 import asyncio
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
 from models.open_ai import model
+from agent.concurrency import llm_limiter, get_model_name
+from agent.singleflight import SingleFlight
+from agent.tool_cache import ToolResultCache, MCP_CACHE_ENABLED
+from agent.tool_selector import ToolSelector
+from agent.tool_call_scanner import ToolCallScanner
+from agent.field_projection import FieldProjector, PROJECTED_TOOLS
+from agent.intent_router import (
+    IntentRouter, AGENT_INTENT_ROUTER_ENABLED, INTENT_MAX_RESULTS,
+    format_products, format_stock, format_price, format_partner_field, format_orders,
+)
+from tools.product_index import ProductIndex, PRODUCT_INDEX_FIELDS
+from tools.odoo_sync import OdooSyncEngine, MCPSyncSource
+from tools.mcp_session_pool import MCPSessionPool, MCP_POOL_SIZE
+from tools.result_encoder import encode_result
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +35,9 @@ mcp_tools_info = []
 # Configuración de Odoo MCP
 ODOO_MCP_ENABLED = os.getenv("ODOO_MCP_ENABLED", "false").lower() == "true"
 ODOO_MCP_SERVER_PATH = os.getenv("ODOO_MCP_SERVER_PATH", "")
+# Cliente para servidores HTTP: "simple" (peticiones JSON-RPC sueltas), "sse" o
+# "streamable-http" (stream persistente del SDK de MCP, con notificaciones del servidor)
+MCP_HTTP_TRANSPORT = os.getenv("MCP_HTTP_TRANSPORT", "simple").lower()
 
 if ODOO_MCP_ENABLED and ODOO_MCP_SERVER_PATH:
     try:
@@ -24,71 +46,99 @@ if ODOO_MCP_ENABLED and ODOO_MCP_SERVER_PATH:
         
         # Crear cliente HTTP simple para MCP
         class SimpleMCPClient:
+            # Respuestas del servidor cuando la sesión expiró o no la reconoce
+            SESSION_ERROR_STATUSES = (400, 404)
+            
             def __init__(self, server_url):
                 self.server_url = server_url.rstrip('/')
                 self.http_client = None
                 self.session_id = None
+                self.initialized = False
                 self._request_id = 0
+                self._connect_lock = asyncio.Lock()
+                self._health_task = None
                 self.tools = []
+                # Callback con la lista de herramientas tras cada inicialización
+                self.on_tools = None
             
             def _get_next_id(self):
                 self._request_id += 1
                 return self._request_id
             
-            async def connect(self):
-                """Conecta al servidor MCP"""
-                if self.http_client:
-                    return
+            async def _post(self, method, params=None):
+                """Envía una petición JSON-RPC con la sesión actual"""
+                return await self.http_client.post(
+                    self.server_url,
+                    json={"jsonrpc": "2.0", "id": self._get_next_id(), "method": method, "params": params or {}},
+                    headers={"mcp-session-id": self.session_id} if self.session_id else {}
+                )
+            
+            async def _initialize(self):
+                """Handshake initialize + tools/list (se llama con el lock tomado)"""
+                if not self.http_client:
+                    self.http_client = httpx.AsyncClient(timeout=30.0)
                 
-                self.http_client = httpx.AsyncClient(timeout=30.0)
+                self.initialized = False
+                self.session_id = None
                 
                 # Inicializar sesión
-                response = await self.http_client.post(
-                    self.server_url,
-                    json={
-                        "jsonrpc": "2.0",
-                        "id": self._get_next_id(),
-                        "method": "initialize",
-                        "params": {
-                            "protocolVersion": "2024-11-05",
-                            "capabilities": {},
-                            "clientInfo": {"name": "telegram-bot", "version": "1.0"}
-                        }
-                    }
-                )
+                response = await self._post("initialize", {
+                    "protocolVersion": "2024-11-05",
+                    "capabilities": {},
+                    "clientInfo": {"name": "telegram-bot", "version": "1.0"}
+                })
                 
-                if response.status_code == 200:
-                    self.session_id = response.headers.get('mcp-session-id')
-                    logger.info("Cliente MCP conectado exitosamente")
-                    
-                    # Obtener herramientas disponibles
-                    tools_resp = await self.http_client.post(
-                        self.server_url,
-                        json={"jsonrpc": "2.0", "id": self._get_next_id(), "method": "tools/list", "params": {}},
-                        headers={"mcp-session-id": self.session_id} if self.session_id else {}
-                    )
-                    
-                    if tools_resp.status_code == 200:
-                        result = tools_resp.json()
-                        if "result" in result and "tools" in result["result"]:
-                            self.tools = result["result"]["tools"]
-                            logger.info(f"Herramientas MCP disponibles: {len(self.tools)}")
+                if response.status_code != 200:
+                    raise Exception(f"Error inicializando sesión MCP: {response.status_code}")
+                
+                self.session_id = response.headers.get('mcp-session-id')
+                self.initialized = True
+                logger.info("Cliente MCP conectado exitosamente")
+                
+                # Obtener herramientas disponibles
+                tools_resp = await self._post("tools/list")
+                if tools_resp.status_code == 200:
+                    result = tools_resp.json()
+                    if "result" in result and "tools" in result["result"]:
+                        self.tools = result["result"]["tools"]
+                        logger.info(f"Herramientas MCP disponibles: {len(self.tools)}")
+                
+                if self.on_tools:
+                    self.on_tools(self.tools)
+            
+            async def connect(self):
+                """Conecta al servidor MCP (una sola vez aunque haya llamadas simultáneas)"""
+                if self.initialized:
+                    return
+                async with self._connect_lock:
+                    if not self.initialized:
+                        await self._initialize()
+            
+            async def reconnect(self, stale_session_id=None):
+                """
+                Restablece la sesión. Si otra corrutina ya la renovó (el id cambió),
+                no se repite el handshake.
+                """
+                async with self._connect_lock:
+                    if self.initialized and self.session_id != stale_session_id:
+                        return
+                    logger.warning("Sesión MCP rechazada o caída; reinicializando")
+                    await self._initialize()
+            
+            async def _request(self, method, params=None):
+                """Petición con reinicialización transparente y un único reintento si la sesión expiró"""
+                await self.connect()
+                
+                session_id = self.session_id
+                response = await self._post(method, params)
+                if response.status_code in self.SESSION_ERROR_STATUSES and session_id:
+                    await self.reconnect(session_id)
+                    response = await self._post(method, params)
+                return response
             
             async def call_tool(self, tool_name, arguments):
                 """Llama a una herramienta MCP"""
-                if not self.http_client:
-                    await self.connect()
-                
-                response = await self.http_client.post(
-                    self.server_url,
-                    json={
-                        "jsonrpc": "2.0",
-                        "id": self._get_next_id(),
-                        "method": "tools/call",
-                        "params": {"name": tool_name, "arguments": arguments}
-                    },
-                    headers={"mcp-session-id": self.session_id} if self.session_id else {}
-                )
+                response = await self._request("tools/call", {"name": tool_name, "arguments": arguments})
                 
                 if response.status_code == 200:
                     result = response.json()
@@ -97,19 +147,64 @@ if ODOO_MCP_ENABLED and ODOO_MCP_SERVER_PATH:
                 
                 raise Exception(f"Error llamando herramienta: {response.status_code}")
             
+            async def ping(self) -> bool:
+                """Comprobación ligera de la sesión (método ping de MCP)"""
+                response = await self._request("ping")
+                return response.status_code == 200
+            
+            async def _health_loop(self, interval):
+                while True:
+                    await asyncio.sleep(interval)
+                    try:
+                        if not await self.ping():
+                            await self.reconnect(self.session_id)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        # El siguiente ciclo (o la siguiente llamada) volverá a intentarlo
+                        self.initialized = False
+                        logger.warning(f"Health check MCP fallido: {e}")
+            
+            def start_health_checks(self, interval):
+                """Lanza los pings periódicos en segundo plano"""
+                if interval > 0 and (self._health_task is None or self._health_task.done()):
+                    self._health_task = asyncio.create_task(self._health_loop(interval), name="mcp-health")
+            
             async def disconnect(self):
                 """Desconecta del servidor"""
+                if self._health_task:
+                    self._health_task.cancel()
+                    self._health_task = None
                 if self.http_client:
                     await self.http_client.aclose()
                     self.http_client = None
+                self.initialized = False
+                self.session_id = None
         
-        mcp_client = SimpleMCPClient(ODOO_MCP_SERVER_PATH)
-        mcp_tools_info = []
+        if ODOO_MCP_SERVER_PATH.startswith(("http://", "https://")) and MCP_HTTP_TRANSPORT == "simple":
+            def create_mcp_session():
+                return SimpleMCPClient(ODOO_MCP_SERVER_PATH)
+        elif ODOO_MCP_SERVER_PATH.startswith(("http://", "https://")):
+            # Stream SSE / streamable HTTP persistente con el SDK de MCP
+            from tools.mcp_odoo_client import OdooMCPClient, ClientSession
+            if ClientSession is None:
+                raise ImportError("MCP SDK no está instalado. Instala con: pip install mcp")
+            
+            def create_mcp_session():
+                return OdooMCPClient(ODOO_MCP_SERVER_PATH, http_transport=MCP_HTTP_TRANSPORT)
+        else:
+            # Servidor stdio: cada sesión del pool es un proceso python3 <servidor>
+            from tools.mcp_odoo_client import OdooMCPClient, ClientSession
+            if ClientSession is None:
+                raise ImportError("MCP SDK no está instalado. Instala con: pip install mcp")
+            
+            def create_mcp_session():
+                return OdooMCPClient(ODOO_MCP_SERVER_PATH)
         
-        # Flag para indicar que el cliente debe conectarse en el primer uso
-        mcp_client._needs_init = True
+        mcp_client = MCPSessionPool(create_mcp_session, MCP_POOL_SIZE)
+        mcp_tools_info = []
         
-        logger.info(f"Cliente MCP configurado para: {ODOO_MCP_SERVER_PATH}")
+        logger.info(f"Cliente MCP configurado para: {ODOO_MCP_SERVER_PATH} ({MCP_POOL_SIZE} sesiones)")
         
     except Exception as e:
         logger.error(f"Error inicializando cliente MCP: {e}")
@@ -117,142 +212,438 @@ if ODOO_MCP_ENABLED and ODOO_MCP_SERVER_PATH:
         mcp_client = None
 
 
-async def execute_mcp_tool(tool_name: str, arguments: dict) -> str:
-    """Ejecuta una herramienta del servidor MCP"""
-    global mcp_tools_info
+# Herramientas MCP de solo lectura: sus llamadas idénticas en curso se comparten
+READ_ONLY_MCP_TOOLS = {
+    "list_models", "search_records", "get_record", "search_count",
+    "get_model_fields", "model_info", "server_status", "cache_stats",
+}
+
+mcp_singleflight = SingleFlight()
+
+
+def tool_call_key(tool_name: str, arguments: dict) -> tuple:
+    """Clave canónica de una llamada (mismos argumentos en distinto orden = misma clave)"""
+    return (
+        tool_name,
+        json.dumps(arguments, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    )
+
+
+# Herramientas MCP que escriben: invalidan la caché del modelo afectado
+WRITE_MCP_TOOLS = {"create_record", "update_record", "delete_record", "execute_method"}
+# Métodos de execute_method que solo leen: se tratan como lecturas (caché, llamadas compartidas)
+READ_ONLY_EXECUTE_METHODS = {"read_group", "search_read", "search_count", "read"}
+
+mcp_cache = ToolResultCache()
+
+
+def _tool_result_text(result) -> str:
+    """Extrae el texto de la respuesta MCP (JSON de la API HTTP o CallToolResult del SDK)"""
+    if isinstance(result, dict) and "content" in result:
+        content_list = result["content"]
+        if content_list and len(content_list) > 0:
+            return content_list[0].get("text", str(result))
+    
+    content_list = getattr(result, "content", None)
+    if content_list:
+        text = getattr(content_list[0], "text", None)
+        if text is not None:
+            return text
     
+    return str(result)
+
+
+def _tool_result_is_error(result) -> bool:
+    """Indica si la herramienta devolvió un error (isError)"""
+    if isinstance(result, dict):
+        return bool(result.get("isError"))
+    return bool(getattr(result, "is_error", getattr(result, "isError", False)))
+
+
+def _is_read_only_call(tool_name: str, arguments) -> bool:
+    """Lectura: herramienta de solo lectura o execute_method con un método de lectura"""
+    if tool_name == "execute_method":
+        return isinstance(arguments, dict) and arguments.get("method") in READ_ONLY_EXECUTE_METHODS
+    return tool_name in READ_ONLY_MCP_TOOLS
+
+
+def _tool_model(arguments) -> str:
+    """Modelo de Odoo al que se refiere una llamada (para la caché)"""
+    return arguments.get("model") if isinstance(arguments, dict) else None
+
+
+async def _call_read_only_tool(tool_name: str, arguments: dict, key: tuple) -> str:
+    """Llama a una herramienta de solo lectura y guarda el resultado en caché"""
+    model_name = _tool_model(arguments)
+    generation = mcp_cache.generation(model_name)
+    
+    result = await mcp_client.call_tool(tool_name, arguments)
+    text = _tool_result_text(result)
+    
+    # Los errores devueltos por la herramienta no se cachean
+    if MCP_CACHE_ENABLED and not _tool_result_is_error(result):
+        mcp_cache.set(key, tool_name, model_name, text, generation)
+    return text
+
+
+def _tool_accepts(tool_name: str, argument: str) -> bool:
+    """Indica si el esquema de la herramienta admite un argumento (sin catálogo, se asume que sí)"""
+    for tool_info in mcp_tools_info:
+        if tool_info.get("name") == tool_name:
+            properties = (tool_info.get("inputSchema") or {}).get("properties")
+            return properties is None or argument in properties
+    return not mcp_tools_info
+
+
+async def _fetch_model_fields(model_name: str) -> str:
+    """Metadatos de los campos de un modelo (para la proyección por defecto)"""
+    result = await execute_mcp_tool("get_model_fields", {"model": model_name})
+    if result.startswith("Error"):
+        raise RuntimeError(result)
+    return result
+
+
+field_projector = FieldProjector(_fetch_model_fields)
+
+
+async def execute_mcp_tool(tool_name: str, arguments: dict, use_cache: bool = True) -> str:
+    """
+    Ejecuta una herramienta del servidor MCP
+    
+    Args:
+        tool_name: Nombre de la herramienta
+        arguments: Argumentos de la llamada
+        use_cache: Si False, la lectura va siempre a Odoo (sin caché ni llamadas compartidas)
+    """
     if not mcp_client:
         return "Error: Cliente MCP no disponible"
     
     try:
-        # Inicializar el cliente si es necesario
-        if hasattr(mcp_client, '_needs_init') and mcp_client._needs_init:
-            logger.info("Inicializando conexión MCP...")
-            await mcp_client.connect()
-            mcp_tools_info = mcp_client.tools
-            mcp_client._needs_init = False
-            logger.info(f"Cliente MCP inicializado con {len(mcp_tools_info)} herramientas")
-        
-        result = await mcp_client.call_tool(tool_name, arguments)
+        # Sin `fields`, Odoo devuelve todas las columnas (html, binarios, one2many...)
+        if (tool_name in PROJECTED_TOOLS and _tool_accepts(tool_name, "fields")
+                and _tool_accepts("get_model_fields", "model")):
+            arguments = await field_projector.apply(tool_name, arguments)
         
-        # Extraer contenido de la respuesta MCP
-        if isinstance(result, dict) and "content" in result:
-            content_list = result["content"]
-            if content_list and len(content_list) > 0:
-                return content_list[0].get("text", str(result))
+        read_only = _is_read_only_call(tool_name, arguments)
+        if read_only and use_cache:
+            key = tool_call_key(tool_name, arguments)
+            
+            if MCP_CACHE_ENABLED and mcp_cache.is_cacheable(tool_name):
+                cached = mcp_cache.get(key)
+                if cached is not None:
+                    return cached
+            
+            # Las llamadas idénticas que ya están en curso comparten el resultado
+            return await mcp_singleflight.do(
+                key, lambda: _call_read_only_tool(tool_name, arguments, key)
+            )
         
-        return str(result)
+        try:
+            result = await mcp_client.call_tool(tool_name, arguments)
+        finally:
+            if tool_name in WRITE_MCP_TOOLS and not read_only:
+                mcp_cache.invalidate_model(_tool_model(arguments))
+        return _tool_result_text(result)
         
     except Exception as e:
         logger.error(f"Error ejecutando herramienta MCP {tool_name}: {e}")
         return f"Error: {str(e)}"
 
 
-async def detect_and_execute_tools(user_input: str) -> str:
-    """Detecta casos simples y ejecuta búsqueda directa usando MCP"""
-    if not mcp_client:
-        return None
+def get_mcp_stats() -> dict:
+    """Contadores de la caché y de la coalescencia de llamadas MCP"""
+    return {
+        "cache": mcp_cache.stats(),
+        "singleflight": mcp_singleflight.stats(),
+        "pool": mcp_client.stats() if mcp_client else {},
+        "projection": field_projector.stats(),
+        "router": intent_router.stats(),
+    }
+
+
+# Índice local de productos para las búsquedas cortas
+PRODUCT_INDEX_ENABLED = os.getenv("PRODUCT_INDEX_ENABLED", "true").lower() == "true"
+PRODUCT_INDEX_MAX_PRODUCTS = int(os.getenv("PRODUCT_INDEX_MAX_PRODUCTS", "100000"))
+PRODUCT_INDEX_RETRY_SECONDS = 60
+
+product_index = ProductIndex()
+product_sync = None
+template_sync = None
+quant_sync = None
+_product_sync_failed_at = 0.0
+# Producto de cada quant conocido (para refrescar qty_available cuando cambia o se borra)
+_quant_products = {}
+
+
+def parse_tool_records(text):
+    """Convierte la respuesta de search_records (JSON o repr de Python) en una lista de registros"""
+    if isinstance(text, list):
+        return text
+    try:
+        data = json.loads(text)
+    except (TypeError, ValueError):
+        try:
+            data = ast.literal_eval(text)
+        except (ValueError, SyntaxError):
+            return None
     
-    user_input_lower = user_input.lower()
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        for key in ("records", "result", "data"):
+            if isinstance(data.get(key), list):
+                return data[key]
+    return None
+
+
+def _index_products(records):
+    """Callback de sincronización: inserta o actualiza productos en el índice"""
+    for record in records:
+        product_index.upsert(record)
+
+
+def _unindex_products(product_ids):
+    """Callback de sincronización: retira productos eliminados o archivados"""
+    for product_id in product_ids:
+        product_index.remove(product_id)
+
+
+async def _refresh_indexed_products(domain, limit):
+    """Vuelve a leer las variantes del dominio y actualiza las que ya están en el índice"""
+    records = await product_sync.source.search_read(
+        "product.product", domain, PRODUCT_INDEX_FIELDS, limit, "id asc"
+    )
+    for record in records:
+        if record["id"] in product_index:
+            product_index.upsert(record)
+
+
+async def _refresh_product_quantities(product_ids):
+    """Vuelve a leer los productos afectados por cambios de stock"""
+    product_ids = [pid for pid in set(product_ids) if pid in product_index]
+    if not product_ids:
+        return
+    await _refresh_indexed_products([["id", "in", product_ids]], len(product_ids))
+
+
+async def _on_templates_changed(records):
+    """
+    name, list_price, categ_id (y default_code con una sola variante) se guardan en
+    product.template: editarlos no cambia el write_date de la variante
+    """
+    if not template_sync.initialized:
+        return
+    template_ids = sorted({record["id"] if isinstance(record, dict) else record for record in records})
+    if template_ids:
+        await _refresh_indexed_products([["product_tmpl_id", "in", template_ids]], PRODUCT_INDEX_MAX_PRODUCTS)
+
+
+async def _on_quants_changed(records):
+    product_ids = []
+    for record in records:
+        product = record.get("product_id")
+        if product:
+            product_id = product[0] if isinstance(product, (list, tuple)) else product
+            _quant_products[record["id"]] = product_id
+            product_ids.append(product_id)
+    if quant_sync.initialized:
+        await _refresh_product_quantities(product_ids)
+
+
+async def _on_quants_deleted(quant_ids):
+    product_ids = [_quant_products.pop(qid) for qid in quant_ids if qid in _quant_products]
+    await _refresh_product_quantities(product_ids)
+
+
+def _disable_product_index():
+    """Un índice demasiado grande no compensa; seguir consultando a Odoo"""
+    logger.warning(f"Catálogo mayor que PRODUCT_INDEX_MAX_PRODUCTS ({PRODUCT_INDEX_MAX_PRODUCTS}); índice desactivado")
+    product_index.load([])
+    product_index.loaded = False
+
+
+def _on_product_sync_stopped(task):
+    """El bucle de productos termina si la reconciliación detecta que el catálogo creció demasiado"""
+    if not task.cancelled() and product_sync is not None and product_sync.over_limit:
+        _disable_product_index()
+        asyncio.create_task(template_sync.stop())
+        asyncio.create_task(quant_sync.stop())
+
+
+async def _run_product_sync():
+    """Carga inicial del índice y sincronización incremental de productos y stock"""
+    # Cursor de plantillas antes de leer las variantes: un cambio durante la carga
+    # inicial de productos llega en el primer delta de plantillas
+    await template_sync.sync_once()
+    # La carga inicial se interrumpe en cuanto supera PRODUCT_INDEX_MAX_PRODUCTS
+    if not template_sync.over_limit:
+        await product_sync.sync_once()
     
-    # Palabras a excluir
-    exclude_keywords = [
-        'hola', 'hello', 'hi', 'hey', 'buenas', 'buenos', 'saludos',
-        'qué', 'que', 'cómo', 'como', 'ayuda', 'help', 'gracias', 'ok'
-    ]
+    if template_sync.over_limit or product_sync.over_limit:
+        _disable_product_index()
+        return
     
-    # Detectar código de producto
-    code_patterns = [
-        r'^\s*([A-Z]+[_-]\d+)\s*$',
-        r'^\s*([A-Z]+\d+[_-]\d+)\s*$',
-    ]
+    product_index.loaded = True
+    logger.info(f"Índice de productos listo: {len(product_index)} productos")
+    
+    product_sync.start().add_done_callback(_on_product_sync_stopped)
+    # Nombre, precio y categoría viven en product.template
+    template_sync.start()
+    # qty_available es calculado: los cambios de stock se detectan en stock.quant
+    quant_sync.start()
+
+
+async def _execute_mcp_tool_uncached(tool_name: str, arguments: dict) -> str:
+    """Lecturas de la sincronización: un resultado cacheado podría traer stock de hace hasta un TTL"""
+    return await execute_mcp_tool(tool_name, arguments, use_cache=False)
+
+
+def _ensure_product_index():
+    """Lanza la sincronización del índice en segundo plano si aún no está en marcha"""
+    global product_sync, template_sync, quant_sync
     
-    for pattern in code_patterns:
-        match = re.match(pattern, user_input.upper())
-        if match:
-            code = match.group(1)
-            logger.info(f"Búsqueda MCP automática por código: '{code}'")
-            result = await execute_mcp_tool("search_records", {
-                "model": "product.product",
-                "domain": [["default_code", "=", code]],
-                "fields": ["name", "default_code", "list_price", "standard_price", "qty_available", "categ_id"],
-                "limit": 10
-            })
-            return result
-    
-    # Detectar frases cortas
-    is_excluded = any(excl in user_input_lower for excl in exclude_keywords)
-    is_question = '?' in user_input
-    word_count = len(user_input.split())
-    
-    if word_count <= 3 and not is_excluded and not is_question and not user_input.startswith('/'):
-        query = user_input.strip()
-        logger.info(f"Búsqueda MCP automática: '{query}'")
-        result = await execute_mcp_tool("search_records", {
-            "model": "product.product",
-            "domain": [["name", "ilike", query]],
-            "fields": ["name", "default_code", "list_price", "standard_price", "qty_available", "categ_id"],
-            "limit": 10
-        })
-        return result
+    if product_sync is not None:
+        return
+    if time.monotonic() - _product_sync_failed_at < PRODUCT_INDEX_RETRY_SECONDS:
+        return
     
-    return None
+    source = MCPSyncSource(_execute_mcp_tool_uncached, parse_tool_records)
+    product_sync = OdooSyncEngine(
+        source, "product.product", PRODUCT_INDEX_FIELDS,
+        on_upsert=_index_products, on_delete=_unindex_products,
+        max_records=PRODUCT_INDEX_MAX_PRODUCTS
+    )
+    # Los archivados se notifican como eliminados: sus variantes ya cambian su propio write_date
+    template_sync = OdooSyncEngine(
+        source, "product.template", [],
+        on_upsert=_on_templates_changed, on_delete=_on_templates_changed,
+        max_records=PRODUCT_INDEX_MAX_PRODUCTS
+    )
+    quant_sync = OdooSyncEngine(
+        source, "stock.quant", ["product_id"],
+        on_upsert=_on_quants_changed, on_delete=_on_quants_deleted,
+        has_active=False
+    )
+    
+    task = asyncio.create_task(_run_product_sync())
+    
+    def _on_done(t):
+        global product_sync, _product_sync_failed_at
+        if not t.cancelled() and t.exception():
+            # Reintentar más adelante
+            logger.error(f"Error en la carga inicial del índice de productos: {t.exception()}")
+            product_sync = None
+            _product_sync_failed_at = time.monotonic()
+    
+    task.add_done_callback(_on_done)
+
+
+async def _find_products(query: str, exact_code: bool = False):
+    """
+    Productos para una consulta directa: primero el índice local y, si no está listo
+    o no encuentra nada, Odoo. None si la consulta a Odoo falla.
+    """
+    limit = INTENT_MAX_RESULTS + 1
+    if PRODUCT_INDEX_ENABLED:
+        if product_index.loaded:
+            records = product_index.search(query, limit=limit)
+            if records:
+                logger.info(f"Búsqueda resuelta en índice local: '{query}'")
+                return records
+        else:
+            _ensure_product_index()
+    
+    if exact_code:
+        domain = [["default_code", "=", query]]
+    else:
+        domain = ["|", "|", ["default_code", "=ilike", query], ["barcode", "=", query], ["name", "ilike", query]]
+    
+    logger.info(f"Búsqueda MCP automática: '{query}'")
+    result = await execute_mcp_tool("search_records", {
+        "model": "product.product",
+        "domain": domain,
+        "fields": PRODUCT_INDEX_FIELDS,
+        "limit": limit
+    })
+    return parse_tool_records(result)
+
+
+async def _search_partners(query: str):
+    result = await execute_mcp_tool("search_records", {
+        "model": "res.partner",
+        "domain": [["name", "ilike", query]],
+        "fields": ["name", "phone", "email"],
+        "limit": INTENT_MAX_RESULTS + 1
+    })
+    return parse_tool_records(result)
+
+
+async def _route_product_code(query: str):
+    products = await _find_products(query, exact_code=True)
+    return format_products(query, products) if products else None
+
+
+async def _route_product_search(query: str):
+    products = await _find_products(query)
+    return format_products(query, products) if products else None
+
+
+async def _route_stock(query: str):
+    products = await _find_products(query)
+    return format_stock(query, products) if products else None
+
+
+async def _route_price(query: str):
+    products = await _find_products(query)
+    return format_price(query, products) if products else None
+
+
+async def _route_partner_phone(query: str):
+    partners = await _search_partners(query)
+    return format_partner_field(query, partners, "phone") if partners else None
+
+
+async def _route_partner_email(query: str):
+    partners = await _search_partners(query)
+    return format_partner_field(query, partners, "email") if partners else None
+
+
+async def _route_partner_orders(query: str):
+    result = await execute_mcp_tool("search_records", {
+        "model": "sale.order",
+        "domain": [["partner_id", "ilike", query]],
+        "fields": ["name", "partner_id", "date_order", "amount_total", "state"],
+        "limit": INTENT_MAX_RESULTS + 1
+    })
+    orders = parse_tool_records(result)
+    return format_orders(query, orders) if orders else None
+
+
+# Intenciones que se responden con una llamada directa a Odoo y una plantilla
+intent_router = IntentRouter()
+intent_router.register("product_code", _route_product_code)
+intent_router.register("stock", _route_stock)
+intent_router.register("price", _route_price)
+intent_router.register("partner_phone", _route_partner_phone)
+intent_router.register("partner_email", _route_partner_email)
+intent_router.register("partner_orders", _route_partner_orders)
+intent_router.register("product_search", _route_product_search)
+
+
+async def detect_and_execute_tools(user_input: str) -> str:
+    """Responde sin LLM las consultas simples (stock, precio, contacto, pedidos, códigos, frases cortas)"""
+    if not mcp_client or not AGENT_INTENT_ROUTER_ENABLED:
+        return None
+    
+    return await intent_router.dispatch(user_input)
 
 
 # Crear el agente conversacional
 if mcp_client:
     # Con herramientas MCP de Odoo
-    # Nota: La lista de herramientas se cargará en el primer uso
-    tools_description = """
-- list_models: Lista todos los modelos disponibles en Odoo
-- search_records: Busca registros en un modelo con filtros
-- get_record: Obtiene un registro específico por ID
-- create_record: Crea un nuevo registro
-- update_record: Actualiza un registro existente
-- delete_record: Elimina un registro
-- execute_method: Ejecuta un método de un modelo
-- search_count: Cuenta registros que cumplen condiciones
-- get_model_fields: Obtiene campos de un modelo
-- model_info: Información sobre un modelo
-- server_status: Estado del servidor Odoo
-- cache_stats: Estadísticas de caché
-"""
-    
-    system_prompt = f"""Eres un asistente inteligente con acceso al sistema ERP Odoo a través de MCP.
-
-**HERRAMIENTAS DISPONIBLES:**
-{tools_description}
-
-**CÓMO USAR LAS HERRAMIENTAS:**
-Usa la función call_mcp_tool con estos parámetros:
-- tool_name: nombre de la herramienta MCP a llamar
-- parameters: diccionario con los parámetros necesarios
-
-**EJEMPLOS DE USO:**
-
-1. Listar todos los modelos disponibles:
-   call_mcp_tool(tool_name="list_models", parameters={{}})
-
-2. Buscar productos por nombre:
-   call_mcp_tool(tool_name="search_records", parameters={{
-       "model": "product.product",
-       "domain": [["name", "ilike", "lamp"]],
-       "fields": ["name", "default_code", "list_price", "qty_available"],
-       "limit": 10
-   }})
-
-3. Obtener información de un producto específico:
-   call_mcp_tool(tool_name="get_record", parameters={{
-       "model": "product.product",
-       "record_id": 123,
-       "fields": ["name", "list_price", "qty_available"]
-   }})
-
-**CUÁNDO USAR CADA HERRAMIENTA:**
-- list_models: Cuando pregunten qué modelos/tablas hay disponibles
-- search_records: Para buscar registros (productos, clientes, etc.)
-- get_record: Para obtener detalles de un registro específico por ID
-- model_info: Para ver qué campos tiene un modelo
+    # Nota: La lista de herramientas se carga al arrancar el bot (warm_up_agent) y las
+    # secciones que nombran herramientas se renderizan con el subconjunto de cada mensaje
+    system_prompt = """Eres un asistente inteligente con acceso al sistema ERP Odoo a través de MCP.
 
 **IMPORTANTE:**
 - SIEMPRE usa las herramientas para consultar datos reales de Odoo
@@ -262,12 +653,379 @@ Usa la función call_mcp_tool con estos parámetros:
 
 Responde de forma natural y profesional."""
 
-    logger.info("Agente inicializado con cliente MCP (herramientas se cargarán en primer uso)")
+    logger.info("Agente inicializado con cliente MCP (herramientas se cargarán al arrancar)")
 else:
     system_prompt = "Eres un asistente inteligente y útil. Responde de manera clara, amigable y profesional."
     logger.info("Agente inicializado sin herramientas")
 
 
+def _dispatch_tool_request(tool_request: dict) -> asyncio.Task:
+    """Lanza en segundo plano la herramienta pedida por el LLM en formato JSON"""
+    tool_name = tool_request.get("tool_name")
+    parameters = tool_request.get("parameters") or {}
+    logger.info(f"LLM solicitó herramienta: {tool_name} con params: {parameters}")
+    return asyncio.create_task(execute_mcp_tool(tool_name, parameters))
+
+
+def _cancel_pending(tasks: list):
+    """Cancela las herramientas lanzadas que no llegaron a esperarse (error o cancelación)"""
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+
+
+def _tool_results_prompt(tool_requests: list, results: list) -> str:
+    """Mensaje con los resultados de las herramientas para la segunda invocación del LLM"""
+    # Listas de registros en tabla compacta y cada resultado acotado a TOOL_RESULT_MAX_TOKENS
+    if len(results) == 1:
+        return f"Resultado de la herramienta:\n{encode_result(results[0])}"
+    return "Resultados de las herramientas:\n\n" + "\n\n".join(
+        f"{tool_request.get('tool_name')}:\n{encode_result(result)}"
+        for tool_request, result in zip(tool_requests, results)
+    )
+
+
+async def invoke_model(messages, llm=None):
+    """
+    Invoca el LLM de forma asíncrona respetando los límites de concurrencia
+    
+    Args:
+        messages: Mensajes de la conversación
+        llm: Modelo a usar (por ejemplo, con herramientas enlazadas); por defecto el modelo base
+    """
+    async with llm_limiter.limit(get_model_name(model)):
+        return await (llm or model).ainvoke(messages)
+
+
+def _chunk_text(chunk) -> str:
+    """Extrae el texto de un mensaje o fragmento de streaming (str o lista de partes)"""
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            part if isinstance(part, str) else part.get("text", "")
+            for part in content
+            if isinstance(part, (str, dict))
+        )
+    return ""
+
+
+async def stream_model_chunks(messages, llm=None):
+    """Invoca el LLM en streaming respetando los límites de concurrencia (fragmentos completos)"""
+    async with llm_limiter.limit(get_model_name(model)):
+        async for chunk in (llm or model).astream(messages):
+            yield chunk
+
+
+async def stream_model(messages):
+    """Invoca el LLM en streaming respetando los límites de concurrencia (solo texto)"""
+    async for chunk in stream_model_chunks(messages):
+        text = _chunk_text(chunk)
+        if text:
+            yield text
+
+
+# Prompt del agente con el catálogo de herramientas: se renderiza al obtener tools/list
+# y solo se vuelve a renderizar si la lista cambia. Al ser idéntico byte a byte entre
+# peticiones, el proveedor puede reutilizar su caché de prompt.
+_agent_prompt = None
+_agent_prompt_fingerprint = None
+
+# Número de herramientas relevantes que se envían al LLM por mensaje (0 = todas)
+AGENT_TOOL_TOP_K = int(os.getenv("AGENT_TOOL_TOP_K", "5"))
+# Herramientas que se envían siempre, sea cual sea el mensaje
+AGENT_CORE_TOOLS = ["search_records"]
+_AGENT_SUBSET_PROMPTS_MAX = 128
+
+_tool_selector = None
+# Prompts renderizados por subconjunto de herramientas (LRU)
+_subset_prompts = OrderedDict()
+
+
+# Cuándo usar cada herramienta (solo se incluyen las del subconjunto ofrecido)
+TOOL_USAGE_HINTS = {
+    "list_models": "Cuando pregunten qué modelos/tablas hay disponibles",
+    "search_records": "Para buscar registros (productos, clientes, etc.)",
+    "get_record": "Para obtener detalles de un registro específico por ID",
+    "model_info": "Para ver qué campos tiene un modelo",
+    "execute_method": """Con method="read_group": para totales agrupados (stock por ubicación, ventas por
+  cliente) sin descargar todos los registros, p. ej. model="stock.quant",
+  args=[[["location_id.usage", "=", "internal"]], ["quantity:sum"], ["location_id"]], kwargs={"lazy": false}""",
+}
+
+# Ejemplos del protocolo JSON por herramienta
+TOOL_JSON_EXAMPLES = {
+    "list_models": ("Listar todos los modelos disponibles",
+                    """{"action": "use_tool", "tool_name": "list_models", "parameters": {}}"""),
+    "search_records": ("Buscar productos por nombre", """{"action": "use_tool", "tool_name": "search_records", "parameters": {
+       "model": "product.product",
+       "domain": [["name", "ilike", "lamp"]],
+       "fields": ["name", "default_code", "list_price", "qty_available"],
+       "limit": 10
+   }}"""),
+    "get_record": ("Obtener información de un producto específico", """{"action": "use_tool", "tool_name": "get_record", "parameters": {
+       "model": "product.product",
+       "record_id": 123,
+       "fields": ["name", "list_price", "qty_available"]
+   }}"""),
+}
+
+
+def render_tool_guidelines(tools: list, json_examples: bool = True) -> str:
+    """Secciones del prompt que nombran herramientas, solo para las que se ofrecen al LLM"""
+    names = [tool["name"] for tool in tools]
+    sections = []
+    
+    hints = [f"- {name}: {TOOL_USAGE_HINTS[name]}" for name in names if name in TOOL_USAGE_HINTS]
+    if hints:
+        sections.append("**CUÁNDO USAR CADA HERRAMIENTA:**\n" + "\n".join(hints))
+    
+    examples = [TOOL_JSON_EXAMPLES[name] for name in names if name in TOOL_JSON_EXAMPLES]
+    if json_examples and examples:
+        sections.append("**EJEMPLOS DE USO:**\n\n" + "\n\n".join(
+            f"{idx}. {title}:\n   {example}" for idx, (title, example) in enumerate(examples, 1)
+        ))
+    
+    return "\n\n".join(sections)
+
+
+def render_agent_prompt(tools: list) -> str:
+    """Renderiza el prompt del agente con el catálogo de herramientas MCP"""
+    catalogue = [
+        {
+            "name": tool_info["name"],
+            "description": tool_info.get("description", ""),
+            "parameters": tool_info.get("inputSchema", {})
+        }
+        for tool_info in tools
+    ]
+    tools_json = json.dumps(catalogue, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    
+    # Parte fija primero (prefijo idéntico entre subconjuntos, aprovechable por la caché
+    # de prompts del proveedor); las pautas y el catálogo del subconjunto, al final
+    guidelines = render_tool_guidelines(tools)
+    guidelines_section = f"{guidelines}\n\n" if guidelines else ""
+    
+    return f"""{system_prompt}
+
+Para usar una herramienta, responde EXACTAMENTE en este formato JSON:
+{{
+    "action": "use_tool",
+    "tool_name": "nombre_herramienta",
+    "parameters": {{"param1": "valor1"}}
+}}
+
+Si NO necesitas usar herramientas, responde normalmente en texto.
+
+{guidelines_section}Herramientas disponibles (JSON):
+{tools_json}"""
+
+
+def refresh_agent_prompt(tools: list) -> bool:
+    """Vuelve a renderizar el prompt si la lista de herramientas cambió. Devuelve True si cambió"""
+    global _agent_prompt, _agent_prompt_fingerprint, _tool_selector
+    
+    fingerprint = hashlib.sha256(
+        json.dumps(tools, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    if fingerprint == _agent_prompt_fingerprint and _agent_prompt is not None:
+        return False
+    
+    _agent_prompt = render_agent_prompt(tools)
+    _agent_prompt_fingerprint = fingerprint
+    _tool_selector = ToolSelector(tools, always_include=AGENT_CORE_TOOLS)
+    _subset_prompts.clear()
+    _bound_models.clear()
+    logger.info(f"Prompt del agente renderizado con {len(tools)} herramientas ({len(_agent_prompt)} caracteres)")
+    return True
+
+
+def select_agent_tools(user_input: str = None) -> list:
+    """Herramientas que se ofrecen al LLM para el mensaje (todas si AGENT_TOOL_TOP_K <= 0)"""
+    if _agent_prompt is None:
+        refresh_agent_prompt(mcp_tools_info)
+    
+    if not user_input or AGENT_TOOL_TOP_K <= 0:
+        return list(_tool_selector.tools)
+    return _tool_selector.select(user_input, AGENT_TOOL_TOP_K)
+
+
+def get_agent_prompt(user_input: str = None) -> str:
+    """
+    Prompt del agente ya renderizado.
+    
+    Con user_input y AGENT_TOOL_TOP_K > 0 solo incluye las herramientas más relevantes
+    para el mensaje; cada subconjunto se renderiza una vez y se reutiliza.
+    """
+    if _agent_prompt is None:
+        refresh_agent_prompt(mcp_tools_info)
+    
+    if not user_input or AGENT_TOOL_TOP_K <= 0 or len(_tool_selector.tools) <= AGENT_TOOL_TOP_K:
+        return _agent_prompt
+    
+    subset = select_agent_tools(user_input)
+    key = tuple(tool["name"] for tool in subset)
+    
+    prompt = _subset_prompts.get(key)
+    if prompt is None:
+        prompt = render_agent_prompt(subset)
+        _subset_prompts[key] = prompt
+        if len(_subset_prompts) > _AGENT_SUBSET_PROMPTS_MAX:
+            _subset_prompts.popitem(last=False)
+    else:
+        _subset_prompts.move_to_end(key)
+    return prompt
+
+
+def _build_tool_messages(user_input: str) -> list:
+    """Construye los mensajes de la primera invocación con el catálogo de herramientas MCP"""
+    return [
+        {"role": "system", "content": get_agent_prompt(user_input)},
+        {"role": "user", "content": user_input}
+    ]
+
+
+# Function calling nativo del proveedor (bind_tools) en lugar del JSON en el prompt
+AGENT_NATIVE_TOOLS = os.getenv("AGENT_NATIVE_TOOLS", "false").lower() == "true"
+# Máximo de rondas de llamadas a herramientas por mensaje
+AGENT_MAX_TOOL_STEPS = int(os.getenv("AGENT_MAX_TOOL_STEPS", "4"))
+_AGENT_BOUND_MODELS_MAX = 128
+
+# Modelos con herramientas enlazadas por subconjunto de herramientas (LRU)
+_bound_models = OrderedDict()
+
+NATIVE_TOOLS_INSTRUCTIONS = """
+Puedes llamar a varias herramientas en el mismo turno: si la pregunta se refiere a varios
+registros (por ejemplo, comparar el stock de varios productos), pide todas las consultas a la vez."""
+
+
+def tool_function_schema(tool_info: dict) -> dict:
+    """Convierte una herramienta MCP al formato de función de OpenAI (también lo acepta Gemini)"""
+    return {
+        "type": "function",
+        "function": {
+            "name": tool_info["name"],
+            "description": tool_info.get("description", ""),
+            "parameters": tool_info.get("inputSchema") or {"type": "object", "properties": {}}
+        }
+    }
+
+
+def get_bound_model(tools: list, tool_choice: str = None):
+    """
+    Modelo con las herramientas enlazadas mediante bind_tools (se reutiliza por subconjunto)
+    
+    Args:
+        tools: Herramientas MCP a ofrecer
+        tool_choice: "none" para forzar una respuesta en texto
+    """
+    if not tools:
+        # Sin herramientas (MCP caído o selector vacío): la API rechaza tools=[] con tool_choice
+        return model
+    key = (tuple(tool["name"] for tool in tools), tool_choice)
+    bound = _bound_models.get(key)
+    if bound is None:
+        kwargs = {"tool_choice": tool_choice} if tool_choice else {}
+        bound = model.bind_tools([tool_function_schema(tool) for tool in tools], **kwargs)
+        _bound_models[key] = bound
+        if len(_bound_models) > _AGENT_BOUND_MODELS_MAX:
+            _bound_models.popitem(last=False)
+    else:
+        _bound_models.move_to_end(key)
+    return bound
+
+
+def _build_native_messages(user_input: str, tools: list) -> list:
+    """Mensajes iniciales para el modo de function calling nativo (con las pautas de las herramientas enlazadas)"""
+    # Parte fija primero; las pautas del subconjunto, al final
+    content = system_prompt + NATIVE_TOOLS_INSTRUCTIONS
+    guidelines = render_tool_guidelines(tools, json_examples=False)
+    if guidelines:
+        content += f"\n\n{guidelines}"
+    return [
+        SystemMessage(content=content),
+        HumanMessage(content=user_input)
+    ]
+
+
+async def execute_tool_calls(tool_calls: list) -> list:
+    """Ejecuta en paralelo las llamadas a herramientas de un turno y devuelve los ToolMessage"""
+    for call in tool_calls:
+        logger.info(f"LLM solicitó herramienta: {call['name']} con params: {call.get('args')}")
+    
+    results = await asyncio.gather(*(
+        execute_mcp_tool(call["name"], call.get("args") or {}) for call in tool_calls
+    ))
+    return [
+        ToolMessage(content=encode_result(result), tool_call_id=call["id"], name=call["name"])
+        for call, result in zip(tool_calls, results)
+    ]
+
+
+async def run_native_agent(user_input: str) -> str:
+    """
+    Bucle de function calling nativo: en cada ronda el LLM puede pedir varias herramientas,
+    que se ejecutan a la vez. Tras AGENT_MAX_TOOL_STEPS rondas se pide la respuesta final.
+    """
+    tools = select_agent_tools(user_input)
+    bound = get_bound_model(tools)
+    messages = _build_native_messages(user_input, tools)
+    
+    for _ in range(AGENT_MAX_TOOL_STEPS):
+        response = await invoke_model(messages, bound)
+        if not response.tool_calls:
+            return _chunk_text(response)
+        
+        messages.append(response)
+        messages.extend(await execute_tool_calls(response.tool_calls))
+    
+    logger.warning(f"Límite de {AGENT_MAX_TOOL_STEPS} rondas de herramientas alcanzado")
+    response = await invoke_model(messages, get_bound_model(tools, tool_choice="none"))
+    return _chunk_text(response)
+
+
+async def stream_native_agent(user_input: str):
+    """Versión en streaming de run_native_agent: el texto se transmite según llega"""
+    tools = select_agent_tools(user_input)
+    bound = get_bound_model(tools)
+    messages = _build_native_messages(user_input, tools)
+    emitted = False
+    
+    for step in range(AGENT_MAX_TOOL_STEPS + 1):
+        if step == AGENT_MAX_TOOL_STEPS:
+            logger.warning(f"Límite de {AGENT_MAX_TOOL_STEPS} rondas de herramientas alcanzado")
+            bound = get_bound_model(tools, tool_choice="none")
+        
+        # Los fragmentos se acumulan para reconstruir las llamadas a herramientas
+        response = None
+        separated = not emitted
+        async for chunk in stream_model_chunks(messages, bound):
+            response = chunk if response is None else response + chunk
+            text = _chunk_text(chunk)
+            if text:
+                if not separated:
+                    yield "\n\n"
+                    separated = True
+                yield text
+                emitted = True
+        
+        if response is None or not response.tool_calls:
+            return
+        
+        messages.append(response)
+        messages.extend(await execute_tool_calls(response.tool_calls))
+
+
+def _build_plain_messages(user_input: str) -> list:
+    """Construye los mensajes para el LLM sin herramientas"""
+    prompt_template = ChatPromptTemplate.from_messages([
+        ("system", system_prompt),
+        ("human", user_input)
+    ])
+    return prompt_template.format_messages()
+
+
 async def run_agent(user_input: str) -> str:
     """Ejecuta el agente con la entrada del usuario"""
     try:
@@ -277,83 +1035,193 @@ async def run_agent(user_input: str) -> str:
             if tool_result:
                 return tool_result
             
+            if AGENT_NATIVE_TOOLS:
+                return await run_native_agent(user_input)
+            
             # Si no se detectó automáticamente, analizar si necesita herramientas MCP
             # mediante el LLM pero sin bind_tools (manualmente)
+            messages = _build_tool_messages(user_input)
             
-            # Crear descripción de herramientas para el prompt
-            tools_json = []
-            for tool_info in mcp_tools_info:
-                tools_json.append({
-                    "name": tool_info["name"],
-                    "description": tool_info.get("description", ""),
-                    "parameters": tool_info.get("inputSchema", {})
-                })
+            # Primera invocación del LLM en streaming: cada petición de herramienta
+            # se lanza en cuanto su JSON se cierra, mientras el LLM sigue generando
+            scanner = ToolCallScanner()
+            tasks = []
+            try:
+                async for text in stream_model(messages):
+                    for tool_request in scanner.feed(text):
+                        tasks.append(_dispatch_tool_request(tool_request))
+                response_text = scanner.text
+                
+                if not tasks:
+                    # No necesita herramientas (o el JSON era inválido), respuesta directa
+                    return response_text
+                
+                results = await asyncio.gather(*tasks)
+            finally:
+                _cancel_pending(tasks)
             
-            # Prompt que incluye las herramientas disponibles
-            enhanced_prompt = f"""{system_prompt}
+            # Invocar el LLM nuevamente con el resultado
+            messages.append({"role": "assistant", "content": response_text})
+            messages.append({"role": "user", "content": _tool_results_prompt(scanner.requests, results)})
+            
+            final_response = await invoke_model(messages)
+            return final_response.content
+        
+        # Sin MCP, usar el LLM simple
+        response = await invoke_model(_build_plain_messages(user_input))
+        return response.content
+        
+    except Exception as e:
+        logger.error(f"Error ejecutando agente: {e}", exc_info=True)
+        return f"Lo siento, ocurrió un error al procesar tu solicitud: {str(e)}"
 
-Para usar una herramienta, responde EXACTAMENTE en este formato JSON:
-{{
-    "action": "use_tool",
-    "tool_name": "nombre_herramienta",
-    "parameters": {{"param1": "valor1"}}
-}}
 
-Si NO necesitas usar herramientas, responde normalmente en texto.
+def _visible_prefix(text: str) -> str:
+    """Parte del texto que se puede mostrar sin riesgo de enseñar una petición de herramienta"""
+    cut = len(text)
+    for marker in ("{", "`"):
+        idx = text.find(marker)
+        if idx != -1:
+            cut = min(cut, idx)
+    return text[:cut]
 
-Herramientas disponibles (JSON):
-{tools_json}"""
+
+async def stream_agent(user_input: str):
+    """
+    Versión en streaming de run_agent: produce fragmentos de texto a medida que llegan.
+    
+    El texto que pueda ser una petición de herramienta (JSON) no se muestra. Cada
+    petición se lanza en cuanto su JSON se cierra; al terminar la respuesta se esperan
+    los resultados y se transmite la segunda respuesta del LLM.
+    """
+    try:
+        if mcp_client:
+            tool_result = await detect_and_execute_tools(user_input)
+            if tool_result:
+                yield tool_result
+                return
             
-            # Primera invocación del LLM
-            messages = [
-                {"role": "system", "content": enhanced_prompt},
-                {"role": "user", "content": user_input}
-            ]
+            if AGENT_NATIVE_TOOLS:
+                async for text in stream_native_agent(user_input):
+                    yield text
+                return
             
-            response = model.invoke(messages)
-            response_text = response.content
+            messages = _build_tool_messages(user_input)
             
-            # Verificar si el LLM quiere usar una herramienta
-            import json
-            import re
+            scanner = ToolCallScanner()
+            tasks = []
+            emitted = 0
+            holding = False
+            try:
+                async for text in stream_model(messages):
+                    for tool_request in scanner.feed(text):
+                        tasks.append(_dispatch_tool_request(tool_request))
+                    if not holding:
+                        visible = _visible_prefix(text)
+                        if visible:
+                            yield visible
+                            emitted += len(visible)
+                        holding = len(visible) < len(text)
+                
+                if not tasks:
+                    response_text = scanner.text
+                    if len(response_text) > emitted:
+                        yield response_text[emitted:]
+                    return
+                
+                results = await asyncio.gather(*tasks)
+            finally:
+                _cancel_pending(tasks)
             
-            # Buscar JSON en la respuesta
-            json_match = re.search(r'\{[\s\S]*"action"[\s\S]*"use_tool"[\s\S]*\}', response_text)
+            messages.append({"role": "assistant", "content": scanner.text})
+            messages.append({"role": "user", "content": _tool_results_prompt(scanner.requests, results)})
             
-            if json_match:
-                try:
-                    tool_request = json.loads(json_match.group())
-                    tool_name = tool_request.get("tool_name")
-                    parameters = tool_request.get("parameters", {})
-                    
-                    logger.info(f"LLM solicitó herramienta: {tool_name} con params: {parameters}")
-                    
-                    # Ejecutar la herramienta MCP
-                    tool_result = await execute_mcp_tool(tool_name, parameters)
-                    
-                    # Invocar el LLM nuevamente con el resultado
-                    messages.append({"role": "assistant", "content": response_text})
-                    messages.append({"role": "user", "content": f"Resultado de la herramienta: {tool_result}"})
-                    
-                    final_response = model.invoke(messages)
-                    return final_response.content
-                    
-                except json.JSONDecodeError:
-                    logger.warning("El LLM intentó usar herramienta pero el JSON era inválido")
-                    return response_text
-            else:
-                # No necesita herramientas, respuesta directa
-                return response_text
+            if emitted:
+                yield "\n\n"
+            async for text in stream_model(messages):
+                yield text
+            return
         
-        # Sin MCP, usar el LLM simple
-        prompt_template = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", user_input)
-        ])
-        
-        response = model.invoke(prompt_template.format_messages())
-        return response.content
+        async for text in stream_model(_build_plain_messages(user_input)):
+            yield text
         
     except Exception as e:
         logger.error(f"Error ejecutando agente: {e}", exc_info=True)
-        return f"Lo siento, ocurrió un error al procesar tu solicitud: {str(e)}"
+        yield f"Lo siento, ocurrió un error al procesar tu solicitud: {str(e)}"
+
+
+# Intervalo en segundos de los pings de salud de la sesión MCP (0 = desactivados)
+MCP_HEALTH_CHECK_INTERVAL = float(os.getenv("MCP_HEALTH_CHECK_INTERVAL", "60"))
+# Intervalo en segundos del registro de métricas (caché, pool, enrutador de intenciones; 0 = desactivado)
+AGENT_STATS_LOG_INTERVAL = float(os.getenv("AGENT_STATS_LOG_INTERVAL", "300"))
+
+_stats_task = None
+
+
+async def _log_stats_loop(interval: float):
+    """Registra periódicamente get_mcp_stats() (incluida la tasa de acierto del enrutador)"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            stats = get_mcp_stats()
+            router = stats["router"]
+            logger.info(
+                f"Enrutador de intenciones: {router['hits']}/{router['messages']} mensajes sin LLM "
+                f"({router['hit_rate']:.1%})"
+            )
+            logger.info(f"Métricas MCP: {json.dumps(stats, ensure_ascii=False, default=str)}")
+        except Exception as e:
+            logger.warning(f"Error obteniendo métricas del agente: {e}")
+
+
+def _on_mcp_tools(tools: list):
+    """Actualiza el catálogo y el prompt cada vez que el cliente MCP (re)inicializa la sesión"""
+    global mcp_tools_info
+    mcp_tools_info = tools
+    # El servidor puede haber cambiado (reconexión): las proyecciones se recalculan
+    field_projector.invalidate()
+    refresh_agent_prompt(tools)
+
+
+if mcp_client:
+    mcp_client.on_tools = _on_mcp_tools
+
+
+async def warm_up_agent():
+    """
+    Prepara el agente al arrancar el bot, antes del primer mensaje: conexión MCP
+    (initialize + tools/list), prompt renderizado, pings de salud y carga del índice
+    de productos. Si el servidor no responde, la conexión se reintenta en la primera llamada
+    y en los health checks del pool.
+    """
+    if not mcp_client:
+        return
+    
+    try:
+        await mcp_client.connect()
+        logger.info(f"Cliente MCP inicializado con {len(mcp_tools_info)} herramientas")
+    except Exception as e:
+        logger.error(f"Error conectando con el servidor MCP al arrancar: {e}")
+    
+    get_agent_prompt()
+    mcp_client.start_health_checks(MCP_HEALTH_CHECK_INTERVAL)
+    
+    global _stats_task
+    if AGENT_STATS_LOG_INTERVAL > 0 and _stats_task is None:
+        _stats_task = asyncio.create_task(_log_stats_loop(AGENT_STATS_LOG_INTERVAL), name="agent-stats")
+    
+    if PRODUCT_INDEX_ENABLED:
+        _ensure_product_index()
+
+
+async def shutdown_agent():
+    """Detiene las tareas en segundo plano y cierra la conexión MCP"""
+    global _stats_task
+    if _stats_task is not None:
+        _stats_task.cancel()
+        _stats_task = None
+    for engine in (product_sync, template_sync, quant_sync):
+        if engine is not None:
+            await engine.stop()
+    if mcp_client:
+        await mcp_client.disconnect()
@@ -0,0 +1,74 @@
+"""
+Limitador de concurrencia para las llamadas al LLM
+"""
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Límites configurables (0 = sin límite)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_CONCURRENCY_PER_MODEL = int(os.getenv("LLM_MAX_CONCURRENCY_PER_MODEL", "8"))
+
+
+class ConcurrencyLimiter:
+    """Semáforo global + semáforo por modelo para acotar llamadas concurrentes"""
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_per_model: int = LLM_MAX_CONCURRENCY_PER_MODEL):
+        """
+        Args:
+            max_concurrency: Máximo de llamadas simultáneas en total (0 = sin límite)
+            max_per_model: Máximo de llamadas simultáneas por modelo (0 = sin límite)
+        """
+        self.max_concurrency = max_concurrency
+        self.max_per_model = max_per_model
+        self._global = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self._per_model: Dict[str, asyncio.Semaphore] = {}
+        self.in_flight = 0
+
+    def _model_semaphore(self, model_name: Optional[str]) -> Optional[asyncio.Semaphore]:
+        """Obtiene (o crea) el semáforo del modelo"""
+        if self.max_per_model <= 0:
+            return None
+        key = model_name or "default"
+        semaphore = self._per_model.get(key)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_per_model)
+            self._per_model[key] = semaphore
+        return semaphore
+
+    @asynccontextmanager
+    async def limit(self, model_name: Optional[str] = None):
+        """Context manager que reserva un hueco global y uno del modelo"""
+        model_semaphore = self._model_semaphore(model_name)
+
+        if self._global:
+            await self._global.acquire()
+        try:
+            if model_semaphore:
+                await model_semaphore.acquire()
+            try:
+                self.in_flight += 1
+                try:
+                    yield
+                finally:
+                    self.in_flight -= 1
+            finally:
+                if model_semaphore:
+                    model_semaphore.release()
+        finally:
+            if self._global:
+                self._global.release()
+
+
+def get_model_name(llm) -> str:
+    """Obtiene el nombre del modelo de una instancia de chat de LangChain"""
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+
+
+llm_limiter = ConcurrencyLimiter()
@@ -0,0 +1,136 @@
+"""
+Proyección de campos por defecto para las lecturas de registros vía MCP
+"""
+
+import ast
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Inyectar `fields` en search_records/get_record cuando el modelo no lo indica
+MCP_FIELD_PROJECTION_ENABLED = os.getenv("MCP_FIELD_PROJECTION_ENABLED", "true").lower() == "true"
+
+# Tipos que inflan la respuesta sin aportar al agente
+EXCLUDED_FIELD_TYPES = {"binary", "html", "one2many"}
+# Campos técnicos que Odoo añade a todos los modelos
+EXCLUDED_FIELD_NAMES = {"__last_update", "write_uid", "create_uid", "message_main_attachment_id"}
+
+PROJECTED_TOOLS = {"search_records", "get_record"}
+
+
+def _parse_fields_metadata(text) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Convierte la respuesta de get_model_fields (JSON o repr de Python) en {campo: metadatos}"""
+    data = text
+    if isinstance(text, str):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            try:
+                data = ast.literal_eval(text)
+            except (ValueError, SyntaxError):
+                return None
+
+    if isinstance(data, dict) and isinstance(data.get("fields"), (dict, list)):
+        data = data["fields"]
+
+    if isinstance(data, list):
+        data = {f["name"]: f for f in data if isinstance(f, dict) and f.get("name")}
+
+    if not isinstance(data, dict) or not all(isinstance(v, dict) for v in data.values()):
+        return None
+    return data
+
+
+def default_projection(metadata: Dict[str, Dict[str, Any]]) -> List[str]:
+    """
+    Campos a pedir por defecto para un modelo
+
+    Descarta binarios, html y one2many, y los campos técnicos. No se limita el número:
+    los calculados no almacenados (qty_available, virtual_available...) son a menudo
+    justo lo que se pregunta.
+    """
+    return [
+        name for name, info in metadata.items()
+        if (info.get("type") or info.get("ttype")) not in EXCLUDED_FIELD_TYPES
+        and name not in EXCLUDED_FIELD_NAMES
+        and not name.startswith("__")
+    ]
+
+
+class FieldProjector:
+    """
+    Calcula y cachea la proyección por defecto de cada modelo.
+
+    La primera lectura de un modelo sin `fields` pide sus metadatos con
+    get_model_fields; las siguientes reutilizan la lista. Las peticiones simultáneas
+    del mismo modelo esperan a la misma consulta. Si los metadatos no se pueden
+    interpretar, la llamada se envía sin proyección y se reintenta en la siguiente.
+    """
+
+    def __init__(self, fetch_fields: Callable[[str], Awaitable[Any]]):
+        """
+        Args:
+            fetch_fields: Corrutina que devuelve la respuesta de get_model_fields para un modelo
+        """
+        self.fetch_fields = fetch_fields
+        self._projections: Dict[str, Optional[List[str]]] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def projection(self, model: str) -> Optional[List[str]]:
+        """Proyección del modelo (None si no se pudo derivar)"""
+        if model in self._projections:
+            self.hits += 1
+            return self._projections[model]
+
+        pending = self._pending.get(model)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[model] = future
+        fields = None
+        try:
+            metadata = _parse_fields_metadata(await self.fetch_fields(model))
+            if metadata:
+                fields = default_projection(metadata) or None
+                logger.info(f"Proyección por defecto de {model}: {len(fields or [])} de {len(metadata)} campos")
+                self._projections[model] = fields
+            else:
+                # Respuesta no interpretable (error del servidor con otro texto): no se cachea
+                logger.warning(f"No se pudieron interpretar los campos de {model}; se leerán sin proyección")
+        except Exception as e:
+            # Error de transporte: no se cachea, se reintenta en la siguiente lectura
+            logger.warning(f"Error obteniendo campos de {model}: {e}")
+        finally:
+            self._pending.pop(model, None)
+            future.set_result(fields)
+        return fields
+
+    async def apply(self, tool_name: str, arguments: dict) -> dict:
+        """Devuelve los argumentos con `fields` añadido si la herramienta lo admite y falta"""
+        if (not MCP_FIELD_PROJECTION_ENABLED or tool_name not in PROJECTED_TOOLS
+                or not isinstance(arguments, dict) or arguments.get("fields")
+                or not isinstance(arguments.get("model"), str)):
+            return arguments
+
+        fields = await self.projection(arguments["model"])
+        if not fields:
+            return arguments
+        return {**arguments, "fields": fields}
+
+    def invalidate(self, model: str = None):
+        """Olvida la proyección de un modelo (o de todos)"""
+        if model is None:
+            self._projections.clear()
+        else:
+            self._projections.pop(model, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"models": len(self._projections), "hits": self.hits, "misses": self.misses}
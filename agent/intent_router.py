@@ -0,0 +1,238 @@
+"""
+Enrutador de intenciones simples: responde sin LLM las consultas que siguen un patrón conocido
+"""
+
+import logging
+import os
+import re
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Respuestas directas (sin LLM) para consultas simples
+AGENT_INTENT_ROUTER_ENABLED = os.getenv("AGENT_INTENT_ROUTER_ENABLED", "true").lower() == "true"
+# Líneas máximas en las respuestas con plantilla
+INTENT_MAX_RESULTS = 10
+
+# Palabras que nunca forman parte del nombre de un producto o contacto: periodos de
+# tiempo, nombres de modelos (consultas agregadas) e interrogativos. Si el objeto
+# capturado contiene alguna, el mensaje no se enruta.
+NON_ENTITY_WORDS = (
+    r"hoy|ayer|ma[ñn]ana|d[ií]as?|semanas?|mes(?:es)?|a[ñn]os?|trimestres?|fechas?|"
+    r"pasad[oa]s?|[uú]ltim[oa]s?|actual(?:es)?|este|esta|estos|estas|"
+    r"today|yesterday|tomorrow|days?|weeks?|months?|years?|quarters?|last|this|current|"
+    r"pedidos?|[oó]rdenes|ventas?|clientes?|proveedores?|facturas?|productos?|contactos?|"
+    r"cotizaciones|presupuestos?|usuarios?|orders?|customers?|invoices?|products?|sales|vendors?|"
+    r"total(?:es)?|todos|todas|all|cu[aá]l(?:es)?|qu[eé]|qui[eé]n(?:es)?|which|what|who"
+)
+NON_ENTITY_PATTERN = re.compile(rf"\b(?:{NON_ENTITY_WORDS})\b", re.IGNORECASE)
+
+# Objeto de la consulta: texto sin signos de interrogación ni puntuación final
+_Q = r"(?P<q>[^?¿!¡.,;:]{2,80}?)"
+_DE = r"(?:del?|para|of|for)\s+"
+_ART = r"(?:(?:el|la|los|las|un|una|the|a|an)\s+)?"
+
+# Palabras que indican conversación y no una búsqueda (frases cortas)
+SHORT_QUERY_EXCLUDED = (
+    'hola', 'hello', 'hi', 'hey', 'buenas', 'buenos', 'saludos',
+    'qué', 'que', 'cómo', 'como', 'ayuda', 'help', 'gracias', 'ok',
+)
+
+# Patrones por intención, de más específica a más general (español e inglés)
+INTENT_PATTERNS: Dict[str, List[str]] = {
+    "product_code": [
+        r"^\s*(?P<q>[A-Z]+[_-]\d+)\s*$",
+        r"^\s*(?P<q>[A-Z]+\d+[_-]\d+)\s*$",
+    ],
+    "stock": [
+        rf"^(?:stock|existencias?|inventario|disponibilidad|inventory|availability)\s+(?:hay\s+)?{_DE}{_ART}{_Q}$",
+        rf"^cu[aá]nt[oa]s?\s+(?:stock\s+|existencias\s+|unidades\s+)?(?:hay|tenemos|quedan?)\s+(?:de(?:l)?\s+)?{_ART}{_Q}$",
+        rf"^cu[aá]nt[oa]s?\s+{_Q}\s+(?:hay|tenemos|quedan?)(?:\s+en\s+(?:stock|inventario|almac[eé]n))?$",
+        rf"^how\s+many\s+{_Q}\s+(?:are\s+(?:there\s+)?)?(?:in\s+stock|do\s+we\s+have|are\s+left|left)$",
+        rf"^{_Q}\s+(?:stock|inventory)$",
+    ],
+    "price": [
+        rf"^(?:precio|coste|costo|valor|price|cost)\s+{_DE}{_ART}{_Q}$",
+        rf"^cu[aá]nto\s+(?:cuesta|cuestan|vale|valen)\s+{_ART}{_Q}$",
+        rf"^how\s+much\s+(?:is|are|does|do)\s+{_ART}{_Q}(?:\s+cost)?$",
+        rf"^{_Q}\s+price$",
+    ],
+    "partner_phone": [
+        rf"^(?:(?:el|the)\s+)?(?:tel[eé]fono|celular|m[oó]vil|phone(?:\s+number)?|telephone|mobile)\s+"
+        rf"{_DE}(?:(?:el|la)\s+)?(?:cliente|contacto|proveedor|customer|contact|vendor)?\s*{_Q}$",
+        rf"^(?:cliente|contacto|customer|contact)\s+{_Q}(?:'s)?\s+(?:tel[eé]fono|phone(?:\s+number)?)$",
+        rf"^{_Q}(?:'s)?\s+phone(?:\s+number)?$",
+    ],
+    "partner_email": [
+        rf"^(?:(?:el|the)\s+)?(?:e-?mail|correo(?:\s+electr[oó]nico)?|mail)\s+"
+        rf"{_DE}(?:(?:el|la)\s+)?(?:cliente|contacto|proveedor|customer|contact|vendor)?\s*{_Q}$",
+        rf"^(?:cliente|contacto|customer|contact)\s+{_Q}(?:'s)?\s+(?:e-?mail|correo)$",
+        rf"^{_Q}(?:'s)?\s+e-?mail$",
+    ],
+    "partner_orders": [
+        rf"^(?:pedidos|[oó]rdenes(?:\s+de\s+venta)?|ventas|cotizaciones|orders|sales\s+orders|sales)\s+"
+        rf"(?:del?|para|of|for|from)\s+(?:(?:el|la)\s+)?(?:cliente|customer)?\s*{_Q}$",
+        rf"^(?:cliente|customer)\s+{_Q}(?:'s)?\s+(?:pedidos|orders)$",
+        rf"^{_Q}(?:'s)?\s+orders$",
+    ],
+    "product_search": [
+        r"^(?!/)(?!.*\b(?:" + "|".join(SHORT_QUERY_EXCLUDED) + r")\b)(?P<q>[^?\s]+(?:\s+[^?\s]+){0,2})$",
+    ],
+}
+
+
+# Texto sobre el que se evalúa cada intención: las de producto conservan las mayúsculas
+# o el signo de interrogación (una pregunta corta no es una búsqueda); el resto, sin ¿? ni ¡!
+INTENT_SUBJECTS = {"product_code": "upper", "product_search": "raw"}
+
+
+class Route(NamedTuple):
+    intent: str
+    query: str
+
+
+class IntentRouter:
+    """
+    Clasifica el mensaje con un conjunto de expresiones regulares precompiladas y, si
+    coincide, llama al manejador de la intención, que responde con una plantilla a
+    partir de una llamada directa a Odoo. Si nada coincide o el manejador devuelve
+    None (sin resultados, error), el mensaje sigue su camino normal hacia el LLM.
+    """
+
+    def __init__(self, patterns: Dict[str, List[str]] = None):
+        """
+        Args:
+            patterns: Expresiones por intención, en orden de prioridad
+        """
+        self._patterns: List[tuple] = []
+        self._handlers: Dict[str, Callable[[str], Awaitable[Optional[str]]]] = {}
+        for intent, expressions in (INTENT_PATTERNS if patterns is None else patterns).items():
+            for expression in expressions:
+                flags = 0 if intent == "product_code" else re.IGNORECASE
+                self._patterns.append((intent, re.compile(expression, flags)))
+
+        self.messages = 0
+        self.answered: Dict[str, int] = {}
+        self.unanswered: Dict[str, int] = {}
+
+    def register(self, intent: str, handler: Callable[[str], Awaitable[Optional[str]]]):
+        """Asocia el manejador de una intención (corrutina query -> respuesta o None)"""
+        self._handlers[intent] = handler
+
+    def match(self, text: str) -> Optional[Route]:
+        """Primera intención con manejador cuyo patrón coincide con el mensaje"""
+        raw = text.strip()
+        subjects = {
+            "raw": raw,
+            "upper": raw.upper(),
+            "clean": raw.lstrip("¿¡").rstrip("?!. ").strip(),
+        }
+        for intent, pattern in self._patterns:
+            if intent not in self._handlers:
+                continue
+            match = pattern.match(subjects[INTENT_SUBJECTS.get(intent, "clean")])
+            if not match:
+                continue
+            query = match.group("q").strip()
+            # Un periodo o un modelo no es un nombre: "pedidos de hoy" va al LLM sin consultar Odoo
+            if intent != "product_code" and NON_ENTITY_PATTERN.search(query):
+                continue
+            return Route(intent, query)
+        return None
+
+    async def dispatch(self, text: str) -> Optional[str]:
+        """Responde el mensaje si corresponde a una intención conocida; None para usar el LLM"""
+        self.messages += 1
+        route = self.match(text)
+        if route is None:
+            return None
+
+        try:
+            answer = await self._handlers[route.intent](route.query)
+        except Exception as e:
+            logger.warning(f"Error en la intención '{route.intent}': {e}")
+            answer = None
+        counter = self.answered if answer else self.unanswered
+        counter[route.intent] = counter.get(route.intent, 0) + 1
+        if answer:
+            logger.info(f"Intención '{route.intent}' resuelta sin LLM: '{route.query}'")
+        return answer
+
+    def stats(self) -> Dict[str, Any]:
+        """Mensajes, respuestas sin LLM por intención y tasa de acierto"""
+        hits = sum(self.answered.values())
+        return {
+            "messages": self.messages,
+            "hits": hits,
+            "hit_rate": round(hits / self.messages, 3) if self.messages else 0.0,
+            "answered": dict(self.answered),
+            "unanswered": dict(self.unanswered),
+        }
+
+
+def _m2o_name(value) -> str:
+    return value[1] if isinstance(value, (list, tuple)) and len(value) > 1 else ""
+
+
+def _product_label(product: Dict) -> str:
+    code = product.get('default_code')
+    return f"{product.get('name')} [{code}]" if code else f"{product.get('name')}"
+
+
+def _number(value) -> str:
+    """Cantidad con separador de miles y sin decimales sobrantes (nunca en notación científica)"""
+    return f"{value or 0:,.2f}".rstrip("0").rstrip(".")
+
+
+def _more(total: int) -> List[str]:
+    """Aviso de resultados no mostrados (los manejadores piden INTENT_MAX_RESULTS + 1)"""
+    return ["… hay más resultados; afina la búsqueda para verlos."] if total > INTENT_MAX_RESULTS else []
+
+
+def format_products(query: str, products: List[Dict]) -> str:
+    """Listado breve de productos (búsqueda por código o frase corta)"""
+    lines = [f"Productos para «{query}»:"]
+    for product in products[:INTENT_MAX_RESULTS]:
+        category = _m2o_name(product.get('categ_id'))
+        lines.append(
+            f"• {_product_label(product)} — ${product.get('list_price') or 0:,.2f} — "
+            f"stock: {_number(product.get('qty_available'))}" + (f" — {category}" if category else "")
+        )
+    return "\n".join(lines + _more(len(products)))
+
+
+def format_stock(query: str, products: List[Dict]) -> str:
+    lines = [f"📦 Stock disponible para «{query}»:"]
+    for product in products[:INTENT_MAX_RESULTS]:
+        lines.append(f"• {_product_label(product)}: {_number(product.get('qty_available'))} unidades")
+    return "\n".join(lines + _more(len(products)))
+
+
+def format_price(query: str, products: List[Dict]) -> str:
+    lines = [f"💰 Precio de venta para «{query}»:"]
+    for product in products[:INTENT_MAX_RESULTS]:
+        lines.append(f"• {_product_label(product)}: ${product.get('list_price') or 0:,.2f}")
+    return "\n".join(lines + _more(len(products)))
+
+
+def format_partner_field(query: str, partners: List[Dict], field: str) -> Optional[str]:
+    """Teléfono o email de los contactos encontrados (None si ninguno lo tiene)"""
+    icon, label = ("📞", "teléfono") if field == "phone" else ("✉️", "email")
+    found = [p for p in partners if p.get(field)]
+    if not found:
+        return None
+    lines = [f"{icon} {label.capitalize()} de «{query}»:"]
+    for partner in found[:INTENT_MAX_RESULTS]:
+        lines.append(f"• {partner.get('name')}: {partner[field]}")
+    return "\n".join(lines + _more(len(found)))
+
+
+def format_orders(query: str, orders: List[Dict]) -> str:
+    lines = [f"🧾 Pedidos de «{query}»:"]
+    for order in orders[:INTENT_MAX_RESULTS]:
+        date = str(order.get('date_order') or "")[:10]
+        lines.append(
+            f"• {order.get('name')} — {_m2o_name(order.get('partner_id'))} — {date} — "
+            f"${order.get('amount_total') or 0:,.2f} ({order.get('state')})"
+        )
+    return "\n".join(lines + _more(len(orders)))
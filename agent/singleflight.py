@@ -0,0 +1,59 @@
+"""
+Coalescencia de llamadas idénticas en curso (singleflight)
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Comparte una única ejecución entre las llamadas con la misma clave que se
+    solapan en el tiempo: la primera lanza la corrutina y las siguientes esperan
+    su resultado (o su excepción) en lugar de repetir la llamada.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Ejecuta func() o se une a la ejecución en curso con la misma clave
+
+        Args:
+            key: Clave que identifica llamadas equivalentes
+            func: Función que crea la corrutina a ejecutar
+        """
+        self.calls += 1
+        task = self._in_flight.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.shared += 1
+            logger.debug(f"Llamada coalescida con una en curso: {key}")
+
+        # shield: si un llamador se cancela, los demás siguen recibiendo el resultado
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Evita el aviso de excepción no recuperada si todos los llamadores se cancelaron
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Estadísticas de coalescencia"""
+        return {
+            "calls": self.calls,
+            "shared": self.shared,
+            "in_flight": len(self._in_flight),
+        }
@@ -0,0 +1,168 @@
+"""
+Caché TTL + LRU para resultados de herramientas MCP de solo lectura
+"""
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Configuración de la caché
+MCP_CACHE_ENABLED = os.getenv("MCP_CACHE_ENABLED", "true").lower() == "true"
+MCP_CACHE_MAX_ENTRIES = int(os.getenv("MCP_CACHE_MAX_ENTRIES", "1000"))
+MCP_CACHE_MAX_BYTES = int(os.getenv("MCP_CACHE_MAX_BYTES", str(20 * 1024 * 1024)))
+# TTL de lecturas de registros y de metadatos de modelos, en segundos
+MCP_CACHE_RECORDS_TTL = float(os.getenv("MCP_CACHE_RECORDS_TTL", "30"))
+MCP_CACHE_METADATA_TTL = float(os.getenv("MCP_CACHE_METADATA_TTL", "3600"))
+
+# TTL por herramienta (las que no aparecen no se cachean)
+DEFAULT_TOOL_TTLS = {
+    "search_records": MCP_CACHE_RECORDS_TTL,
+    "get_record": MCP_CACHE_RECORDS_TTL,
+    "search_count": MCP_CACHE_RECORDS_TTL,
+    # Solo llega a la caché con métodos de lectura (read_group, search_read...)
+    "execute_method": MCP_CACHE_RECORDS_TTL,
+    "model_info": MCP_CACHE_METADATA_TTL,
+    "get_model_fields": MCP_CACHE_METADATA_TTL,
+    "list_models": MCP_CACHE_METADATA_TTL,
+}
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "model", "size")
+
+    def __init__(self, value: str, expires_at: float, model: Optional[str], size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.model = model
+        self.size = size
+
+
+class ToolResultCache:
+    """
+    Caché acotada por número de entradas y por memoria, con expulsión LRU y TTL por herramienta.
+
+    Las entradas se agrupan por modelo de Odoo para poder invalidarlas cuando se escribe
+    en ese modelo. Cada modelo tiene un contador de generación: una lectura que empezó
+    antes de una escritura no guarda su resultado (podría ser anterior a la escritura).
+    """
+
+    def __init__(self, ttls: Dict[str, float] = None,
+                 max_entries: int = MCP_CACHE_MAX_ENTRIES,
+                 max_bytes: int = MCP_CACHE_MAX_BYTES):
+        """
+        Args:
+            ttls: TTL en segundos por nombre de herramienta
+            max_entries: Máximo de entradas
+            max_bytes: Memoria máxima aproximada (tamaño de los resultados)
+        """
+        self.ttls = dict(DEFAULT_TOOL_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._by_model: Dict[Optional[str], Set[Hashable]] = {}
+        self._generations: Dict[Optional[str], int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def is_cacheable(self, tool_name: str) -> bool:
+        return self.ttls.get(tool_name, 0) > 0
+
+    def generation(self, model: Optional[str]) -> int:
+        """Generación actual del modelo (cambia con cada invalidación)"""
+        return self._generations.get(model, 0)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Devuelve el resultado cacheado o None (cuenta acierto/fallo)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def set(self, key: Hashable, tool_name: str, model: Optional[str], value: str,
+            generation: int = None):
+        """
+        Guarda un resultado
+
+        Args:
+            key: Clave canónica de la llamada
+            tool_name: Herramienta (determina el TTL)
+            model: Modelo de Odoo al que afecta (para invalidación)
+            value: Resultado
+            generation: Generación del modelo al empezar la lectura
+        """
+        ttl = self.ttls.get(tool_name, 0)
+        if ttl <= 0:
+            return
+        if generation is not None and generation != self.generation(model):
+            # Hubo una escritura mientras se leía: el resultado puede estar obsoleto
+            return
+
+        size = len(value)
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = _Entry(value, time.monotonic() + ttl, model, size)
+        self._by_model.setdefault(model, set()).add(key)
+        self.bytes += size
+
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate_model(self, model: Optional[str]):
+        """Elimina las entradas de un modelo y avanza su generación"""
+        self._generations[model] = self.generation(model) + 1
+        keys = self._by_model.pop(model, set())
+        for key in keys:
+            entry = self._entries.pop(key, None)
+            if entry:
+                self.bytes -= entry.size
+        if keys:
+            self.invalidations += len(keys)
+            logger.debug(f"Caché MCP: {len(keys)} entradas invalidadas de {model}")
+
+    def clear(self):
+        """Vacía la caché"""
+        for model in list(self._by_model):
+            self.invalidate_model(model)
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+        keys = self._by_model.get(entry.model)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_model[entry.model]
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de la caché"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
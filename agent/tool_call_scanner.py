@@ -0,0 +1,110 @@
+"""
+Detección incremental de peticiones de herramienta (JSON) en la salida en streaming del LLM
+"""
+
+import json
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TOOL_ACTION = "use_tool"
+
+
+class ToolCallScanner:
+    """
+    Recorre el texto una sola vez, fragmento a fragmento, siguiendo la profundidad de
+    llaves y el estado de las cadenas JSON (incluidos los escapes). En cuanto se cierra
+    un objeto de primer nivel con "action": "use_tool" lo devuelve, sin esperar al
+    final de la respuesta.
+
+    El coste es lineal en la longitud del texto: no hay retroceso como con una
+    expresión regular del tipo {.*"action".*"use_tool".*}.
+    """
+
+    def __init__(self):
+        self.text_parts: List[str] = []
+        self.requests: List[Dict] = []
+        # Objetos equilibrados que parecían petición de herramienta pero no eran JSON válido
+        self.invalid = 0
+        # Posición en el texto completo donde empieza el primer objeto JSON
+        self.first_object_at: Optional[int] = None
+
+        self._length = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._current: List[str] = []
+
+    @property
+    def text(self) -> str:
+        """Texto recibido hasta ahora"""
+        return "".join(self.text_parts)
+
+    def feed(self, text: str) -> List[Dict]:
+        """
+        Procesa un fragmento de texto
+
+        Args:
+            text: Fragmento recibido del LLM
+
+        Returns:
+            Peticiones de herramienta completadas dentro de este fragmento
+        """
+        found = []
+        self.text_parts.append(text)
+        # Inicio del tramo del fragmento que pertenece al objeto en curso
+        start = 0 if self._depth else None
+
+        for i, char in enumerate(text):
+            if self._depth == 0:
+                # Fuera de un objeto solo interesa la llave de apertura
+                if char == "{":
+                    self._depth = 1
+                    start = i
+                    if self.first_object_at is None:
+                        self.first_object_at = self._length + i
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._current.append(text[start:i + 1])
+                    request = self._parse("".join(self._current))
+                    self._current = []
+                    start = None
+                    if request is not None:
+                        found.append(request)
+
+        if self._depth and start is not None:
+            self._current.append(text[start:])
+
+        self._length += len(text)
+        self.requests.extend(found)
+        return found
+
+    def _parse(self, candidate: str) -> Optional[Dict]:
+        try:
+            obj = json.loads(candidate)
+        except json.JSONDecodeError:
+            if f'"{TOOL_ACTION}"' in candidate:
+                self.invalid += 1
+                logger.warning("El LLM intentó usar herramienta pero el JSON era inválido")
+            return None
+
+        if isinstance(obj, dict) and obj.get("action") == TOOL_ACTION:
+            return obj
+        return None
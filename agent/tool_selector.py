@@ -0,0 +1,143 @@
+"""
+Selección local de las herramientas MCP más relevantes para cada mensaje (BM25)
+"""
+
+import math
+import re
+import unicodedata
+from typing import Dict, Iterable, List
+
+# Equivalencias español -> inglés para acercar los mensajes a las descripciones de las herramientas
+QUERY_SYNONYMS = {
+    "busca": ["search", "find"], "buscar": ["search", "find"], "encuentra": ["search", "find"],
+    "producto": ["product"], "articulo": ["product"], "inventario": ["product", "stock"],
+    "stock": ["stock", "quantity"], "existencia": ["stock", "quantity"], "cantidad": ["quantity", "count"],
+    "precio": ["price", "product"], "cliente": ["partner", "customer"], "contacto": ["partner", "contact"],
+    "proveedor": ["partner", "supplier"], "venta": ["sale", "order"], "pedido": ["order", "sale"],
+    "orden": ["order"], "factura": ["invoice", "move"], "cuanto": ["count"], "cuanta": ["count"],
+    "contar": ["count"], "total": ["count"], "crear": ["create"], "crea": ["create"], "nuevo": ["create"],
+    "nueva": ["create"], "actualizar": ["update", "write"], "actualiza": ["update", "write"],
+    "modificar": ["update", "write"], "cambia": ["update", "write"], "cambiar": ["update", "write"],
+    "eliminar": ["delete", "unlink"], "elimina": ["delete", "unlink"], "borrar": ["delete", "unlink"],
+    "borra": ["delete", "unlink"], "campo": ["field"], "modelo": ["model"], "tabla": ["model"],
+    "registro": ["record"], "detalle": ["record", "get"], "estado": ["status"], "servidor": ["server"],
+    "metodo": ["method", "execute"], "ejecutar": ["execute", "method"], "ejecuta": ["execute", "method"],
+    "cache": ["cache"], "lista": ["list"], "listar": ["list"],
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    """Minúsculas, sin acentos, separando snake_case/puntos y quitando plurales simples y números"""
+    tokens = []
+    for token in _TOKEN_RE.findall(_strip_accents(text.lower())):
+        if token.isdigit():
+            continue
+        if len(token) > 4 and token.endswith("es") and not token.endswith("ies"):
+            token = token[:-2] if token[-3] in "rnlsd" else token[:-1]
+        elif len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us")):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def expand_query(tokens: Iterable[str]) -> List[str]:
+    """Añade a la consulta las equivalencias en inglés"""
+    expanded = []
+    for token in tokens:
+        expanded.append(token)
+        expanded.extend(QUERY_SYNONYMS.get(token, ()))
+    return expanded
+
+
+class ToolSelector:
+    """
+    Índice BM25 sobre nombre, descripción y parámetros de las herramientas.
+
+    El nombre de la herramienta pesa más que la descripción (se repite en el documento).
+    """
+
+    NAME_WEIGHT = 3
+
+    def __init__(self, tools: List[Dict], always_include: Iterable[str] = (),
+                 k1: float = 1.2, b: float = 0.75, min_ratio: float = 0.3):
+        """
+        Args:
+            tools: Herramientas MCP (name, description, inputSchema)
+            always_include: Herramientas que se incluyen siempre
+            k1, b: Parámetros de BM25
+            min_ratio: Descarta herramientas con puntuación menor que esta fracción de la mejor
+        """
+        self.tools = list(tools)
+        self.always_include = [name for name in always_include
+                               if any(t["name"] == name for t in self.tools)]
+        self.k1 = k1
+        self.b = b
+        self.min_ratio = min_ratio
+
+        self._doc_tf: List[Dict[str, int]] = []
+        self._doc_len: List[int] = []
+        df: Dict[str, int] = {}
+
+        for tool in self.tools:
+            params = (tool.get("inputSchema") or {}).get("properties", {})
+            tokens = (tokenize(tool["name"]) * self.NAME_WEIGHT
+                      + tokenize(tool.get("description") or "")
+                      + tokenize(" ".join(params)))
+            tf: Dict[str, int] = {}
+            for token in tokens:
+                tf[token] = tf.get(token, 0) + 1
+            self._doc_tf.append(tf)
+            self._doc_len.append(len(tokens))
+            for token in tf:
+                df[token] = df.get(token, 0) + 1
+
+        n = len(self.tools)
+        self._avgdl = (sum(self._doc_len) / n) if n else 0.0
+        self._idf = {
+            token: math.log(1 + (n - freq + 0.5) / (freq + 0.5))
+            for token, freq in df.items()
+        }
+
+    def scores(self, query: str) -> List[float]:
+        """Puntuación BM25 de cada herramienta para la consulta"""
+        terms = expand_query(tokenize(query))
+        result = []
+        for tf, dl in zip(self._doc_tf, self._doc_len):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * dl / self._avgdl) if self._avgdl else self.k1
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self._idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            result.append(score)
+        return result
+
+    def select(self, query: str, k: int) -> List[Dict]:
+        """
+        Devuelve las k herramientas más relevantes (más las obligatorias) en el orden original
+
+        Args:
+            query: Mensaje del usuario
+            k: Número de herramientas a seleccionar por relevancia
+        """
+        if k <= 0 or len(self.tools) <= k:
+            return list(self.tools)
+
+        scores = self.scores(query)
+        threshold = max(scores, default=0.0) * self.min_ratio
+        ranked = sorted(
+            (i for i, score in enumerate(scores) if score > 0 and score >= threshold),
+            key=lambda i: -scores[i]
+        )[:k]
+
+        chosen = set(ranked)
+        for name in self.always_include:
+            chosen.update(i for i, tool in enumerate(self.tools) if tool["name"] == name)
+
+        return [self.tools[i] for i in sorted(chosen)]
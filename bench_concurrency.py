@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concurrencia del agente: compara el camino bloqueante (model.invoke)
+con el camino asíncrono (run_agent + ainvoke) para N usuarios simultáneos.
+
+Usa un modelo simulado con latencia fija, así que no necesita API keys.
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ["ODOO_MCP_ENABLED"] = "false"
+
+LLM_LATENCY = float(os.getenv("BENCH_LLM_LATENCY", "0.5"))
+USERS = [1, 2, 4, 8, 16]
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class SlowFakeModel:
+    """Modelo simulado con la misma interfaz invoke/ainvoke que LangChain"""
+    model_name = "fake-slow-model"
+
+    def invoke(self, messages):
+        time.sleep(LLM_LATENCY)
+        return FakeResponse("ok")
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(LLM_LATENCY)
+        return FakeResponse("ok")
+
+
+async def blocking_handler(agent_main, user_input):
+    """Reproduce el comportamiento anterior: llamada síncrona dentro del handler"""
+    return agent_main.model.invoke([{"role": "user", "content": user_input}]).content
+
+
+async def measure(handler, users):
+    start = time.perf_counter()
+    await asyncio.gather(*(handler(f"mensaje {i}") for i in range(users)))
+    elapsed = time.perf_counter() - start
+    return elapsed, users / elapsed
+
+
+async def main():
+    import agent.agent_main as agent_main
+    agent_main.model = SlowFakeModel()
+
+    print("=" * 80)
+    print("BENCHMARK DE CONCURRENCIA DEL AGENTE")
+    print("=" * 80)
+    print(f"Latencia simulada del LLM: {LLM_LATENCY:.2f}s")
+    print(f"Límite global: {agent_main.llm_limiter.max_concurrency} | "
+          f"Límite por modelo: {agent_main.llm_limiter.max_per_model}")
+    print()
+    print(f"{'usuarios':>8} | {'bloqueante (s)':>14} | {'msg/s':>7} | {'async (s)':>10} | {'msg/s':>7} | {'speedup':>7}")
+    print("-" * 80)
+
+    for users in USERS:
+        blocking_time, blocking_tp = await measure(lambda m: blocking_handler(agent_main, m), users)
+        async_time, async_tp = await measure(agent_main.run_agent, users)
+        print(f"{users:>8} | {blocking_time:>14.2f} | {blocking_tp:>7.2f} | "
+              f"{async_time:>10.2f} | {async_tp:>7.2f} | {async_tp / blocking_tp:>6.1f}x")
+
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        sys.exit(1)
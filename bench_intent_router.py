@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Cobertura y coste del enrutador de intenciones frente a la detección anterior.
+
+Sobre un corpus de mensajes típicos del bot (español e inglés) cuenta cuántos se
+enrutan a una llamada directa con la detección anterior (dos patrones de código y
+frases de hasta 3 palabras) y con IntentRouter, comprueba la intención esperada
+(incluidos los mensajes que deben ir al LLM) y mide el tiempo de clasificación.
+Enrutar no garantiza responder: si Odoo no encuentra nada, el mensaje sigue al LLM.
+"""
+
+import re
+import sys
+import time
+
+from agent.intent_router import IntentRouter, INTENT_PATTERNS
+
+# (mensaje, intención esperada o None si debe ir al LLM)
+CORPUS = [
+    ("REF-001", "product_code"), ("ab12-3", "product_code"), ("FURN_0269", "product_code"),
+    ("silla roja", "product_search"), ("escritorio", "product_search"), ("lámpara led", "product_search"),
+    ("stock de sillas", "stock"), ("¿Cuánto stock hay de la silla roja?", "stock"),
+    ("cuántas lámparas quedan", "stock"), ("existencias del escritorio de roble", "stock"),
+    ("how many chairs do we have", "stock"), ("desk stock", "stock"),
+    ("precio de la lámpara", "price"), ("¿cuánto cuesta el escritorio?", "price"),
+    ("how much is the desk", "price"), ("price of office chair", "price"),
+    ("teléfono del cliente Acme Corp", "partner_phone"), ("customer Deco Addict phone", "partner_phone"),
+    ("phone of Juan Pérez", "partner_phone"),
+    ("correo de Gemini Furniture", "partner_email"), ("email of Azure Interior", "partner_email"),
+    ("Acme email", "partner_email"),
+    ("pedidos de Acme", "partner_orders"), ("orders of Deco Addict", "partner_orders"),
+    ("ventas del cliente Gemini", "partner_orders"), ("customer Acme orders", "partner_orders"),
+    ("hola", None), ("gracias!", None), ("/start", None),
+    ("¿qué productos tienen stock bajo y precio mayor a 100?", None),
+    ("resume las ventas del último trimestre por vendedor", None),
+    ("crea un presupuesto para Acme con 3 sillas", None),
+    ("¿cómo configuro una ruta de reabastecimiento?", None),
+    # Periodos y consultas agregadas: no son un nombre de contacto o producto
+    ("ventas del mes pasado", None), ("pedidos de hoy", None), ("orders from last week", None),
+    ("¿Cuántos pedidos hay?", None), ("cuántos clientes tenemos", None), ("¿cuál es el stock?", None),
+    ("ventas de este año", None), ("stock de todos los productos", None),
+]
+
+EXCLUDED = ['hola', 'hello', 'hi', 'hey', 'buenas', 'buenos', 'saludos',
+            'qué', 'que', 'cómo', 'como', 'ayuda', 'help', 'gracias', 'ok']
+LEGACY_CODES = [re.compile(r'^\s*([A-Z]+[_-]\d+)\s*$'), re.compile(r'^\s*([A-Z]+\d+[_-]\d+)\s*$')]
+
+
+def legacy_route(text):
+    """Detección anterior de detect_and_execute_tools (sin llamadas)"""
+    if any(pattern.match(text.upper()) for pattern in LEGACY_CODES):
+        return "product_code"
+    lower = text.lower()
+    if (len(text.split()) <= 3 and not any(word in lower for word in EXCLUDED)
+            and '?' not in text and not text.startswith('/')):
+        return "product_search"
+    return None
+
+
+async def _noop(query):
+    return query
+
+
+def main():
+    router = IntentRouter()
+    for intent in INTENT_PATTERNS:
+        router.register(intent, _noop)
+
+    print("=" * 80)
+    print("COBERTURA DEL ENRUTADOR DE INTENCIONES")
+    print("=" * 80)
+    print(f"{'mensaje':>48} | {'anterior':>14} | {'enrutador':>14}")
+    print("-" * 80)
+
+    legacy_routed = routed = 0
+    errors = []
+    for text, expected in CORPUS:
+        legacy = legacy_route(text)
+        route = router.match(text)
+        intent = route.intent if route else None
+        legacy_routed += legacy is not None
+        routed += intent is not None
+        if intent != expected:
+            errors.append((text, expected, intent))
+        print(f"{text[:48]:>48} | {legacy or '-':>14} | {intent or '-':>14}")
+
+    print("-" * 80)
+    # Enrutado no es respondido: si Odoo no devuelve nada, el manejador cede al LLM
+    print(f"Mensajes enrutados a una llamada directa: anterior {legacy_routed}/{len(CORPUS)}, "
+          f"enrutador {routed}/{len(CORPUS)}")
+    print(f"Clasificación según lo esperado: {len(CORPUS) - len(errors)}/{len(CORPUS)}")
+    for text, expected, intent in errors:
+        print(f"  ✗ {text!r}: esperado {expected}, obtenido {intent}")
+    if errors:
+        sys.exit(1)
+
+    repeat = 2000
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text, _ in CORPUS:
+            router.match(text)
+    elapsed = (time.perf_counter() - start) / (repeat * len(CORPUS))
+    print(f"Clasificación: {elapsed * 1e6:.1f} µs por mensaje (frente a una ida y vuelta al LLM)")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(1)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Benchmark de transportes de Odoo: XML-RPC (/xmlrpc/2/object) frente a JSON-RPC (/jsonrpc).
+
+Levanta un servidor local que imita a Odoo y mide, para lecturas de 10, 1k y 50k
+registros de product.product:
+- tiempo de codificación/decodificación de la respuesta en el cliente
+- tamaño del payload de respuesta
+- latencia extremo a extremo de OdooXMLRPCClient.search_read
+"""
+
+import json
+import sys
+import threading
+import time
+import xmlrpc.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tools.odoo_xmlrpc_client import OdooXMLRPCClient
+
+SIZES = [10, 1000, 50000]
+REPEAT = {10: 50, 1000: 10, 50000: 2}
+
+
+def make_records(count):
+    """Registros sintéticos con la forma de product.product en Odoo"""
+    return [
+        {
+            'id': i,
+            'name': f'Producto de prueba {i}',
+            'default_code': f'REF-{i:06d}',
+            'barcode': f'750{i:010d}',
+            'type': 'product',
+            'categ_id': [i % 50 + 1, f'Todos / Categoría {i % 50}'],
+            'list_price': round(10 + i * 0.37, 2),
+            'standard_price': round(5 + i * 0.11, 2),
+            'qty_available': float(i % 120),
+            'uom_id': [1, 'Unidades'],
+            'active': True,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+class FakeOdooHandler(BaseHTTPRequestHandler):
+    """Servidor mínimo que responde version/authenticate/execute_kw por ambos transportes"""
+    protocol_version = "HTTP/1.1"
+    # Cabeceras y cuerpo van en escrituras separadas: sin esto Nagle añade ~40 ms
+    disable_nagle_algorithm = True
+    records = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _dispatch(self, method, args):
+        if method == 'version':
+            return {'server_version': '17.0'}
+        if method == 'authenticate':
+            return 2
+        if method == 'execute_kw':
+            kwargs = args[6] if len(args) > 6 else {}
+            limit = kwargs.get('limit') or 100
+            if limit not in self.records:
+                self.records[limit] = make_records(limit)
+            return self.records[limit]
+        raise ValueError(f"Método no soportado: {method}")
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.path == '/jsonrpc':
+            request = json.loads(body)
+            result = self._dispatch(request['params']['method'], request['params']['args'])
+            payload = json.dumps({'jsonrpc': '2.0', 'id': request['id'], 'result': result}).encode()
+            content_type = 'application/json'
+        else:
+            params, method = xmlrpc.client.loads(body, use_builtin_types=True)
+            result = self._dispatch(method, params)
+            payload = xmlrpc.client.dumps((result,), methodresponse=True, allow_none=True).encode()
+            content_type = 'text/xml'
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOdooHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def best_of(repeat, func):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_marshalling(count):
+    """Codificación y decodificación de la respuesta, sin red"""
+    records = make_records(count)
+    repeat = REPEAT[count]
+
+    xml_payload = xmlrpc.client.dumps((records,), methodresponse=True, allow_none=True).encode()
+    json_payload = json.dumps({'jsonrpc': '2.0', 'id': 1, 'result': records}).encode()
+
+    return {
+        'xmlrpc': {
+            'bytes': len(xml_payload),
+            'encode': best_of(repeat, lambda: xmlrpc.client.dumps((records,), methodresponse=True, allow_none=True)),
+            'decode': best_of(repeat, lambda: xmlrpc.client.loads(xml_payload, use_builtin_types=True)),
+        },
+        'jsonrpc': {
+            'bytes': len(json_payload),
+            'encode': best_of(repeat, lambda: json.dumps({'jsonrpc': '2.0', 'id': 1, 'result': records})),
+            'decode': best_of(repeat, lambda: json.loads(json_payload)),
+        },
+    }
+
+
+def bench_end_to_end(url, transport, count):
+    client = OdooXMLRPCClient(url, 'bench', 'admin', 'admin', transport=transport)
+    client.connect()
+    return best_of(REPEAT[count], lambda: client.search_read('product.product', [], limit=count))
+
+
+def main():
+    server = start_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print("=" * 80)
+    print("BENCHMARK DE TRANSPORTES ODOO: XML-RPC vs JSON-RPC")
+    print("=" * 80)
+    print(f"Servidor local: {url}")
+    print()
+
+    results = {}
+    for count in SIZES:
+        results[count] = bench_marshalling(count)
+        for transport in ('xmlrpc', 'jsonrpc'):
+            results[count][transport]['e2e'] = bench_end_to_end(url, transport, count)
+
+    print(f"{'registros':>9} | {'transporte':>10} | {'bytes':>12} | {'encode (ms)':>11} | "
+          f"{'decode (ms)':>11} | {'e2e (ms)':>9}")
+    print("-" * 80)
+    for count in SIZES:
+        for transport in ('xmlrpc', 'jsonrpc'):
+            r = results[count][transport]
+            print(f"{count:>9} | {transport:>10} | {r['bytes']:>12,} | {r['encode'] * 1000:>11.2f} | "
+                  f"{r['decode'] * 1000:>11.2f} | {r['e2e'] * 1000:>9.2f}")
+        xml, jsn = results[count]['xmlrpc'], results[count]['jsonrpc']
+        print(f"{'':>9} | {'ratio':>10} | {xml['bytes'] / jsn['bytes']:>11.1f}x | "
+              f"{xml['encode'] / jsn['encode']:>10.1f}x | {xml['decode'] / jsn['decode']:>10.1f}x | "
+              f"{xml['e2e'] / jsn['e2e']:>8.1f}x")
+        print("-" * 80)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(1)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Frescura del índice local de productos ante cambios en product.template.
+
+En Odoo, name, list_price y categ_id (y default_code con una sola variante) se guardan
+en product.template: editarlos no cambia el write_date de product.product. Este script
+sustituye execute_mcp_tool por un Odoo en memoria (search_records con dominios), carga
+el índice, renombra y cambia de precio una plantilla y comprueba que el siguiente delta
+lleva el cambio a product_index.search(). Mide también el coste de ese delta.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ["ODOO_MCP_ENABLED"] = "false"
+
+import agent.agent_main as agent_main
+
+TEMPLATES = int(os.getenv("BENCH_TEMPLATES", "2000"))
+VARIANTS_PER_TEMPLATE = 2
+BASE_DATE = datetime(2024, 1, 1)
+
+
+def _date(minutes):
+    return (BASE_DATE + timedelta(minutes=minutes)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class FakeOdoo:
+    """product.template y product.product (con los campos relacionados de la plantilla) en memoria"""
+
+    def __init__(self):
+        self.templates = {
+            tid: {"id": tid, "name": f"Silla modelo {tid}", "list_price": 10.0 + tid,
+                  "categ_id": [1, "Todos"], "write_date": _date(tid), "active": True}
+            for tid in range(1, TEMPLATES + 1)
+        }
+        self.variants = {}
+        for tid in self.templates:
+            for n in range(VARIANTS_PER_TEMPLATE):
+                vid = (tid - 1) * VARIANTS_PER_TEMPLATE + n + 1
+                self.variants[vid] = {"id": vid, "product_tmpl_id": tid, "default_code": f"REF-{vid:06d}",
+                                      "barcode": False, "standard_price": 5.0, "qty_available": 3.0,
+                                      "write_date": _date(tid), "active": True}
+        self.calls = 0
+
+    def _product(self, variant):
+        template = self.templates[variant["product_tmpl_id"]]
+        return {**variant, "name": template["name"], "list_price": template["list_price"],
+                "categ_id": template["categ_id"]}
+
+    def _rows(self, model):
+        if model == "product.template":
+            return list(self.templates.values())
+        if model == "product.product":
+            return [self._product(v) for v in self.variants.values()]
+        return []
+
+    @staticmethod
+    def _leaf(row, leaf):
+        field, op, value = leaf
+        current = row.get(field)
+        if op == "=":
+            return current == value
+        if op == ">":
+            return current > value
+        if op == ">=":
+            return current >= value
+        if op == "in":
+            return current in value
+        raise ValueError(f"Operador no soportado: {op}")
+
+    def _match(self, row, domain):
+        """Dominio en notación prefija ('|', '&' y hojas; el resto se une con AND)"""
+        def evaluate(index):
+            item = domain[index]
+            if item in ("|", "&"):
+                left, index = evaluate(index + 1)
+                right, index = evaluate(index)
+                return (left or right) if item == "|" else (left and right), index
+            return self._leaf(row, item), index + 1
+
+        index = 0
+        while index < len(domain):
+            result, index = evaluate(index)
+            if not result:
+                return False
+        return True
+
+    async def execute_mcp_tool(self, tool_name, arguments, use_cache=True):
+        self.calls += 1
+        assert tool_name == "search_records", tool_name
+        domain = arguments["domain"]
+        if not any(isinstance(leaf, list) and leaf[0] == "active" for leaf in domain):
+            domain = domain + [["active", "=", True]]
+        rows = [row for row in self._rows(arguments["model"]) if self._match(row, domain)]
+        if arguments.get("order", "").startswith("write_date"):
+            rows.sort(key=lambda row: (row["write_date"], row["id"]))
+        else:
+            rows.sort(key=lambda row: row["id"])
+        fields = set(arguments["fields"]) | {"id"}
+        return [{k: v for k, v in row.items() if k in fields} for row in rows[:arguments["limit"]]]
+
+
+async def run_check():
+    odoo = FakeOdoo()
+    agent_main.execute_mcp_tool = odoo.execute_mcp_tool
+
+    agent_main._ensure_product_index()
+    # Carga inicial y primera pasada de los bucles en segundo plano
+    while not (agent_main.product_index.loaded and agent_main.quant_sync.initialized):
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.1)
+    print(f"Índice cargado: {len(agent_main.product_index)} variantes de {TEMPLATES} plantillas")
+
+    target = TEMPLATES // 2
+    odoo.templates[target].update(name="Taburete Nórdico", list_price=99.5, write_date=_date(TEMPLATES + 60 * 24))
+    assert not agent_main.product_index.search("Taburete Nórdico"), "el cambio no debería verse aún"
+
+    odoo.calls = 0
+    start = time.perf_counter()
+    await agent_main.template_sync.sync_once()
+    elapsed = time.perf_counter() - start
+
+    found = agent_main.product_index.search("Taburete Nórdico")
+    assert len(found) == VARIANTS_PER_TEMPLATE, found
+    assert all(record["list_price"] == 99.5 for record in found), found
+    assert not agent_main.product_index.search(f"Silla modelo {target}"), "el nombre anterior sigue indexado"
+
+    print(f"Renombrado de plantilla visible en product_index.search(): OK "
+          f"({len(found)} variantes, {odoo.calls} llamadas MCP, {elapsed * 1000:.1f} ms)")
+    await agent_main.shutdown_agent()
+
+
+def main():
+    print("=" * 80)
+    print("FRESCURA DEL ÍNDICE DE PRODUCTOS ANTE CAMBIOS EN PLANTILLAS")
+    print("=" * 80)
+    asyncio.run(run_check())
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(1)
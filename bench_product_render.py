@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark del formateo de resultados de SearchProductsTool.
+
+- Formato anterior: concatenación con `result +=` bloque a bloque, sin límite de tamaño
+- render_products detallado sin límite: debe producir exactamente el mismo texto
+- render_products detallado con el límite por defecto (PRODUCT_RENDER_MAX_CHARS)
+- render_products compacto (una línea por producto) con el límite por defecto
+"""
+
+import random
+import sys
+import time
+
+from tools.product_renderer import render_products, PRODUCT_RENDER_MAX_CHARS
+
+SIZES = [10, 50, 500]
+
+
+def legacy_render(products):
+    """Formato anterior de SearchProductsTool._run"""
+    result = f"Se encontraron {len(products)} producto(s):\n\n"
+
+    for idx, product in enumerate(products, 1):
+        result += f"══════════════════════════════════════\n"
+        result += f"#{idx} - {product.get('name')} (ID: {product.get('id')})\n"
+        result += f"══════════════════════════════════════\n"
+
+        if product.get('default_code'):
+            result += f"📋 Referencia interna: {product.get('default_code')}\n"
+        if product.get('barcode'):
+            result += f"🔢 Código de barras: {product.get('barcode')}\n"
+
+        result += f"💰 Precio de venta: ${product.get('list_price', 0):.2f}\n"
+        result += f"💵 Costo: ${product.get('standard_price', 0):.2f}\n"
+        result += f"📦 Stock disponible: {product.get('qty_available', 0)}\n"
+
+        if product.get('categ_id'):
+            result += f"🏷️  Categoría: {product['categ_id'][1]}\n"
+        if product.get('uom_id'):
+            result += f"📏 Unidad: {product['uom_id'][1]}\n"
+
+        result += "\n"
+
+    if len(products) > 1:
+        result += "ℹ️  Se encontraron múltiples productos. Verifica la referencia interna para identificar el correcto.\n"
+
+    return result
+
+
+def make_products(count):
+    random.seed(3)
+    return [
+        {
+            "id": i,
+            "name": f"Escritorio de roble modelo {i}",
+            "default_code": f"ESC-{i:05d}" if i % 4 else False,
+            "barcode": f"750{i:010d}" if i % 3 else False,
+            "type": "product",
+            "categ_id": [5, "Todos / Oficina / Escritorios"],
+            "list_price": round(random.uniform(50, 900), 2),
+            "standard_price": round(random.uniform(20, 500), 2),
+            "qty_available": float(random.randint(0, 80)),
+            "uom_id": [1, "Unidades"],
+            "active": True,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def timed(func, repeat=300):
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best
+
+
+def main():
+    print("=" * 80)
+    print("MICROBENCHMARK DEL FORMATEO DE PRODUCTOS")
+    print("=" * 80)
+
+    for size in SIZES:
+        products = make_products(size)
+        assert render_products(products, compact=False, max_chars=0) == legacy_render(products)
+    print("El formato detallado sin límite coincide con el anterior: OK")
+    print(f"Límite por defecto: {PRODUCT_RENDER_MAX_CHARS:,} caracteres")
+    print()
+
+    print(f"{'productos':>9} | {'formato':>22} | {'tiempo (µs)':>11} | {'caracteres':>10} | {'productos mostrados':>19}")
+    print("-" * 80)
+    for size in SIZES:
+        products = make_products(size)
+        variants = [
+            ("anterior (+=)", lambda: legacy_render(products)),
+            ("detallado sin límite", lambda: render_products(products, compact=False, max_chars=0)),
+            ("detallado con límite", lambda: render_products(products, compact=False)),
+            ("compacto con límite", lambda: render_products(products, compact=True)),
+        ]
+        for label, func in variants:
+            elapsed = timed(func, repeat=max(10, 3000 // size))
+            text = func()
+            shown = text.count("\n#") + text.startswith("#") if "(ID: " in text else 0
+            print(f"{size:>9} | {label:>22} | {elapsed * 1e6:>11.1f} | {len(text):>10,} | {shown:>19}")
+        print("-" * 80)
+
+    print("Con límite, lo que no cabe se resume en una línea \"… y N producto(s) más\".")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(1)
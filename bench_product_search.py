@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Benchmark del planificador por etapas de get_products frente a la búsqueda OR original.
+
+Levanta un servidor XML-RPC local que imita a Odoo con un catálogo de 100k productos en
+SQLite (índices en barcode, default_code y name, como en la base de Odoo) y traduce los
+dominios a SQL: ilike es LIKE '%...%' (recorre la tabla), la igualdad usa los índices
+y categ_id.name añade un join con las categorías, igual que el ORM. Los resultados
+se ordenan por default_code, name, id (el _order de product.product).
+
+Para cada tipo de consulta mide la latencia de:
+- la búsqueda original: un único dominio OR de ilike en nombre, referencia, código de
+  barras y categoría
+- el planificador: barcode exacto -> default_code exacto -> OR difuso (las dos etapas
+  exactas solo si la consulta parece un código; el texto libre va directo al OR)
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import xmlrpc.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tools.odoo_xmlrpc_client import (
+    OdooXMLRPCClient,
+    PRODUCT_LIST_FIELDS,
+    product_search_domain,
+    product_search_plan,
+)
+
+PRODUCTS = int(os.getenv("BENCH_PRODUCTS", "100000"))
+CATEGORIES = 200
+REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+LIMIT = 50
+
+NOUNS = ["Silla", "Mesa", "Lámpara", "Escritorio", "Estante", "Archivador", "Monitor", "Teclado",
+         "Ratón", "Cable", "Cuaderno", "Bolígrafo", "Impresora", "Papel", "Sofá", "Armario"]
+ADJECTIVES = ["ergonómica", "plegable", "de roble", "metálica", "compacta", "industrial",
+              "premium", "básica", "ajustable", "inalámbrica", "reforzada", "ecológica"]
+
+COLUMNS = {
+    'id': 'p.id', 'name': 'p.name', 'default_code': 'p.default_code', 'barcode': 'p.barcode',
+    'active': 'p.active', 'categ_id.name': 'c.name',
+}
+
+
+def seed_database(path):
+    """Catálogo sintético con la forma de product.product"""
+    random.seed(42)
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE category (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE product (
+            id INTEGER PRIMARY KEY, name TEXT COLLATE NOCASE, default_code TEXT COLLATE NOCASE,
+            barcode TEXT, type TEXT, categ_id INTEGER, list_price REAL, standard_price REAL,
+            qty_available REAL, active INTEGER
+        );
+    """)
+    db.executemany("INSERT INTO category VALUES (?, ?)",
+                   [(i, f"Todos / Categoría {i}") for i in range(1, CATEGORIES + 1)])
+    db.executemany(
+        "INSERT INTO product VALUES (?, ?, ?, ?, 'product', ?, ?, ?, ?, 1)",
+        [
+            (i, f"{random.choice(NOUNS)} {random.choice(ADJECTIVES)} modelo {i}", f"REF-{i:06d}",
+             f"750{i:010d}", random.randint(1, CATEGORIES), round(random.uniform(5, 900), 2),
+             round(random.uniform(2, 500), 2), float(random.randint(0, 200)))
+            for i in range(1, PRODUCTS + 1)
+        ]
+    )
+    db.executescript("""
+        CREATE UNIQUE INDEX product_barcode ON product (barcode);
+        CREATE INDEX product_default_code ON product (default_code);
+        CREATE INDEX product_name ON product (name);
+    """)
+    db.commit()
+    db.close()
+
+
+def domain_to_sql(domain):
+    """Traduce un dominio de Odoo (notación prefija, AND implícito) a SQL"""
+    params = []
+    pos = 0
+
+    def term():
+        nonlocal pos
+        token = domain[pos]
+        pos += 1
+        if token in ('|', '&'):
+            left, right = term(), term()
+            return f"({left} {'OR' if token == '|' else 'AND'} {right})"
+        if token == '!':
+            return f"(NOT {term()})"
+
+        field, op, value = token
+        column = COLUMNS[field]
+        if op == '=':
+            params.append(value)
+            return f"{column} = ?"
+        if op == 'ilike':
+            params.append(f"%{value}%")
+            return f"{column} LIKE ?"
+        if op in ('in', 'not in'):
+            params.extend(value)
+            return f"{column} {op.upper()} ({', '.join('?' * len(value)) or 'NULL'})"
+        if op in ('<', '>', '<=', '>='):
+            params.append(value)
+            return f"{column} {op} ?"
+        raise ValueError(f"Operador no soportado: {op}")
+
+    terms = []
+    while pos < len(domain):
+        terms.append(term())
+    return " AND ".join(terms) or "1", params, any(
+        isinstance(t, (list, tuple)) and t[0].startswith('categ_id.') for t in domain
+    )
+
+
+class FakeOdooHandler(BaseHTTPRequestHandler):
+    """Servidor XML-RPC mínimo: version, authenticate y execute_kw(search_read) sobre SQLite"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    db_path = None
+    local = threading.local()
+
+    def log_message(self, *args):
+        pass
+
+    def _db(self):
+        if not hasattr(self.local, 'db'):
+            self.local.db = sqlite3.connect(self.db_path)
+        return self.local.db
+
+    def _search_read(self, domain, options):
+        where, params, needs_join = domain_to_sql(domain)
+        join = "JOIN category c ON c.id = p.categ_id" if needs_join else ""
+        sql = (f"SELECT p.id, p.name, p.default_code, p.barcode, p.type, p.categ_id, cat.name, "
+               f"p.list_price, p.standard_price, p.qty_available, p.active "
+               f"FROM product p {join} JOIN category cat ON cat.id = p.categ_id "
+               f"WHERE {where} ORDER BY p.default_code, p.name, p.id LIMIT ?")
+        rows = self._db().execute(sql, params + [options.get('limit') or -1]).fetchall()
+        return [
+            {'id': r[0], 'name': r[1], 'default_code': r[2], 'barcode': r[3], 'type': r[4],
+             'categ_id': [r[5], r[6]], 'list_price': r[7], 'standard_price': r[8],
+             'qty_available': r[9], 'uom_id': [1, 'Unidades'], 'active': bool(r[10])}
+            for r in rows
+        ]
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        params, method = xmlrpc.client.loads(body, use_builtin_types=True)
+        if method == 'version':
+            result = {'server_version': '17.0'}
+        elif method == 'authenticate':
+            result = 2
+        else:
+            result = self._search_read(params[5][0], params[6] if len(params) > 6 else {})
+
+        payload = xmlrpc.client.dumps((result,), methodresponse=True, allow_none=True).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start_server(db_path):
+    FakeOdooHandler.db_path = db_path
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOdooHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def best_of(func):
+    best, result = float('inf'), None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    tmpdir = tempfile.mkdtemp(prefix="bench_odoo_")
+    db_path = os.path.join(tmpdir, "odoo.sqlite")
+
+    print("=" * 80)
+    print("BENCHMARK DEL PLANIFICADOR DE BÚSQUEDA DE PRODUCTOS")
+    print("=" * 80)
+
+    start = time.perf_counter()
+    seed_database(db_path)
+    print(f"Catálogo sintético: {PRODUCTS:,} productos en SQLite ({time.perf_counter() - start:.1f} s)")
+
+    server = start_server(db_path)
+    client = OdooXMLRPCClient(f"http://127.0.0.1:{server.server_address[1]}", 'bench', 'admin', 'admin')
+    client.connect()
+
+    sample = PRODUCTS // 2 + 321
+    queries = [
+        ("código de barras", f"750{sample:010d}"),
+        ("referencia", f"REF-{sample:06d}"),
+        ("nombre", "Lámpara"),
+        ("palabra interna", "ergonómica"),
+        ("categoría", "Categoría 17"),
+        ("sin resultados", "zzzz-inexistente"),
+        ("código inexistente", "REF-9999999"),
+    ]
+
+    def legacy(query):
+        return client.search_read('product.product', product_search_domain(query), PRODUCT_LIST_FIELDS, limit=LIMIT)
+
+    print(f"Mejor de {REPEAT} ejecuciones, límite {LIMIT}")
+    print()
+    print(f"{'consulta':>18} | {'OR original (ms)':>16} | {'planificador (ms)':>17} | {'ratio':>6} | "
+          f"{'hits':>9} | {'etapas':>6}")
+    print("-" * 80)
+
+    for label, query in queries:
+        legacy_time, legacy_hits = best_of(lambda: legacy(query))
+        planner_time, planner_hits = best_of(lambda: client.get_products(query, LIMIT))
+
+        # Etapas que ejecuta el planificador antes de parar
+        stages, found = 0, 0
+        for stage, domain in product_search_plan(query):
+            stages += 1
+            found += len(client.search_read('product.product', domain, ['id'], limit=LIMIT))
+            if found >= LIMIT or (found and stage in ('barcode', 'default_code')):
+                break
+
+        print(f"{label:>18} | {legacy_time * 1000:>16.2f} | {planner_time * 1000:>17.2f} | "
+              f"{legacy_time / planner_time:>5.1f}x | {len(legacy_hits):>4}/{len(planner_hits):<4} | {stages:>6}")
+
+    print("-" * 80)
+    print("hits = resultados OR original / planificador. Los códigos paran en la etapa exacta que")
+    print("encuentra; el texto libre hace una sola llamada, la misma que el OR original. Solo un")
+    print("código que no existe paga las tres etapas.")
+    print("=" * 80)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(1)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark del codificador compacto de resultados de herramientas.
+
+Compara los tokens que ocupa una lista de productos en el prompt de la segunda
+llamada al LLM según cómo se serializa:
+- repr de Python (str(result), lo que devolvía odoo_tools_wrapper)
+- JSON indentado (texto típico de search_records en el servidor MCP)
+- tabla del codificador (cabecera una vez, many2one aplanados)
+
+Cuenta tokens con tiktoken si está instalado (cl100k_base); si no, con la
+estimación de 4 caracteres por token.
+"""
+
+import json
+import random
+import sys
+import time
+
+from tools.result_encoder import encode_result, estimate_tokens
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count_tokens(text):
+        return len(_encoding.encode(text))
+    TOKENIZER = "tiktoken cl100k_base"
+except Exception:
+    count_tokens = estimate_tokens
+    TOKENIZER = "estimación (4 caracteres/token)"
+
+SIZES = [10, 50, 200]
+
+CATEGORIES = [[4, "Todos / Oficina / Sillas"], [7, "Todos / Oficina / Mesas"], [9, "Todos / Iluminación"]]
+
+
+def make_products(count):
+    """Productos con los campos de PRODUCT_LIST_FIELDS"""
+    random.seed(7)
+    return [
+        {
+            "id": i,
+            "name": f"Silla ergonómica modelo {i}",
+            "default_code": f"REF-{i:05d}",
+            "barcode": f"750{i:010d}" if i % 3 else False,
+            "type": "product",
+            "categ_id": random.choice(CATEGORIES),
+            "list_price": round(random.uniform(10, 900), 2),
+            "standard_price": round(random.uniform(5, 500), 2),
+            "qty_available": float(random.randint(0, 120)),
+            "uom_id": [1, "Unidades"],
+            "active": True,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def timed(func, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def check_correctness():
+    """Los ceros (stock o precio) se conservan; False, None y vacíos se omiten"""
+    record = {"id": 5, "name": "Silla", "qty_available": 0.0, "list_price": 0,
+              "active": True, "barcode": False, "description": None}
+    lines = encode_result(json.dumps(record)).splitlines()
+    assert lines == ["id: 5", "name: Silla", "qty_available: 0", "list_price: 0", "active: sí"], lines
+
+    table = encode_result([record, dict(record, id=6, qty_available=3.5)]).splitlines()
+    assert table[2].split("\t")[2:4] == ["0", "0"], table
+
+
+def main():
+    print("=" * 80)
+    print("BENCHMARK DEL CODIFICADOR DE RESULTADOS DE HERRAMIENTAS")
+    print("=" * 80)
+    check_correctness()
+    print("Comprobaciones de corrección (ceros, vacíos): OK")
+    print(f"Tokenizador: {TOKENIZER}")
+    print("Sin límite de tokens (TOOL_RESULT_MAX_TOKENS=0) para comparar la misma información")
+    print()
+    print(f"{'productos':>9} | {'repr':>7} | {'JSON':>7} | {'tabla':>7} | {'ahorro vs repr':>14} | "
+          f"{'ahorro vs JSON':>14} | {'codificar (ms)':>14}")
+    print("-" * 80)
+
+    for size in SIZES:
+        products = make_products(size)
+        as_repr = str(products)
+        as_json = json.dumps(products, ensure_ascii=False, indent=2)
+        table = encode_result(as_json, max_tokens=0)
+
+        repr_tokens = count_tokens(as_repr)
+        json_tokens = count_tokens(as_json)
+        table_tokens = count_tokens(table)
+        encode_time = timed(lambda: encode_result(as_json, max_tokens=0))
+
+        print(f"{size:>9} | {repr_tokens:>7,} | {json_tokens:>7,} | {table_tokens:>7,} | "
+              f"{1 - table_tokens / repr_tokens:>13.0%} | {1 - table_tokens / json_tokens:>13.0%} | "
+              f"{encode_time * 1000:>14.2f}")
+
+    print("-" * 80)
+    products = make_products(200)
+    budgeted = encode_result(str(products))
+    print(f"Con el presupuesto por defecto, 200 productos ocupan {count_tokens(budgeted):,} tokens:")
+    print(f"  {budgeted.splitlines()[-1]}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(1)
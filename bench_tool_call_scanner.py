@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark y comprobaciones del detector incremental de peticiones de herramienta.
+
+- Peor caso de la expresión regular anterior ({.*"action".*"use_tool".*}): sobre
+  salidas largas con muchas llaves y "action" pero sin petición, retrocede y el
+  tiempo crece de forma polinómica con la longitud.
+- ToolCallScanner recorre el texto una vez (lineal), fragmento a fragmento.
+- Comprobaciones de corrección: cadenas con llaves, escapes, objetos partidos en
+  fragmentos de un carácter y varias peticiones en la misma respuesta.
+"""
+
+import json
+import re
+import sys
+import time
+
+from agent.tool_call_scanner import ToolCallScanner
+
+# Expresión regular que usaba run_agent antes del detector incremental
+LEGACY_PATTERN = re.compile(r'\{[\s\S]*"action"[\s\S]*"use_tool"[\s\S]*\}')
+
+SIZES = [125, 250, 500]
+
+
+def legacy_detect(text):
+    """Detección anterior: regex voraz + json.loads"""
+    match = LEGACY_PATTERN.search(text)
+    if not match:
+        return []
+    try:
+        return [json.loads(match.group())]
+    except json.JSONDecodeError:
+        return []
+
+
+def scan(text, chunk_size=None):
+    scanner = ToolCallScanner()
+    if chunk_size is None:
+        scanner.feed(text)
+    else:
+        for i in range(0, len(text), chunk_size):
+            scanner.feed(text[i:i + chunk_size])
+    return scanner
+
+
+def worst_case(repeats):
+    """Salida sin petición de herramienta, con muchas llaves y claves "action" """
+    return '{"action": "x", ' * repeats
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def check_correctness():
+    request = {"action": "use_tool", "tool_name": "search_records",
+               "parameters": {"model": "product.product", "domain": [["name", "ilike", "a}{\"b"]]}}
+    text = f"Voy a buscar el producto.\n```json\n{json.dumps(request, ensure_ascii=False)}\n```"
+
+    # Misma petición que la regex en el caso sencillo, en un solo fragmento o carácter a carácter
+    assert legacy_detect(text) == [request]
+    assert scan(text).requests == [request]
+    assert scan(text, chunk_size=1).requests == [request]
+    assert scan(text, chunk_size=7).first_object_at == text.index("{")
+
+    # Texto sin petición: nada que ejecutar
+    assert scan("Hola, ¿en qué te ayudo? {no es json}").requests == []
+    assert scan('{"action": "otra_cosa"}').requests == []
+
+    # Llaves y comillas escapadas dentro de cadenas no desequilibran el objeto
+    tricky = {"action": "use_tool", "tool_name": "x", "parameters": {"q": "\\\"}{\\"}}
+    assert scan(json.dumps(tricky), chunk_size=1).requests == [tricky]
+
+    # JSON inválido con "use_tool": se cuenta y no se ejecuta
+    broken = scan('{"action": "use_tool", "tool_name": x}')
+    assert broken.requests == [] and broken.invalid == 1
+
+    # Dos peticiones en la misma respuesta: la regex voraz las junta y falla
+    second = {"action": "use_tool", "tool_name": "get_record", "parameters": {"record_id": 7}}
+    both = json.dumps(request) + "\n" + json.dumps(second)
+    assert legacy_detect(both) == []
+    assert scan(both, chunk_size=3).requests == [request, second]
+
+    # La petición se detecta en el fragmento en que se cierra, antes del final del texto
+    scanner = ToolCallScanner()
+    chunks = [json.dumps(second)[:-1], "}", " y ahora sigo escribiendo..."]
+    assert scanner.feed(chunks[0]) == []
+    assert scanner.feed(chunks[1]) == [second]
+    assert scanner.feed(chunks[2]) == []
+
+
+def main():
+    print("=" * 80)
+    print("BENCHMARK DEL DETECTOR INCREMENTAL DE PETICIONES DE HERRAMIENTA")
+    print("=" * 80)
+
+    check_correctness()
+    print("Comprobaciones de corrección: OK")
+    print()
+
+    print(f"{'repeticiones':>12} | {'caracteres':>10} | {'regex (ms)':>11} | {'scanner (ms)':>12} | {'ratio':>8}")
+    print("-" * 80)
+    for repeats in SIZES:
+        text = worst_case(repeats)
+        regex_time = timed(lambda: LEGACY_PATTERN.search(text))
+        scanner_time = timed(lambda: scan(text, chunk_size=20))
+        print(f"{repeats:>12} | {len(text):>10,} | {regex_time * 1000:>11.2f} | "
+              f"{scanner_time * 1000:>12.2f} | {regex_time / scanner_time:>7.0f}x")
+    print("-" * 80)
+    print("La regex crece de forma polinómica con la longitud; el detector, de forma lineal.")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(1)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark de selección de herramientas por mensaje: tamaño del prompt y latencia
+con el catálogo completo frente al top-k elegido por BM25.
+
+Usa un catálogo sintético con las 12 herramientas del servidor MCP de Odoo más
+herramientas adicionales para simular el crecimiento del servidor.
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ["ODOO_MCP_ENABLED"] = "false"
+
+from agent.tool_selector import ToolSelector
+
+EXTRA_TOOLS = int(os.getenv("BENCH_EXTRA_TOOLS", "40"))
+TOP_K = int(os.getenv("BENCH_TOP_K", "5"))
+
+QUERIES = [
+    "¿Cuántos productos hay en la categoría Oficina?",
+    "Busca el cliente ABC Company y dame su teléfono",
+    "Crea un nuevo contacto llamado Juan Pérez",
+    "¿Qué campos tiene el modelo sale.order?",
+    "Actualiza el precio del producto 42 a 19.99",
+    "Muéstrame las órdenes de venta del cliente 123",
+    "¿Cuál es el estado del servidor?",
+]
+
+
+def _schema(**props):
+    return {
+        "type": "object",
+        "properties": {name: {"type": kind, "description": desc} for name, (kind, desc) in props.items()},
+        "required": list(props)[:1],
+    }
+
+
+def build_catalogue(extra: int):
+    model = ("string", "Technical name of the Odoo model, e.g. product.product")
+    domain = ("array", "Odoo search domain as a list of [field, operator, value] triples")
+    fields = ("array", "List of field names to return")
+    record_id = ("integer", "Database id of the record")
+    values = ("object", "Field values to write")
+    tools = [
+        ("list_models", "List all models available in the Odoo instance", _schema()),
+        ("search_records", "Search records in a model using a domain filter",
+         _schema(model=model, domain=domain, fields=fields, limit=("integer", "Maximum number of records"),
+                 offset=("integer", "Number of records to skip"), order=("string", "Sort order"))),
+        ("get_record", "Get a specific record by id", _schema(model=model, record_id=record_id, fields=fields)),
+        ("create_record", "Create a new record in a model", _schema(model=model, values=values)),
+        ("update_record", "Update an existing record", _schema(model=model, record_id=record_id, values=values)),
+        ("delete_record", "Delete a record", _schema(model=model, record_id=record_id)),
+        ("execute_method", "Execute a method of a model",
+         _schema(model=model, method=("string", "Method name"), args=("array", "Positional arguments"),
+                 kwargs=("object", "Keyword arguments"))),
+        ("search_count", "Count records matching a domain", _schema(model=model, domain=domain)),
+        ("get_model_fields", "Get the fields of a model and their types", _schema(model=model)),
+        ("model_info", "Information about a model", _schema(model=model)),
+        ("server_status", "Status of the Odoo server", _schema()),
+        ("cache_stats", "Statistics of the server cache", _schema()),
+    ]
+    topics = ["inventory", "accounting", "payroll", "fleet", "maintenance", "helpdesk", "survey", "website"]
+    for i in range(extra):
+        topic = topics[i % len(topics)]
+        tools.append((
+            f"{topic}_report_{i}",
+            f"Generate the {topic} report number {i} with aggregated figures for a period",
+            _schema(date_from=("string", "Start date"), date_to=("string", "End date"),
+                    company_id=("integer", "Company"), group_by=("string", "Grouping field")),
+        ))
+    return [{"name": n, "description": d, "inputSchema": s} for n, d, s in tools]
+
+
+def count_tokens(text: str) -> int:
+    try:
+        import tiktoken
+        return len(tiktoken.get_encoding("cl100k_base").encode(text))
+    except Exception:
+        return len(text) // 4
+
+
+def main():
+    import agent.agent_main as agent_main
+
+    tools = build_catalogue(EXTRA_TOOLS)
+
+    start = time.perf_counter()
+    selector = ToolSelector(tools, always_include=agent_main.AGENT_CORE_TOOLS)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    full_prompt = agent_main.render_agent_prompt(tools)
+    full_tokens = count_tokens(full_prompt)
+
+    print("=" * 80)
+    print("BENCHMARK DE SELECCIÓN DE HERRAMIENTAS")
+    print("=" * 80)
+    print(f"Herramientas en el catálogo: {len(tools)} | top-k: {TOP_K} | índice BM25 construido en {build_ms:.2f} ms")
+    print(f"Prompt completo: {len(full_prompt):,} caracteres, ~{full_tokens:,} tokens")
+    print()
+
+    total_tokens = 0
+    for query in QUERIES:
+        start = time.perf_counter()
+        for _ in range(100):
+            subset = selector.select(query, TOP_K)
+        select_us = (time.perf_counter() - start) / 100 * 1e6
+
+        start = time.perf_counter()
+        prompt = agent_main.render_agent_prompt(subset)
+        render_us = (time.perf_counter() - start) * 1e6
+
+        tokens = count_tokens(prompt)
+        total_tokens += tokens
+        print(f"• {query}")
+        print(f"  herramientas: {', '.join(t['name'] for t in subset)}")
+        print(f"  prompt: {len(prompt):,} caracteres, ~{tokens:,} tokens "
+              f"({tokens / full_tokens:.0%} del completo) | selección {select_us:.0f} µs | render {render_us:.0f} µs")
+
+    avg = total_tokens / len(QUERIES)
+    print()
+    print("-" * 80)
+    print(f"Tokens de prompt promedio: {avg:,.0f} frente a {full_tokens:,} "
+          f"({1 - avg / full_tokens:.0%} menos por mensaje)")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(1)
@@ -0,0 +1,135 @@
+"""
+Procesador de updates de Telegram con paralelismo entre chats y orden estricto por chat
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Dict, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+# Configuración del dispatcher
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "8"))
+BOT_MAX_PENDING_UPDATES = int(os.getenv("BOT_MAX_PENDING_UPDATES", "256"))
+BOT_CHAT_QUEUE_SIZE = int(os.getenv("BOT_CHAT_QUEUE_SIZE", "20"))
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Procesa updates de chats distintos en paralelo manteniendo el orden dentro de cada chat.
+
+    Cada chat tiene su propia cola asíncrona. Un chat con trabajo pendiente se publica
+    en una cola de "chats listos" de la que consumen N workers; un chat nunca está en
+    manos de dos workers a la vez, así que sus mensajes se procesan en orden.
+
+    Backpressure: el semáforo de BaseUpdateProcessor limita los updates pendientes en
+    total (max_pending) y la cola de cada chat está acotada (chat_queue_size), de modo
+    que un chat que envía demasiado espera en lugar de acumular memoria.
+    """
+
+    def __init__(self, workers: int = BOT_WORKERS, max_pending: int = BOT_MAX_PENDING_UPDATES,
+                 chat_queue_size: int = BOT_CHAT_QUEUE_SIZE):
+        """
+        Args:
+            workers: Número de workers que procesan chats en paralelo
+            max_pending: Máximo de updates aceptados (en cola + en proceso)
+            chat_queue_size: Tamaño máximo de la cola de cada chat
+        """
+        super().__init__(max_concurrent_updates=max_pending)
+        self.workers = workers
+        self.chat_queue_size = chat_queue_size
+        self._chat_queues: Dict[Hashable, asyncio.Queue] = {}
+        self._pending: Dict[Hashable, int] = {}
+        self._scheduled: set = set()
+        self._ready: Optional[asyncio.Queue] = None
+        self._worker_tasks = []
+
+    @staticmethod
+    def _chat_key(update: object) -> Optional[Hashable]:
+        """Clave de orden del update (id del chat) o None si no pertenece a un chat"""
+        if isinstance(update, Update) and update.effective_chat:
+            return update.effective_chat.id
+        return None
+
+    async def initialize(self) -> None:
+        """Arranca los workers"""
+        self._ready = asyncio.Queue()
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(i), name=f"chat-dispatcher-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Dispatcher de chats iniciado con {self.workers} workers")
+
+    async def shutdown(self) -> None:
+        """Detiene los workers"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._chat_queues.clear()
+        self._pending.clear()
+        self._scheduled.clear()
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """Encola el update en la cola de su chat y espera a que termine"""
+        key = self._chat_key(update)
+        if key is None:
+            await coroutine
+            return
+
+        queue = self._chat_queues.get(key)
+        if queue is None:
+            queue = asyncio.Queue(maxsize=self.chat_queue_size)
+            self._chat_queues[key] = queue
+        # La cola del chat no se libera mientras tenga updates pendientes
+        self._pending[key] = self._pending.get(key, 0) + 1
+
+        done = asyncio.get_running_loop().create_future()
+        # Bloquea si la cola del chat está llena (backpressure)
+        await queue.put((coroutine, done))
+
+        if key not in self._scheduled:
+            self._scheduled.add(key)
+            self._ready.put_nowait(key)
+
+        await done
+
+    async def _worker(self, worker_id: int) -> None:
+        """Toma un chat listo, procesa su siguiente update y lo vuelve a publicar si quedan más"""
+        while True:
+            key = await self._ready.get()
+            queue = self._chat_queues.get(key)
+            if queue is None or queue.empty():
+                self._scheduled.discard(key)
+                continue
+
+            coroutine, done = queue.get_nowait()
+            try:
+                await coroutine
+            except Exception as e:
+                logger.error(f"Error procesando update del chat {key}: {e}")
+            finally:
+                if not done.done():
+                    done.set_result(None)
+
+            self._pending[key] -= 1
+            if self._pending[key] == 0:
+                # Nada pendiente: liberar el chat y su cola
+                self._scheduled.discard(key)
+                del self._pending[key]
+                del self._chat_queues[key]
+            elif queue.empty():
+                # Hay un update esperando hueco en la cola; él volverá a publicar el chat
+                self._scheduled.discard(key)
+            else:
+                # Reencolar al final para repartir los workers entre chats
+                self._ready.put_nowait(key)
+
+    @property
+    def active_chats(self) -> int:
+        """Número de chats con updates pendientes o en proceso"""
+        return len(self._scheduled)
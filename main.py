@@ -1,8 +1,12 @@
+import asyncio
 import os
 import sys
+import time
 import logging
 from dotenv import load_dotenv
 from telegram import Update
+from telegram.constants import MessageLimit
+from telegram.error import BadRequest, RetryAfter
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 
 load_dotenv()
@@ -21,7 +25,92 @@ if not os.getenv("TELEGRAM_BOT_TOKEN"):
     logger.error("TELEGRAM_BOT_TOKEN no está configurado en las variables de entorno")
     sys.exit(1)
 
-from agent.agent_main import run_agent
+from agent.agent_main import run_agent, stream_agent, warm_up_agent, shutdown_agent
+from chat_dispatcher import ChatOrderedUpdateProcessor
+
+# Respuestas en streaming mediante ediciones progresivas del mensaje
+BOT_STREAMING_ENABLED = os.getenv("BOT_STREAMING_ENABLED", "true").lower() == "true"
+# Segundos mínimos entre ediciones del mismo mensaje (Telegram limita la frecuencia de edición)
+BOT_STREAM_EDIT_INTERVAL = float(os.getenv("BOT_STREAM_EDIT_INTERVAL", "1.0"))
+# Reintentos de la edición final si Telegram pide esperar (RetryAfter)
+BOT_STREAM_FINAL_EDIT_RETRIES = 3
+
+
+class StreamingReply:
+    """Respuesta de Telegram que se envía con el primer fragmento y se va editando"""
+    
+    def __init__(self, message, edit_interval: float = BOT_STREAM_EDIT_INTERVAL):
+        self.message = message
+        self.edit_interval = edit_interval
+        self.text = ""
+        self._sent = None
+        self._shown = ""
+        self._next_edit = 0.0
+    
+    async def push(self, delta: str):
+        """Añade un fragmento y actualiza el mensaje si toca"""
+        self.text += delta
+        if not self.text.strip():
+            return
+        
+        if self._sent is None:
+            self._shown = self.text[:MessageLimit.MAX_TEXT_LENGTH]
+            self._sent = await self.message.reply_text(self._shown)
+            self._next_edit = time.monotonic() + self.edit_interval
+        elif time.monotonic() >= self._next_edit:
+            await self._edit()
+    
+    async def _edit(self) -> float:
+        """Edita el mensaje enviado con el texto acumulado; devuelve los segundos a esperar si Telegram limita"""
+        text = self.text[:MessageLimit.MAX_TEXT_LENGTH]
+        if text == self._shown:
+            return 0.0
+        try:
+            await self._sent.edit_text(text)
+            self._shown = text
+            self._next_edit = time.monotonic() + self.edit_interval
+        except RetryAfter as e:
+            retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+            self._next_edit = time.monotonic() + retry_after
+            return float(retry_after)
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                raise
+        return 0.0
+    
+    async def _send_chunks(self, text: str):
+        while text:
+            await self.message.reply_text(text[:MessageLimit.MAX_TEXT_LENGTH])
+            text = text[MessageLimit.MAX_TEXT_LENGTH:]
+    
+    async def finish(self) -> bool:
+        """
+        Envía el texto final. Devuelve False si no se generó ningún texto o si la edición
+        final sigue limitada tras los reintentos (el mensaje enviado quedó incompleto)
+        """
+        if not self.text.strip():
+            return False
+        
+        if self._sent is None:
+            self._shown = self.text[:MessageLimit.MAX_TEXT_LENGTH]
+            self._sent = await self.message.reply_text(self._shown)
+        else:
+            for attempt in range(BOT_STREAM_FINAL_EDIT_RETRIES + 1):
+                retry_after = await self._edit()
+                if not retry_after:
+                    break
+                if attempt == BOT_STREAM_FINAL_EDIT_RETRIES:
+                    logger.warning("Edición final limitada por Telegram; se envía la respuesta en un mensaje nuevo")
+                    return False
+                await asyncio.sleep(retry_after)
+        
+        # El texto que no cabe en un mensaje se envía en mensajes adicionales
+        await self._send_chunks(self.text[MessageLimit.MAX_TEXT_LENGTH:])
+        return True
+    
+    async def send_as_new_message(self):
+        """Envía el texto completo en mensajes nuevos (cuando la edición final no fue posible)"""
+        await self._send_chunks(self.text)
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Maneja el comando /start"""
@@ -69,9 +158,19 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         await update.message.chat.send_action(action="typing")
         
-        response = await run_agent(user_message)
+        if BOT_STREAMING_ENABLED:
+            reply = StreamingReply(update.message)
+            async for delta in stream_agent(user_message):
+                await reply.push(delta)
+            if not await reply.finish():
+                if reply.text.strip():
+                    await reply.send_as_new_message()
+                else:
+                    await update.message.reply_text("No obtuve respuesta. Por favor, intenta de nuevo.")
+        else:
+            response = await run_agent(user_message)
+            await update.message.reply_text(response)
         
-        await update.message.reply_text(response)
         logger.info(f"Respuesta enviada a {user.id}")
         
     except Exception as e:
@@ -89,10 +188,28 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Ocurrió un error inesperado. Por favor, intenta de nuevo más tarde."
         )
 
+async def post_init(application: Application):
+    """Conecta con MCP y carga herramientas e índice antes de recibir mensajes"""
+    await warm_up_agent()
+
+
+async def post_shutdown(application: Application):
+    """Cierra la conexión MCP y las tareas en segundo plano"""
+    await shutdown_agent()
+
+
 def main():
     
     token = os.getenv("TELEGRAM_BOT_TOKEN")
-    application = Application.builder().token(token).build()
+    # Updates de chats distintos en paralelo, en orden dentro de cada chat
+    application = (
+        Application.builder()
+        .token(token)
+        .concurrent_updates(ChatOrderedUpdateProcessor())
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
     
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("help", help_command))
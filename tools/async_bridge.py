@@ -0,0 +1,137 @@
+"""
+Puente entre código síncrono y un event loop asíncrono de larga duración
+"""
+
+import asyncio
+import atexit
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBridge:
+    """
+    Event loop que corre en un hilo dedicado durante toda la vida del proceso.
+
+    Los llamadores síncronos envían corrutinas con run_coroutine_threadsafe y esperan
+    el resultado; así los recursos ligados a un loop (sesiones MCP, clientes httpx) se
+    crean una vez y se reutilizan, y las llamadas desde varios hilos corren a la vez
+    en el mismo loop.
+    """
+
+    def __init__(self, name: str = "async-bridge"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Loop del puente (se arranca en el primer uso)"""
+        if self._loop is None:
+            self.start()
+        return self._loop
+
+    def start(self):
+        """Arranca el hilo con el event loop si no está en marcha"""
+        with self._lock:
+            if self._loop is not None:
+                return
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=_run, name=self.name, daemon=True)
+            self._thread.start()
+            ready.wait()
+            self._loop = loop
+            logger.debug(f"Event loop {self.name} iniciado")
+
+    def in_bridge_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro: Awaitable) -> Future:
+        """Programa la corrutina en el loop del puente y devuelve un concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        Ejecuta la corrutina en el loop del puente y bloquea hasta tener el resultado
+
+        Args:
+            coro: Corrutina a ejecutar
+            timeout: Segundos máximos de espera (None = sin límite)
+        """
+        if self.in_bridge_thread():
+            coro.close()
+            raise RuntimeError("run() bloquearía el propio loop del puente; usa run_async()")
+
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    async def run_async(self, coro: Awaitable) -> Any:
+        """Ejecuta la corrutina en el loop del puente desde otro loop (o directamente si ya es el suyo)"""
+        if self.in_bridge_thread():
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def stop(self, timeout: float = 5.0):
+        """Cancela las tareas pendientes y detiene el loop"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+
+        if loop is None or loop.is_closed():
+            return
+
+        async def _cancel_pending():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(_cancel_pending(), loop).result(timeout)
+        except Exception as e:
+            logger.debug(f"Error cancelando tareas del puente: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not thread.is_alive():
+            loop.close()
+
+
+_default_bridge: Optional[AsyncBridge] = None
+_default_lock = threading.Lock()
+
+
+def get_bridge() -> AsyncBridge:
+    """Puente compartido por todo el proceso"""
+    global _default_bridge
+    with _default_lock:
+        if _default_bridge is None:
+            _default_bridge = AsyncBridge()
+            atexit.register(_default_bridge.stop)
+        return _default_bridge
+
+
+def run_sync(coro: Awaitable, timeout: Optional[float] = None) -> Any:
+    """Ejecuta una corrutina desde código síncrono en el loop compartido"""
+    return get_bridge().run(coro, timeout)
+
+
+async def run_in_bridge(coro: Awaitable) -> Any:
+    """Ejecuta una corrutina en el loop compartido desde código asíncrono"""
+    return await get_bridge().run_async(coro)
@@ -1,23 +1,39 @@
 """
 MCP Client for Odoo
-Cliente para conectar con un servidor MCP de Odoo (soporta STDIO y HTTP/SSE)
+Cliente para conectar con un servidor MCP de Odoo (soporta STDIO, HTTP/SSE y streamable HTTP)
 """
 
 import asyncio
 import logging
-from typing import Optional, Dict, Any, List
-from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List, Callable
+from contextlib import asynccontextmanager, AsyncExitStack
 from urllib.parse import urlparse
 
+from .odoo_xmlrpc_client import sales_domain, stock_location_domain
+
 try:
     from mcp import ClientSession, StdioServerParameters
     from mcp.client.stdio import stdio_client
     from mcp.client.sse import sse_client
+    from mcp.types import ToolListChangedNotification
 except ImportError:
     ClientSession = None
     StdioServerParameters = None
     stdio_client = None
     sse_client = None
+    ToolListChangedNotification = None
+
+try:
+    from mcp.client.streamable_http import streamable_http_client
+except ImportError:
+    try:
+        # Nombre en las versiones 1.x del SDK
+        from mcp.client.streamable_http import streamablehttp_client as streamable_http_client
+    except ImportError:
+        streamable_http_client = None
+
+# Transportes HTTP soportados
+HTTP_TRANSPORTS = ("sse", "streamable-http")
 
 logger = logging.getLogger(__name__)
 
@@ -25,24 +41,37 @@ logger = logging.getLogger(__name__)
 class OdooMCPClient:
     """Cliente MCP para interactuar con servidor Odoo"""
     
-    def __init__(self, server_path_or_url: str):
+    def __init__(self, server_path_or_url: str, http_transport: str = "sse"):
         """
         Inicializa el cliente MCP de Odoo
         
         Args:
             server_path_or_url: Ruta al script del servidor MCP (STDIO) o URL del servidor (HTTP/SSE)
+            http_transport: Transporte para URLs: "sse" o "streamable-http"
         """
         if ClientSession is None:
             raise ImportError(
                 "MCP SDK no está instalado. Instala con: pip install mcp"
             )
+        if http_transport not in HTTP_TRANSPORTS:
+            raise ValueError(f"Transporte HTTP no soportado: {http_transport}. Usa uno de {HTTP_TRANSPORTS}")
         
         self.server_path_or_url = server_path_or_url
+        self.http_transport = http_transport
         self.session: Optional[ClientSession] = None
         self.available_tools: List[Dict[str, Any]] = []
+        # Herramientas en el formato de tools/list (name, description, inputSchema)
+        self.tools: List[Dict[str, Any]] = []
+        # Callback con la lista de herramientas tras cada conexión o aviso de cambio del servidor
+        self.on_tools: Optional[Callable[[List[Dict[str, Any]]], None]] = None
         self._stdio = None
         self._write = None
         self._is_http = self._check_if_http(server_path_or_url)
+        self._connect_lock = asyncio.Lock()
+        self._transport_task: Optional[asyncio.Task] = None
+        self._closing: Optional[asyncio.Event] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
         
     def _check_if_http(self, path: str) -> bool:
         """Verifica si es una URL HTTP/HTTPS"""
@@ -56,26 +85,21 @@ class OdooMCPClient:
         """Conecta al servidor MCP de Odoo"""
         try:
             if self._is_http:
-                logger.info(f"Conectando al servidor MCP de Odoo via HTTP/SSE: {self.server_path_or_url}")
+                logger.info(f"Conectando al servidor MCP de Odoo via HTTP ({self.http_transport}): {self.server_path_or_url}")
                 await self._connect_http()
             else:
                 logger.info(f"Conectando al servidor MCP de Odoo via STDIO: {self.server_path_or_url}")
                 await self._connect_stdio()
             
             # Listar herramientas disponibles
-            tools_list = await self.session.list_tools()
-            self.available_tools = [
-                {
-                    "name": tool.name,
-                    "description": tool.description,
-                    "input_schema": tool.inputSchema
-                }
-                for tool in tools_list.tools
-            ]
+            await self._load_tools()
             
             logger.info(f"Conectado exitosamente. Herramientas disponibles: {len(self.available_tools)}")
             for tool in self.available_tools:
                 logger.info(f"  - {tool['name']}: {tool['description']}")
+            
+            if self.on_tools:
+                self.on_tools(self.tools)
                 
             return True
             
@@ -83,6 +107,45 @@ class OdooMCPClient:
             logger.error(f"Error conectando al servidor MCP: {e}")
             raise
     
+    async def _load_tools(self):
+        """Lee tools/list y actualiza las dos vistas de las herramientas"""
+        tools_list = await self.session.list_tools()
+        self.tools = []
+        for tool in tools_list.tools:
+            data = tool.model_dump(by_alias=True, exclude_none=True)
+            self.tools.append({key: data[key] for key in ("name", "description", "inputSchema") if key in data})
+        self.available_tools = [
+            {
+                "name": tool["name"],
+                "description": tool.get("description"),
+                "input_schema": tool.get("inputSchema")
+            }
+            for tool in self.tools
+        ]
+    
+    async def _handle_message(self, message):
+        """Mensajes iniciados por el servidor (notificaciones) que llegan por el transporte"""
+        # En el SDK 1.x las notificaciones llegan envueltas en ServerNotification(root=...)
+        notification = getattr(message, "root", message)
+        if ToolListChangedNotification is not None and isinstance(notification, ToolListChangedNotification):
+            # La relectura se hace en otra tarea: este manejador corre dentro del bucle
+            # de recepción, que es quien entregaría la respuesta de tools/list
+            if self._refresh_task is None or self._refresh_task.done():
+                self._refresh_task = asyncio.create_task(self._refresh_tools())
+    
+    async def _refresh_tools(self):
+        try:
+            await self._load_tools()
+            logger.info(f"El servidor MCP cambió sus herramientas: {len(self.tools)} disponibles")
+            if self.on_tools:
+                self.on_tools(self.tools)
+        except Exception as e:
+            logger.error(f"Error releyendo herramientas MCP: {e}")
+    
+    @property
+    def initialized(self) -> bool:
+        return self.session is not None
+    
     async def _connect_stdio(self):
         """Conecta usando STDIO (proceso local)"""
         # Configurar parámetros del servidor
@@ -91,40 +154,134 @@ class OdooMCPClient:
             args=[self.server_path_or_url],
             env=None
         )
-        
-        # Crear cliente stdio
-        stdio_transport = await stdio_client(server_params)
-        self._stdio, self._write = stdio_transport
-        
-        # Crear sesión
-        self.session = ClientSession(self._stdio, self._write)
-        await self.session.initialize()
+        await self._start_transport(lambda: stdio_client(server_params))
+    
+    async def _start_transport(self, transport_factory: Callable):
+        """
+        Abre el transporte y la sesión en una tarea dedicada que los mantiene abiertos
+        hasta disconnect(). Los context managers de mcp usan cancel scopes de anyio,
+        que deben cerrarse en la misma tarea que los abrió.
+        """
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        self._closing = asyncio.Event()
+        self._transport_task = asyncio.create_task(
+            self._run_transport(transport_factory, ready, self._closing),
+            name=f"mcp-transport-{self.server_path_or_url}"
+        )
+        await ready
+    
+    async def _run_transport(self, transport_factory: Callable, ready: asyncio.Future,
+                             closing: asyncio.Event):
+        try:
+            async with AsyncExitStack() as stack:
+                read, write = (await stack.enter_async_context(transport_factory()))[:2]
+                session = await stack.enter_async_context(
+                    ClientSession(read, write, message_handler=self._handle_message)
+                )
+                await session.initialize()
+                
+                self._stdio, self._write = read, write
+                self.session = session
+                ready.set_result(None)
+                await closing.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.error(f"Transporte MCP cerrado inesperadamente: {e}")
+        finally:
+            self.session = None
+            self._stdio = None
+            self._write = None
+            if not ready.done():
+                ready.set_exception(ConnectionError("Transporte MCP cerrado durante la conexión"))
     
     async def _connect_http(self):
-        """Conecta usando HTTP/SSE (servidor remoto)"""
-        if sse_client is None:
-            raise ImportError("SSE client no disponible. Verifica la instalación de mcp")
-        
-        # Crear cliente SSE
-        async with sse_client(self.server_path_or_url) as (read, write):
-            self._stdio = read
-            self._write = write
-            
-            # Crear sesión
-            self.session = ClientSession(read, write)
-            await self.session.initialize()
+        """
+        Conecta usando HTTP (servidor remoto). El stream SSE o streamable HTTP queda
+        abierto mientras viva el cliente: las peticiones concurrentes se multiplexan por
+        id JSON-RPC sobre la misma sesión y las notificaciones del servidor llegan por él.
+        """
+        if self.http_transport == "streamable-http":
+            if streamable_http_client is None:
+                raise ImportError("Cliente streamable HTTP no disponible. Actualiza mcp")
+            await self._start_transport(lambda: streamable_http_client(self.server_path_or_url))
+        else:
+            if sse_client is None:
+                raise ImportError("SSE client no disponible. Verifica la instalación de mcp")
+            await self._start_transport(lambda: sse_client(self.server_path_or_url))
+    
+    async def ensure_connected(self):
+        """Conecta si no hay sesión (una sola vez aunque haya llamadas simultáneas)"""
+        if self.session:
+            return
+        async with self._connect_lock:
+            if not self.session:
+                await self._close_transport()
+                await self.connect()
+    
+    async def reconnect(self, stale_session=None):
+        """Vuelve a abrir el transporte y la sesión (p. ej. si el proceso del servidor murió)"""
+        async with self._connect_lock:
+            if self.session is not None and self.session is not stale_session:
+                return
+            logger.warning("Sesión MCP caída; reconectando")
+            await self._close_transport()
+            await self.connect()
+    
+    async def ping(self) -> bool:
+        """Comprobación ligera de la sesión"""
+        session = self.session
+        if session is None:
+            return False
+        try:
+            await session.send_ping()
+            return True
+        except Exception:
+            return False
+    
+    async def _health_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            session = self.session
+            try:
+                if not await self.ping():
+                    await self.reconnect(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Health check MCP fallido: {e}")
+    
+    def start_health_checks(self, interval: float):
+        """Lanza los pings periódicos en segundo plano"""
+        if interval > 0 and (self._health_task is None or self._health_task.done()):
+            self._health_task = asyncio.create_task(self._health_loop(interval), name="mcp-health")
+    
+    async def _close_transport(self):
+        if self._transport_task is None:
+            return
+        self._closing.set()
+        try:
+            await self._transport_task
+        except Exception as e:
+            logger.debug(f"Error cerrando el transporte MCP: {e}")
+        self._transport_task = None
     
     async def disconnect(self):
         """Desconecta del servidor MCP"""
-        if self.session:
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        
+        if self._transport_task:
             try:
                 logger.info("Desconectando del servidor MCP de Odoo")
-                # Cerrar la sesión y transporte
-                if hasattr(self, '_stdio'):
-                    await self._stdio.aclose()
-                if hasattr(self, '_write'):
-                    await self._write.aclose()
-                self.session = None
+                await self._close_transport()
                 logger.info("Desconectado exitosamente")
             except Exception as e:
                 logger.error(f"Error al desconectar: {e}")
@@ -144,6 +301,9 @@ class OdooMCPClient:
         Returns:
             Resultado de la herramienta
         """
+        if not self.session and self._transport_task is not None:
+            # El transporte se cayó: reabrirlo antes de la llamada
+            await self.ensure_connected()
         if not self.session:
             raise RuntimeError("Cliente no conectado. Llama a connect() primero.")
         
@@ -224,6 +384,56 @@ class OdooMCPClient:
         result = await self.call_tool("get_sales_orders", args)
         return result
     
+    async def read_group(self, model: str, domain: Optional[List] = None, fields: Optional[List[str]] = None,
+                         groupby: Optional[List[str]] = None, limit: Optional[int] = None,
+                         orderby: Optional[str] = None, lazy: bool = True) -> Any:
+        """
+        Agrega registros en Odoo con read_group (a través de la herramienta execute_method)
+        
+        Args:
+            model: Modelo de Odoo
+            domain: Dominio de búsqueda
+            fields: Agregados, p. ej. ['quantity:sum']
+            groupby: Campos de agrupación
+            limit: Límite de grupos
+            orderby: Orden de los grupos
+            lazy: True agrupa solo por el primer campo de groupby
+            
+        Returns:
+            Resultado de la herramienta (una fila por grupo)
+        """
+        kwargs = {"lazy": lazy}
+        if limit:
+            kwargs["limit"] = limit
+        if orderby:
+            kwargs["orderby"] = orderby
+        
+        result = await self.call_tool("execute_method", {
+            "model": model,
+            "method": "read_group",
+            "args": [domain or [], fields or [], groupby or []],
+            "kwargs": kwargs
+        })
+        return result
+    
+    async def get_stock_by_location(self, product_id: Optional[int] = None,
+                                    location_id: Optional[int] = None) -> Any:
+        """Existencias y reservas sumadas por ubicación interna"""
+        return await self.read_group(
+            "stock.quant", stock_location_domain(product_id, location_id),
+            ["quantity:sum", "reserved_quantity:sum"], ["location_id"],
+            orderby="location_id", lazy=False
+        )
+    
+    async def get_sales_by_customer(self, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                                    limit: Optional[int] = None) -> Any:
+        """Importe total y número de ventas confirmadas por cliente"""
+        return await self.read_group(
+            "sale.order", sales_domain(date_from, date_to),
+            ["amount_total:sum"], ["partner_id"],
+            limit=limit, orderby="amount_total desc", lazy=False
+        )
+    
     @asynccontextmanager
     async def session_context(self):
         """Context manager para manejar la sesión automáticamente"""
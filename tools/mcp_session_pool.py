@@ -0,0 +1,230 @@
+"""
+Pool de sesiones MCP con reparto por menor número de peticiones en curso
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Número de sesiones MCP abiertas en paralelo (en stdio, procesos del servidor)
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "4"))
+# Fallos seguidos (llamadas con excepción o pings sin respuesta) tras los que una sesión se retira
+MCP_POOL_MAX_FAILURES = int(os.getenv("MCP_POOL_MAX_FAILURES", "3"))
+
+
+class MCPSessionPool:
+    """
+    Reparte las llamadas a herramientas entre varias sesiones MCP independientes.
+
+    Cada sesión la crea `factory()` (SimpleMCPClient para servidores HTTP, OdooMCPClient
+    para servidores stdio, donde cada sesión es un subproceso `python3 <servidor>`) y
+    lleva su propio contador de ids JSON-RPC. Cada llamada va a la sesión con menos
+    peticiones en curso; los empates se reparten en turno rotatorio. Las sesiones que
+    no conectaron se vuelven a intentar en cada connect() y en los health checks; las
+    que fallan MCP_POOL_MAX_FAILURES veces seguidas se retiran y se reponen igual.
+
+    Expone la misma interfaz que un cliente individual (connect, call_tool, ping,
+    tools, on_tools, start_health_checks, disconnect), así que el agente lo usa igual.
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int = MCP_POOL_SIZE,
+                 max_failures: int = MCP_POOL_MAX_FAILURES):
+        """
+        Args:
+            factory: Crea un cliente MCP sin conectar
+            size: Número de sesiones
+            max_failures: Fallos seguidos tras los que una sesión se retira del pool
+        """
+        self.factory = factory
+        self.size = max(1, size)
+        self.max_failures = max(1, max_failures)
+        self.sessions: List[Any] = []
+        self._outstanding: List[int] = []
+        self._calls: List[int] = []
+        self._failures: List[int] = []
+        self._next = 0
+        self._connect_lock = asyncio.Lock()
+        self._health_interval = 0.0
+        self._health_task: Optional[asyncio.Task] = None
+        # Callback con la lista de herramientas tras cada (re)inicialización de una sesión
+        self.on_tools: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+
+    @property
+    def initialized(self) -> bool:
+        return any(getattr(session, "initialized", False) for session in self.sessions)
+
+    @property
+    def tools(self) -> List[Dict[str, Any]]:
+        for session in self.sessions:
+            if session.tools:
+                return session.tools
+        return []
+
+    def _session_tools(self, tools: List[Dict[str, Any]]):
+        if self.on_tools:
+            self.on_tools(tools)
+
+    async def connect(self):
+        """Abre en paralelo las sesiones que faltan hasta `size`; basta con que conecte una"""
+        if len(self.sessions) >= self.size:
+            return
+        async with self._connect_lock:
+            missing = self.size - len(self.sessions)
+            if missing <= 0:
+                return
+
+            candidates = []
+            for _ in range(missing):
+                session = self.factory()
+                session.on_tools = self._session_tools
+                candidates.append(session)
+
+            results = await asyncio.gather(
+                *(session.connect() for session in candidates), return_exceptions=True
+            )
+            errors = [r for r in results if isinstance(r, BaseException)]
+            connected = [s for s, r in zip(candidates, results) if not isinstance(r, BaseException)]
+
+            for session, result in zip(candidates, results):
+                if isinstance(result, BaseException):
+                    await self._close(session)
+
+            if not connected and not self.sessions:
+                raise errors[0]
+            if errors:
+                logger.warning(f"Pool MCP: {len(errors)} de {missing} sesiones no conectaron: {errors[0]}")
+
+            for session in connected:
+                if self._health_interval > 0:
+                    session.start_health_checks(self._health_interval)
+            # Se añaden al final: los índices de las peticiones en curso no cambian
+            self.sessions.extend(connected)
+            self._outstanding.extend([0] * len(connected))
+            self._calls.extend([0] * len(connected))
+            self._failures.extend([0] * len(connected))
+            if connected:
+                logger.info(f"Pool MCP con {len(self.sessions)} sesiones")
+
+    def _pick(self) -> int:
+        """Sesión con menos peticiones en curso (rotando el punto de partida en los empates)"""
+        count = len(self.sessions)
+        start = self._next % count
+        self._next = (self._next + 1) % count
+        best = start
+        for offset in range(1, count):
+            index = (start + offset) % count
+            if self._outstanding[index] < self._outstanding[best]:
+                best = index
+        return best
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        """Llama a una herramienta en la sesión menos cargada"""
+        if not self.sessions:
+            # Las sesiones que faltan con el pool en marcha se reponen en los health checks
+            await self.connect()
+
+        index = self._pick()
+        session = self.sessions[index]
+        self._outstanding[index] += 1
+        self._calls[index] += 1
+        try:
+            result = await session.call_tool(tool_name, arguments)
+        except Exception:
+            self._record_result(session, ok=False)
+            raise
+        else:
+            self._record_result(session, ok=True)
+            return result
+        finally:
+            # La sesión pudo retirarse (o el pool cerrarse) mientras la llamada estaba en curso
+            index = self._index(session)
+            if index is not None:
+                self._outstanding[index] -= 1
+
+    def _index(self, session) -> Optional[int]:
+        for index, current in enumerate(self.sessions):
+            if current is session:
+                return index
+        return None
+
+    def _record_result(self, session, ok: bool):
+        """Cuenta los fallos seguidos de una sesión y la retira al llegar a max_failures"""
+        index = self._index(session)
+        if index is None:
+            return
+        if ok:
+            self._failures[index] = 0
+            return
+        self._failures[index] += 1
+        if self._failures[index] >= self.max_failures:
+            logger.warning(f"Pool MCP: sesión retirada tras {self._failures[index]} fallos seguidos")
+            for values in (self.sessions, self._outstanding, self._calls, self._failures):
+                del values[index]
+            asyncio.create_task(self._close(session))
+
+    async def ping(self) -> bool:
+        """True si todas las sesiones responden"""
+        if not self.sessions:
+            return False
+        results = await asyncio.gather(*(s.ping() for s in self.sessions), return_exceptions=True)
+        return all(result is True for result in results)
+
+    async def _health_loop(self, interval: float):
+        """Retira las sesiones que no responden y repone las que faltan (todas, si el pool no llegó a conectar)"""
+        while True:
+            await asyncio.sleep(interval)
+            # Las sesiones que no responden (su propia reconexión sigue fallando) se retiran
+            sessions = list(self.sessions)
+            results = await asyncio.gather(*(s.ping() for s in sessions), return_exceptions=True)
+            for session, result in zip(sessions, results):
+                self._record_result(session, ok=result is True)
+            if len(self.sessions) >= self.size:
+                continue
+            try:
+                await self.connect()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Pool MCP: no se pudieron reponer sesiones: {e}")
+
+    def start_health_checks(self, interval: float):
+        """
+        Pings periódicos en cada sesión (cada una se reinicializa por su cuenta) y
+        reposición de las que faltan. Funciona aunque el pool aún no haya conectado:
+        las sesiones que se abran después arrancan con sus pings.
+        """
+        if interval <= 0:
+            return
+        self._health_interval = interval
+        for session in self.sessions:
+            session.start_health_checks(interval)
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self._health_loop(interval), name="mcp-pool-health")
+
+    async def _close(self, session):
+        try:
+            await session.disconnect()
+        except Exception as e:
+            logger.debug(f"Error cerrando sesión MCP: {e}")
+
+    async def disconnect(self):
+        """Cierra todas las sesiones"""
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        sessions, self.sessions = self.sessions, []
+        await asyncio.gather(*(self._close(session) for session in sessions))
+        self._outstanding = []
+        self._calls = []
+        self._failures = []
+
+    def stats(self) -> Dict[str, Any]:
+        """Peticiones en curso y totales por sesión"""
+        return {
+            "sessions": len(self.sessions),
+            "outstanding": list(self._outstanding),
+            "calls": list(self._calls),
+        }
@@ -0,0 +1,373 @@
+"""
+Cliente asíncrono de Odoo sobre un pool de conexiones HTTP keep-alive
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import xmlrpc.client
+from typing import Any, AsyncIterator, Dict, List
+
+import httpx
+
+from .odoo_xmlrpc_client import (
+    EXACT_PRODUCT_STAGES,
+    ODOO_ITER_CHUNK_SIZE,
+    ODOO_RPC_TRANSPORT,
+    RPC_TRANSPORTS,
+    OdooRPCError,
+    PRODUCT_DETAIL_FIELDS,
+    PRODUCT_LIST_FIELDS,
+    STOCK_QUANT_FIELDS,
+    clean_groups,
+    id_cursor_domain,
+    product_search_plan,
+    sales_domain,
+    stock_location_domain,
+    stock_quant_domain,
+)
+
+logger = logging.getLogger(__name__)
+
+# Configuración del pool HTTP
+ODOO_HTTP_POOL_SIZE = int(os.getenv("ODOO_HTTP_POOL_SIZE", "10"))
+ODOO_HTTP_TIMEOUT = float(os.getenv("ODOO_HTTP_TIMEOUT", "30"))
+ODOO_HTTP_CONNECT_TIMEOUT = float(os.getenv("ODOO_HTTP_CONNECT_TIMEOUT", "10"))
+# Rangos de ids que bulk_search_read descarga a la vez (acotado por ODOO_HTTP_POOL_SIZE)
+ODOO_BULK_PARALLELISM = int(os.getenv("ODOO_BULK_PARALLELISM", "4"))
+# Rangos por unidad de paralelismo: con ids dispersos unos rangos tienen más registros
+# que otros, y trocear más fino reparte mejor la carga
+BULK_RANGES_PER_WORKER = 4
+
+
+class AsyncOdooClient:
+    """
+    Versión asíncrona de OdooXMLRPCClient.
+
+    Habla XML-RPC (o JSON-RPC) con Odoo a través de un httpx.AsyncClient compartido,
+    de modo que las llamadas concurrentes reutilizan conexiones keep-alive del pool en
+    lugar de abrir una conexión TCP/TLS por llamada y no bloquean el event loop.
+    """
+
+    def __init__(self, url: str, db: str, username: str, password: str,
+                 transport: str = ODOO_RPC_TRANSPORT,
+                 pool_size: int = ODOO_HTTP_POOL_SIZE,
+                 timeout: float = ODOO_HTTP_TIMEOUT,
+                 connect_timeout: float = ODOO_HTTP_CONNECT_TIMEOUT):
+        """
+        Args:
+            url: URL de la instancia de Odoo
+            db: Nombre de la base de datos
+            username: Usuario
+            password: Contraseña o API Key
+            transport: 'xmlrpc' (/xmlrpc/2/*) o 'jsonrpc' (/jsonrpc)
+            pool_size: Máximo de conexiones simultáneas (y keep-alive) con Odoo
+            timeout: Timeout de lectura/escritura en segundos
+            connect_timeout: Timeout de conexión en segundos
+        """
+        if transport not in RPC_TRANSPORTS:
+            raise ValueError(f"Transporte no soportado: {transport}. Usa uno de {RPC_TRANSPORTS}")
+
+        self.transport = transport
+        self.url = url.rstrip('/')
+        self.db = db
+        self.username = username
+        self.password = password
+        self.uid = None
+        self.pool_size = pool_size
+        self._ids = itertools.count(1)
+        self.http = httpx.AsyncClient(
+            base_url=self.url,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        )
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """Cierra el pool de conexiones"""
+        await self.http.aclose()
+
+    async def _call(self, service: str, method: str, *args) -> Any:
+        """Llamada <service>.<method>(*args) con el transporte configurado"""
+        if self.transport == 'jsonrpc':
+            return await self._call_jsonrpc(service, method, *args)
+        return await self._call_xmlrpc(service, method, *args)
+
+    async def _call_jsonrpc(self, service: str, method: str, *args) -> Any:
+        """Llamada JSON-RPC a /jsonrpc"""
+        response = await self.http.post("/jsonrpc", json={
+            "jsonrpc": "2.0",
+            "method": "call",
+            "params": {"service": service, "method": method, "args": args},
+            "id": next(self._ids),
+        })
+        response.raise_for_status()
+        data = response.json()
+
+        if data.get("error"):
+            error = data["error"]
+            detail = (error.get("data") or {}).get("message") or error.get("message")
+            raise OdooRPCError(detail)
+        return data.get("result")
+
+    async def _call_xmlrpc(self, service: str, method: str, *args) -> Any:
+        """Llamada XML-RPC a /xmlrpc/2/<service>"""
+        payload = xmlrpc.client.dumps(args, method, allow_none=True)
+        response = await self.http.post(
+            f"/xmlrpc/2/{service}",
+            content=payload.encode('utf-8'),
+            headers={"Content-Type": "text/xml"},
+        )
+        response.raise_for_status()
+        result, _ = xmlrpc.client.loads(response.content, use_builtin_types=True)
+        return result[0]
+
+    async def execute_kw(self, model: str, method: str, args: List, kwargs: Dict = None) -> Any:
+        """Ejecuta un método de un modelo (equivalente a models.execute_kw)"""
+        return await self._call(
+            'object', 'execute_kw',
+            self.db, self.uid, self.password, model, method, args, kwargs or {}
+        )
+
+    async def connect(self) -> bool:
+        """Conecta y autentica con Odoo"""
+        try:
+            version_info = await self._call('common', 'version')
+            logger.info(f"Conectado a Odoo versión: {version_info.get('server_version')}")
+
+            self.uid = await self._call('common', 'authenticate', self.db, self.username, self.password, {})
+            if not self.uid:
+                logger.error("Error de autenticación. Verifica credenciales.")
+                return False
+
+            logger.info(f"Autenticado exitosamente. UID: {self.uid}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error conectando a Odoo: {e}")
+            return False
+
+    async def search(self, model: str, domain: List = None, offset: int = 0, limit: int = 100,
+                     order: str = None) -> List[int]:
+
+        try:
+            options = {'offset': offset, 'limit': limit}
+            if order:
+                options['order'] = order
+            return await self.execute_kw(model, 'search', [domain or []], options)
+        except Exception as e:
+            logger.error(f"Error buscando en {model}: {e}")
+            return []
+
+    async def read(self, model: str, ids: List[int], fields: List[str] = None) -> List[Dict]:
+
+        try:
+            options = {}
+            if fields:
+                options['fields'] = fields
+            return await self.execute_kw(model, 'read', [ids], options)
+        except Exception as e:
+            logger.error(f"Error leyendo {model}: {e}")
+            return []
+
+    async def search_read(self, model: str, domain: List = None, fields: List[str] = None,
+                          offset: int = 0, limit: int = 100, order: str = None) -> List[Dict]:
+
+        try:
+            options = {'offset': offset, 'limit': limit}
+            if fields:
+                options['fields'] = fields
+            if order:
+                options['order'] = order
+            return await self.execute_kw(model, 'search_read', [domain or []], options)
+        except Exception as e:
+            logger.error(f"Error en search_read {model}: {e}")
+            return []
+
+    async def iter_search_read(self, model: str, domain: List = None, fields: List[str] = None,
+                               chunk_size: int = ODOO_ITER_CHUNK_SIZE,
+                               limit: int = None) -> AsyncIterator[Dict]:
+        """
+        Versión asíncrona de OdooXMLRPCClient.iter_search_read: páginas por cursor de id
+        (id > último leído, orden id asc) en memoria constante. Los errores se propagan.
+
+        Args:
+            model: Modelo de Odoo
+            domain: Dominio de búsqueda
+            fields: Campos a leer (id siempre se incluye)
+            chunk_size: Registros por página
+            limit: Máximo de registros en total (None = todos)
+        """
+        domain = domain or []
+        last_id = 0
+        remaining = limit
+
+        while remaining is None or remaining > 0:
+            page_size = chunk_size if remaining is None else min(chunk_size, remaining)
+            options = {'limit': page_size, 'order': 'id asc'}
+            if fields:
+                options['fields'] = fields
+
+            try:
+                records = await self.execute_kw(
+                    model, 'search_read', [id_cursor_domain(domain, last_id)], options
+                )
+            except Exception as e:
+                logger.error(f"Error en iter_search_read {model} (id > {last_id}): {e}")
+                raise
+
+            for record in records:
+                yield record
+
+            if len(records) < page_size:
+                return
+            last_id = records[-1]['id']
+            if remaining is not None:
+                remaining -= len(records)
+
+    async def _edge_id(self, model: str, domain: List, order: str) -> int:
+        ids = await self.execute_kw(model, 'search', [domain], {'limit': 1, 'order': order})
+        return ids[0] if ids else 0
+
+    async def bulk_search_read(self, model: str, domain: List = None, fields: List[str] = None,
+                               parallelism: int = ODOO_BULK_PARALLELISM,
+                               chunk_size: int = ODOO_ITER_CHUNK_SIZE) -> List[Dict]:
+        """
+        Descarga todos los registros que cumplen el dominio repartiendo el espacio de ids
+        en rangos que se leen en paralelo, y los devuelve en orden de id.
+
+        Pensado para construir índices y exportaciones: una sola conexión está limitada
+        por la latencia de cada página, mientras que Odoo suele tener workers libres.
+        Los errores se propagan (un rango perdido dejaría el resultado incompleto).
+
+        Args:
+            model: Modelo de Odoo
+            domain: Dominio de búsqueda
+            fields: Campos a leer (id siempre se incluye)
+            parallelism: Rangos descargados a la vez (como máximo el tamaño del pool HTTP)
+            chunk_size: Registros por página dentro de cada rango
+        """
+        domain = domain or []
+        parallelism = max(1, min(parallelism, self.pool_size))
+
+        min_id, max_id = await asyncio.gather(
+            self._edge_id(model, domain, 'id asc'),
+            self._edge_id(model, domain, 'id desc'),
+        )
+        if not min_id:
+            return []
+
+        # Rangos [inicio, fin) contiguos y ordenados que cubren [min_id, max_id]
+        span = max_id - min_id + 1
+        count = min(span, parallelism * BULK_RANGES_PER_WORKER)
+        step = -(-span // count)
+        ranges = [(start, min(start + step, max_id + 1)) for start in range(min_id, max_id + 1, step)]
+
+        semaphore = asyncio.Semaphore(parallelism)
+
+        async def fetch_range(start: int, end: int) -> List[Dict]:
+            async with semaphore:
+                range_domain = [['id', '>=', start], ['id', '<', end]] + domain
+                return [
+                    record async for record in
+                    self.iter_search_read(model, range_domain, fields, chunk_size=chunk_size)
+                ]
+
+        parts = await asyncio.gather(*(fetch_range(start, end) for start, end in ranges))
+
+        # Los rangos son disjuntos y están en orden: concatenarlos mantiene el orden por id
+        records = [record for part in parts for record in part]
+        logger.info(f"bulk_search_read {model}: {len(records)} registros en {len(ranges)} rangos "
+                    f"(paralelismo {parallelism})")
+        return records
+
+    async def search_count(self, model: str, domain: List = None) -> int:
+
+        try:
+            return await self.execute_kw(model, 'search_count', [domain or []])
+        except Exception as e:
+            logger.error(f"Error contando {model}: {e}")
+            return 0
+
+    async def read_group(self, model: str, domain: List = None, fields: List[str] = None,
+                         groupby: List[str] = None, offset: int = 0, limit: int = None,
+                         orderby: str = None, lazy: bool = True) -> List[Dict]:
+        """Agregación en Odoo (ver OdooXMLRPCClient.read_group)"""
+        try:
+            options = {'offset': offset, 'lazy': lazy}
+            if limit:
+                options['limit'] = limit
+            if orderby:
+                options['orderby'] = orderby
+            return await self.execute_kw(
+                model, 'read_group', [domain or [], fields or [], groupby or []], options
+            )
+        except Exception as e:
+            logger.error(f"Error en read_group {model}: {e}")
+            return []
+
+    async def get_stock_by_location(self, product_id: int = None, location_id: int = None,
+                                    internal_only: bool = True) -> List[Dict]:
+        """Existencias y reservas sumadas por ubicación"""
+        groups = await self.read_group(
+            'stock.quant', stock_location_domain(product_id, location_id, internal_only),
+            ['quantity:sum', 'reserved_quantity:sum'], ['location_id'],
+            orderby='location_id', lazy=False
+        )
+        return clean_groups(groups)
+
+    async def get_sales_by_customer(self, date_from: str = None, date_to: str = None,
+                                    limit: int = None) -> List[Dict]:
+        """Importe total y número de ventas confirmadas por cliente, de mayor a menor"""
+        groups = await self.read_group(
+            'sale.order', sales_domain(date_from, date_to),
+            ['amount_total:sum'], ['partner_id'],
+            limit=limit, orderby='amount_total desc', lazy=False
+        )
+        return clean_groups(groups)
+
+    async def get_products(self, query: str = None, limit: int = 50) -> List[Dict]:
+        """
+        Obtiene productos del inventario
+
+        Args:
+            query: Término de búsqueda (busca en nombre, referencia, código de barras, categoría)
+            limit: Número máximo de productos
+
+        Returns:
+            Lista de productos con sus datos
+        """
+        # Mismo plan por etapas que OdooXMLRPCClient.get_products
+        products = []
+        stage = None
+        for stage, domain in product_search_plan(query):
+            if products:
+                domain = [['id', 'not in', [p['id'] for p in products]]] + domain
+
+            products += await self.search_read('product.product', domain, PRODUCT_LIST_FIELDS,
+                                               limit=limit - len(products))
+
+            if len(products) >= limit or (products and stage in EXACT_PRODUCT_STAGES):
+                break
+
+        logger.info(f"Búsqueda: '{query}' - {len(products)} productos encontrados (etapa: {stage})")
+
+        return products
+
+    async def get_product_by_id(self, product_id: int) -> Dict:
+
+        products = await self.read('product.product', [product_id], PRODUCT_DETAIL_FIELDS)
+        return products[0] if products else {}
+
+    async def get_stock_quants(self, product_id: int = None, location_id: int = None) -> List[Dict]:
+
+        domain = stock_quant_domain(product_id, location_id)
+
+        return await self.search_read('stock.quant', domain, STOCK_QUANT_FIELDS, limit=100)
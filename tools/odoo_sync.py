@@ -0,0 +1,306 @@
+"""
+Sincronización incremental de datos de Odoo basada en write_date
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Configuración de la sincronización
+ODOO_SYNC_INTERVAL = float(os.getenv("ODOO_SYNC_INTERVAL", "60"))
+ODOO_SYNC_RECONCILE_INTERVAL = float(os.getenv("ODOO_SYNC_RECONCILE_INTERVAL", "900"))
+ODOO_SYNC_BATCH_SIZE = int(os.getenv("ODOO_SYNC_BATCH_SIZE", "500"))
+# IDs por página al listar los IDs remotos en la reconciliación
+ODOO_SYNC_ID_PAGE_SIZE = int(os.getenv("ODOO_SYNC_ID_PAGE_SIZE", "5000"))
+
+# Formato de fechas de Odoo (UTC)
+ODOO_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class XMLRPCSyncSource:
+    """Fuente de datos para la sincronización usando OdooXMLRPCClient"""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def search_read(self, model: str, domain: List, fields: List[str],
+                          limit: int, order: str) -> List[Dict]:
+        return await asyncio.to_thread(
+            self.client.search_read, model, domain, fields, 0, limit, order
+        )
+
+    async def search(self, model: str, domain: List, limit: int = 0) -> List[int]:
+        # limit=0: Odoo no aplica límite
+        return await asyncio.to_thread(self.client.search, model, domain, 0, limit, 'id asc')
+
+
+class MCPSyncSource:
+    """Fuente de datos para la sincronización usando la herramienta MCP search_records"""
+
+    def __init__(self, call_tool: Callable[[str, Dict], Awaitable[Any]],
+                 parse_records: Callable[[Any], Optional[List[Dict]]],
+                 id_page_size: int = ODOO_SYNC_ID_PAGE_SIZE):
+        """
+        Args:
+            call_tool: Corrutina que ejecuta una herramienta MCP (nombre, argumentos)
+            parse_records: Convierte la respuesta de la herramienta en lista de registros
+            id_page_size: IDs por llamada al listar los IDs en la reconciliación
+        """
+        self.call_tool = call_tool
+        self.parse_records = parse_records
+        self.id_page_size = id_page_size
+
+    async def _search_records(self, arguments: Dict) -> List[Dict]:
+        result = await self.call_tool("search_records", arguments)
+        records = self.parse_records(result)
+        if records is None:
+            raise RuntimeError(f"Respuesta inesperada de search_records: {str(result)[:200]}")
+        return records
+
+    async def search_read(self, model: str, domain: List, fields: List[str],
+                          limit: int, order: str) -> List[Dict]:
+        return await self._search_records({
+            "model": model,
+            "domain": domain,
+            "fields": fields,
+            "limit": limit,
+            "order": order,
+        })
+
+    async def search(self, model: str, domain: List, limit: int = 0) -> List[int]:
+        """IDs del dominio en orden, paginando por id (limit=0: todos)"""
+        ids: List[int] = []
+        while not limit or len(ids) < limit:
+            page_size = self.id_page_size if not limit else min(self.id_page_size, limit - len(ids))
+            page_domain = list(domain) + ([['id', '>', ids[-1]]] if ids else [])
+            records = await self._search_records({
+                "model": model,
+                "domain": page_domain,
+                "fields": ["id"],
+                "limit": page_size,
+                "order": "id asc",
+            })
+            ids.extend(record["id"] for record in records)
+            if len(records) < page_size:
+                break
+        return ids
+
+
+async def _maybe_await(result):
+    if inspect.isawaitable(result):
+        await result
+
+
+class OdooSyncEngine:
+    """
+    Mantiene una copia local de un modelo de Odoo al día trayendo solo los deltas.
+
+    - sync_once(): trae los registros con write_date >= cursor (menos un margen de
+      solapamiento para transacciones que confirman tarde), paginando por
+      (write_date, id) en lugar de por OFFSET. Los registros archivados que aparecen
+      en el delta se notifican como eliminados.
+    - reconcile(): con menor frecuencia compara los IDs activos de Odoo con los
+      conocidos para detectar registros borrados (que no dejan rastro en write_date)
+      y recuperar registros que se hayan escapado.
+
+    Con max_records, la carga inicial deja de paginar al superarlo y la
+    reconciliación no lista más IDs de los necesarios: over_limit queda activado.
+    """
+
+    def __init__(self, source, model: str, fields: List[str],
+                 on_upsert: Callable[[List[Dict]], Any],
+                 on_delete: Callable[[List[int]], Any],
+                 domain: List = None,
+                 has_active: bool = True,
+                 interval: float = ODOO_SYNC_INTERVAL,
+                 reconcile_interval: float = ODOO_SYNC_RECONCILE_INTERVAL,
+                 batch_size: int = ODOO_SYNC_BATCH_SIZE,
+                 overlap_seconds: int = 60,
+                 max_records: int = 0):
+        """
+        Args:
+            source: Fuente de datos (XMLRPCSyncSource o MCPSyncSource)
+            model: Modelo de Odoo a sincronizar
+            fields: Campos a traer
+            on_upsert: Callback (sync o async) con la lista de registros nuevos/modificados
+            on_delete: Callback (sync o async) con la lista de IDs eliminados o archivados
+            domain: Filtro adicional del modelo
+            has_active: Si el modelo tiene campo 'active' (para detectar archivados)
+            interval: Segundos entre deltas
+            reconcile_interval: Segundos entre reconciliaciones de IDs
+            batch_size: Registros por página
+            overlap_seconds: Margen hacia atrás aplicado al cursor en cada delta
+            max_records: Registros máximos de la copia local (0 = sin límite)
+        """
+        self.source = source
+        self.model = model
+        self.fields = list(fields)
+        self.on_upsert = on_upsert
+        self.on_delete = on_delete
+        self.domain = list(domain or [])
+        self.has_active = has_active
+        self.interval = interval
+        self.reconcile_interval = reconcile_interval
+        self.batch_size = batch_size
+        self.overlap_seconds = overlap_seconds
+        self.max_records = max_records
+
+        self.cursor: Optional[str] = None
+        self.known_ids: Set[int] = set()
+        self.initialized = False
+        self.over_limit = False
+        self._last_reconcile = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def _read_fields(self) -> List[str]:
+        fields = self.fields + ['write_date']
+        if self.has_active:
+            fields.append('active')
+        return fields
+
+    def _delta_start(self) -> Optional[str]:
+        """Cursor menos el margen de solapamiento"""
+        if not self.cursor:
+            return None
+        cursor = datetime.strptime(self.cursor, ODOO_DATETIME_FORMAT)
+        return (cursor - timedelta(seconds=self.overlap_seconds)).strftime(ODOO_DATETIME_FORMAT)
+
+    async def sync_once(self) -> int:
+        """Trae los cambios desde el último cursor. Devuelve el número de registros procesados"""
+        start = self._delta_start()
+        base_domain = list(self.domain)
+        if start:
+            base_domain.append(['write_date', '>=', start])
+            if self.has_active:
+                # Incluir archivados para poder retirarlos de la copia local
+                base_domain.append(['active', 'in', [True, False]])
+
+        fields = self._read_fields()
+        processed = 0
+        last = None
+
+        while True:
+            domain = list(base_domain)
+            if last:
+                # Paginación por clave (write_date, id)
+                last_date, last_id = last
+                domain += ['|', ['write_date', '>', last_date],
+                           '&', ['write_date', '=', last_date], ['id', '>', last_id]]
+
+            batch = await self.source.search_read(
+                self.model, domain, fields, self.batch_size, 'write_date asc, id asc'
+            )
+            if not batch:
+                break
+
+            upserts = []
+            deletes = []
+            for record in batch:
+                if self.has_active and record.get('active') is False:
+                    deletes.append(record['id'])
+                    self.known_ids.discard(record['id'])
+                else:
+                    upserts.append(record)
+                    self.known_ids.add(record['id'])
+
+            if upserts:
+                await _maybe_await(self.on_upsert(upserts))
+            if deletes:
+                await _maybe_await(self.on_delete(deletes))
+
+            processed += len(batch)
+            last = (batch[-1]['write_date'], batch[-1]['id'])
+            if not self.cursor or last[0] > self.cursor:
+                self.cursor = last[0]
+
+            if not self.initialized and self.max_records and len(self.known_ids) > self.max_records:
+                # No traer el resto de un catálogo que no se va a usar
+                self.over_limit = True
+                logger.warning(f"{self.model} supera {self.max_records} registros; carga inicial interrumpida")
+                return processed
+
+            if len(batch) < self.batch_size:
+                break
+
+        if not self.initialized:
+            # La carga inicial es completa: cuenta como reconciliación
+            self.initialized = True
+            self._last_reconcile = time.monotonic()
+            logger.info(f"Sincronización inicial de {self.model}: {processed} registros")
+        elif processed:
+            logger.info(f"Sincronización de {self.model}: {processed} registros modificados")
+
+        return processed
+
+    async def reconcile(self) -> int:
+        """Detecta registros borrados o perdidos comparando IDs. Devuelve el número de cambios"""
+        limit = self.max_records + 1 if self.max_records else 0
+        remote_ids = set(await self.source.search(self.model, self.domain, limit))
+        self._last_reconcile = time.monotonic()
+
+        if self.max_records and len(remote_ids) > self.max_records:
+            self.over_limit = True
+            logger.warning(f"{self.model} supera {self.max_records} registros; se detiene la sincronización")
+            return 0
+
+        if not remote_ids and self.known_ids:
+            # Una respuesta vacía suele ser un error de la fuente: no vaciar la copia local
+            logger.warning(f"Reconciliación de {self.model} sin IDs remotos; se omite")
+            return 0
+
+        gone = list(self.known_ids - remote_ids)
+        missing = list(remote_ids - self.known_ids)
+
+        if gone:
+            self.known_ids.difference_update(gone)
+            await _maybe_await(self.on_delete(gone))
+
+        for i in range(0, len(missing), self.batch_size):
+            chunk = missing[i:i + self.batch_size]
+            records = await self.source.search_read(
+                self.model, [['id', 'in', chunk]], self._read_fields(), len(chunk), 'id asc'
+            )
+            self.known_ids.update(record['id'] for record in records)
+            if records:
+                await _maybe_await(self.on_upsert(records))
+
+        if gone or missing:
+            logger.info(f"Reconciliación de {self.model}: {len(gone)} eliminados, {len(missing)} recuperados")
+        return len(gone) + len(missing)
+
+    async def run(self):
+        """Bucle de sincronización periódica"""
+        while True:
+            try:
+                await self.sync_once()
+                if time.monotonic() - self._last_reconcile >= self.reconcile_interval:
+                    await self.reconcile()
+                if self.over_limit:
+                    return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error sincronizando {self.model}: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> asyncio.Task:
+        """Lanza el bucle de sincronización en segundo plano"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(), name=f"odoo-sync-{self.model}")
+        return self._task
+
+    async def stop(self):
+        """Detiene el bucle de sincronización"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
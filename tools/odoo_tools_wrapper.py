@@ -2,13 +2,14 @@
 Wrapper para convertir las herramientas MCP de Odoo en herramientas de LangChain
 """
 
-import asyncio
 import logging
 from typing import Any, Dict, Optional, Type
 from langchain_core.tools import BaseTool
 from pydantic import BaseModel, Field
 
 from .mcp_odoo_client import OdooMCPClient
+from .async_bridge import run_sync, run_in_bridge
+from .result_encoder import encode_result
 
 logger = logging.getLogger(__name__)
 
@@ -47,8 +48,8 @@ class OdooSearchPartnersTool(BaseTool):
     def _run(self, query: str, limit: int = 10) -> str:
         """Ejecuta la búsqueda de partners"""
         try:
-            result = asyncio.run(self.odoo_client.search_partners(query, limit))
-            return str(result)
+            result = run_sync(self.odoo_client.search_partners(query, limit))
+            return encode_result(result)
         except Exception as e:
             logger.error(f"Error buscando partners: {e}")
             return f"Error: {str(e)}"
@@ -56,8 +57,8 @@ class OdooSearchPartnersTool(BaseTool):
     async def _arun(self, query: str, limit: int = 10) -> str:
         """Versión async de la búsqueda"""
         try:
-            result = await self.odoo_client.search_partners(query, limit)
-            return str(result)
+            result = await run_in_bridge(self.odoo_client.search_partners(query, limit))
+            return encode_result(result)
         except Exception as e:
             logger.error(f"Error buscando partners: {e}")
             return f"Error: {str(e)}"
@@ -74,8 +75,8 @@ class OdooGetPartnerInfoTool(BaseTool):
     def _run(self, partner_id: int) -> str:
         """Obtiene info del partner"""
         try:
-            result = asyncio.run(self.odoo_client.get_partner_info(partner_id))
-            return str(result)
+            result = run_sync(self.odoo_client.get_partner_info(partner_id))
+            return encode_result(result)
         except Exception as e:
             logger.error(f"Error obteniendo info de partner: {e}")
             return f"Error: {str(e)}"
@@ -83,8 +84,8 @@ class OdooGetPartnerInfoTool(BaseTool):
     async def _arun(self, partner_id: int) -> str:
         """Versión async"""
         try:
-            result = await self.odoo_client.get_partner_info(partner_id)
-            return str(result)
+            result = await run_in_bridge(self.odoo_client.get_partner_info(partner_id))
+            return encode_result(result)
         except Exception as e:
             logger.error(f"Error obteniendo info de partner: {e}")
             return f"Error: {str(e)}"
@@ -101,8 +102,8 @@ class OdooSearchProductsTool(BaseTool):
     def _run(self, query: str, limit: int = 10) -> str:
         """Ejecuta la búsqueda de productos"""
         try:
-            result = asyncio.run(self.odoo_client.search_products(query, limit))
-            return str(result)
+            result = run_sync(self.odoo_client.search_products(query, limit))
+            return encode_result(result)
         except Exception as e:
             logger.error(f"Error buscando productos: {e}")
             return f"Error: {str(e)}"
@@ -110,8 +111,8 @@ class OdooSearchProductsTool(BaseTool):
     async def _arun(self, query: str, limit: int = 10) -> str:
         """Versión async"""
         try:
-            result = await self.odoo_client.search_products(query, limit)
-            return str(result)
+            result = await run_in_bridge(self.odoo_client.search_products(query, limit))
+            return encode_result(result)
         except Exception as e:
             logger.error(f"Error buscando productos: {e}")
             return f"Error: {str(e)}"
@@ -128,8 +129,8 @@ class OdooGetSalesOrdersTool(BaseTool):
     def _run(self, partner_id: Optional[int] = None, limit: int = 10) -> str:
         """Obtiene órdenes de venta"""
         try:
-            result = asyncio.run(self.odoo_client.get_sales_orders(partner_id, limit))
-            return str(result)
+            result = run_sync(self.odoo_client.get_sales_orders(partner_id, limit))
+            return encode_result(result)
         except Exception as e:
             logger.error(f"Error obteniendo órdenes de venta: {e}")
             return f"Error: {str(e)}"
@@ -137,13 +138,80 @@ class OdooGetSalesOrdersTool(BaseTool):
     async def _arun(self, partner_id: Optional[int] = None, limit: int = 10) -> str:
         """Versión async"""
         try:
-            result = await self.odoo_client.get_sales_orders(partner_id, limit)
-            return str(result)
+            result = await run_in_bridge(self.odoo_client.get_sales_orders(partner_id, limit))
+            return encode_result(result)
         except Exception as e:
             logger.error(f"Error obteniendo órdenes de venta: {e}")
             return f"Error: {str(e)}"
 
 
+class StockByLocationInput(BaseModel):
+    """Input para stock por ubicación"""
+    product_id: Optional[int] = Field(default=None, description="ID del producto (opcional)")
+    location_id: Optional[int] = Field(default=None, description="ID de la ubicación (opcional)")
+
+
+class SalesByCustomerInput(BaseModel):
+    """Input para ventas por cliente"""
+    date_from: Optional[str] = Field(default=None, description="Fecha inicial YYYY-MM-DD (opcional)")
+    date_to: Optional[str] = Field(default=None, description="Fecha final YYYY-MM-DD (opcional)")
+    limit: int = Field(default=20, description="Número máximo de clientes")
+
+
+class OdooStockByLocationTool(BaseTool):
+    """Herramienta para obtener el stock agregado por ubicación"""
+    name: str = "odoo_stock_by_location"
+    description: str = "Obtiene el stock total por ubicación interna (sumado en Odoo, sin límite de filas)"
+    args_schema: Type[BaseModel] = StockByLocationInput
+    
+    odoo_client: OdooMCPClient = Field(exclude=True)
+    
+    def _run(self, product_id: Optional[int] = None, location_id: Optional[int] = None) -> str:
+        """Obtiene el stock por ubicación"""
+        try:
+            result = run_sync(self.odoo_client.get_stock_by_location(product_id, location_id))
+            return encode_result(result)
+        except Exception as e:
+            logger.error(f"Error obteniendo stock por ubicación: {e}")
+            return f"Error: {str(e)}"
+    
+    async def _arun(self, product_id: Optional[int] = None, location_id: Optional[int] = None) -> str:
+        """Versión async"""
+        try:
+            result = await run_in_bridge(self.odoo_client.get_stock_by_location(product_id, location_id))
+            return encode_result(result)
+        except Exception as e:
+            logger.error(f"Error obteniendo stock por ubicación: {e}")
+            return f"Error: {str(e)}"
+
+
+class OdooSalesByCustomerTool(BaseTool):
+    """Herramienta para obtener las ventas agregadas por cliente"""
+    name: str = "odoo_sales_by_customer"
+    description: str = "Obtiene el importe total y el número de ventas confirmadas por cliente, con rango de fechas opcional"
+    args_schema: Type[BaseModel] = SalesByCustomerInput
+    
+    odoo_client: OdooMCPClient = Field(exclude=True)
+    
+    def _run(self, date_from: Optional[str] = None, date_to: Optional[str] = None, limit: int = 20) -> str:
+        """Obtiene las ventas por cliente"""
+        try:
+            result = run_sync(self.odoo_client.get_sales_by_customer(date_from, date_to, limit))
+            return encode_result(result)
+        except Exception as e:
+            logger.error(f"Error obteniendo ventas por cliente: {e}")
+            return f"Error: {str(e)}"
+    
+    async def _arun(self, date_from: Optional[str] = None, date_to: Optional[str] = None, limit: int = 20) -> str:
+        """Versión async"""
+        try:
+            result = await run_in_bridge(self.odoo_client.get_sales_by_customer(date_from, date_to, limit))
+            return encode_result(result)
+        except Exception as e:
+            logger.error(f"Error obteniendo ventas por cliente: {e}")
+            return f"Error: {str(e)}"
+
+
 def create_odoo_langchain_tools(server_script_path: str, auto_connect: bool = True):
     """
     Crea herramientas de LangChain conectadas a servidor MCP de Odoo
@@ -157,14 +225,17 @@ def create_odoo_langchain_tools(server_script_path: str, auto_connect: bool = Tr
     """
     client = OdooMCPClient(server_script_path)
     
+    # La sesión vive en el loop compartido del puente: todas las llamadas la reutilizan
     if auto_connect:
-        asyncio.run(client.connect())
+        run_sync(client.connect())
     
     tools = [
         OdooSearchPartnersTool(odoo_client=client),
         OdooGetPartnerInfoTool(odoo_client=client),
         OdooSearchProductsTool(odoo_client=client),
-        OdooGetSalesOrdersTool(odoo_client=client)
+        OdooGetSalesOrdersTool(odoo_client=client),
+        OdooStockByLocationTool(odoo_client=client),
+        OdooSalesByCustomerTool(odoo_client=client)
     ]
     
     return client, tools
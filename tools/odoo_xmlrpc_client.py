@@ -1,15 +1,197 @@
+import os
+import re
+import itertools
 import xmlrpc.client
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+import httpx
 
 logger = logging.getLogger(__name__)
 
+# Transporte por defecto para hablar con Odoo: 'xmlrpc' o 'jsonrpc'
+ODOO_RPC_TRANSPORT = os.getenv("ODOO_RPC_TRANSPORT", "xmlrpc").lower()
+RPC_TRANSPORTS = ('xmlrpc', 'jsonrpc')
+
+# Campos de product.product para listados
+PRODUCT_LIST_FIELDS = [
+    'name',           # Nombre del producto
+    'default_code',   # Referencia interna
+    'barcode',        # Código de barras
+    'type',           # Tipo (product, consu, service)
+    'categ_id',       # Categoría
+    'list_price',     # Precio de venta
+    'standard_price', # Costo
+    'qty_available',  # Cantidad disponible
+    'uom_id',         # Unidad de medida
+    'active',         # Activo
+]
+
+# Campos de product.product para la ficha de un producto
+PRODUCT_DETAIL_FIELDS = [
+    'name', 'default_code', 'barcode', 'type', 'categ_id',
+    'list_price', 'standard_price', 'qty_available', 'uom_id',
+    'description', 'description_sale', 'active', 'company_id'
+]
+
+STOCK_QUANT_FIELDS = ['product_id', 'location_id', 'quantity', 'reserved_quantity', 'lot_id']
+
+# Registros por página al recorrer un modelo completo con iter_search_read
+ODOO_ITER_CHUNK_SIZE = int(os.getenv("ODOO_ITER_CHUNK_SIZE", "500"))
+
+
+def product_search_domain(query: str = None) -> List:
+    """Dominio de búsqueda de productos por nombre, referencia, código de barras o categoría"""
+    if not query:
+        return []
+    return [
+        '|', '|', '|',
+        ['name', 'ilike', query],
+        ['default_code', 'ilike', query],
+        ['barcode', 'ilike', query],
+        ['categ_id.name', 'ilike', query]
+    ]
+
+
+# Consultas que pueden ser un código de barras o una referencia interna: una sola
+# "palabra" sin espacios que contiene algún dígito
+PRODUCT_CODE_PATTERN = re.compile(r'(?=\S*\d)[\w\-./]{2,64}')
+# Etapas cuyos resultados son una coincidencia exacta: con alguno basta
+EXACT_PRODUCT_STAGES = ('barcode', 'default_code')
+
+
+def product_search_plan(query: str = None) -> List[Tuple[str, List]]:
+    """
+    Etapas de búsqueda de productos:
+
+    1. barcode exacto y 2. default_code exacto, solo si la consulta parece un código:
+       igualdad sobre columnas indexadas
+    3. la búsqueda difusa original (ilike en cuatro campos, con join a la categoría)
+
+    El texto libre va directo a la búsqueda difusa: un prefijo sobre name (campo
+    traducido en la plantilla) no puede usar índice y solo añadiría una llamada.
+    """
+    if not query or not query.strip():
+        return [('all', [])]
+
+    query = query.strip()
+    stages = []
+    if PRODUCT_CODE_PATTERN.fullmatch(query):
+        stages.append(('barcode', [['barcode', '=', query]]))
+        stages.append(('default_code', [['default_code', '=', query]]))
+
+    stages.append(('fuzzy', product_search_domain(query)))
+    return stages
+
+
+def stock_quant_domain(product_id: int = None, location_id: int = None) -> List:
+    """Dominio de stock.quant filtrado por producto y/o ubicación"""
+    domain = []
+    if product_id:
+        domain.append(['product_id', '=', product_id])
+    if location_id:
+        domain.append(['location_id', '=', location_id])
+    return domain
+
+
+def id_cursor_domain(domain: List, last_id: int) -> List:
+    """Dominio de la página siguiente: registros con id mayor que el último leído"""
+    if not last_id:
+        return list(domain)
+    # Los términos de primer nivel se combinan con AND implícito
+    return [['id', '>', last_id]] + list(domain)
+
+
+# Estados de sale.order que cuentan como venta confirmada
+SALE_CONFIRMED_STATES = ['sale', 'done']
+
+
+def stock_location_domain(product_id: int = None, location_id: int = None,
+                          internal_only: bool = True) -> List:
+    """Dominio de stock.quant para agregar existencias por ubicación"""
+    domain = stock_quant_domain(product_id, location_id)
+    if internal_only:
+        # Sin las ubicaciones virtuales (clientes, proveedores, pérdidas de inventario)
+        domain.append(['location_id.usage', '=', 'internal'])
+    return domain
+
+
+def sales_domain(date_from: str = None, date_to: str = None, partner_id: int = None) -> List:
+    """Dominio de ventas confirmadas, opcionalmente por rango de fechas (YYYY-MM-DD) y cliente"""
+    domain = [['state', 'in', SALE_CONFIRMED_STATES]]
+    if date_from:
+        domain.append(['date_order', '>=', date_from])
+    if date_to:
+        # date_order es datetime: una fecha sola incluye todo ese día
+        domain.append(['date_order', '<=', f"{date_to} 23:59:59" if len(date_to) == 10 else date_to])
+    if partner_id:
+        domain.append(['partner_id', '=', partner_id])
+    return domain
+
+
+def clean_groups(groups: List[Dict]) -> List[Dict]:
+    """Quita de las filas de read_group las claves internas (__domain, __context...) salvo __count"""
+    return [
+        {key: value for key, value in group.items() if key == '__count' or not key.startswith('__')}
+        for group in groups
+    ]
+
+
+class OdooRPCError(Exception):
+    """Error devuelto por Odoo a través de /jsonrpc"""
+
+
+class JSONRPCServerProxy:
+    """
+    Proxy con la misma interfaz que xmlrpc.client.ServerProxy pero sobre el endpoint
+    /jsonrpc de Odoo: proxy.metodo(*args) llama a <service>.<metodo>(*args).
+    """
+    
+    def __init__(self, url: str, service: str, http_client: httpx.Client = None):
+        self.endpoint = f"{url.rstrip('/')}/jsonrpc"
+        self.service = service
+        self.http = http_client or httpx.Client(timeout=30.0)
+        self._ids = itertools.count(1)
+    
+    def _call(self, method: str, *args) -> Any:
+        response = self.http.post(self.endpoint, json={
+            "jsonrpc": "2.0",
+            "method": "call",
+            "params": {"service": self.service, "method": method, "args": args},
+            "id": next(self._ids),
+        })
+        response.raise_for_status()
+        data = response.json()
+        
+        if data.get("error"):
+            error = data["error"]
+            detail = (error.get("data") or {}).get("message") or error.get("message")
+            raise OdooRPCError(detail)
+        return data.get("result")
+    
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return lambda *args: self._call(name, *args)
+
 
 class OdooXMLRPCClient:
     """Cliente XML-RPC para conectarse a Odoo 17"""
     
-    def __init__(self, url: str, db: str, username: str, password: str):
-
+    def __init__(self, url: str, db: str, username: str, password: str,
+                 transport: str = ODOO_RPC_TRANSPORT):
+        """
+        Args:
+            url: URL de la instancia de Odoo
+            db: Nombre de la base de datos
+            username: Usuario
+            password: Contraseña o API Key
+            transport: 'xmlrpc' (/xmlrpc/2/*) o 'jsonrpc' (/jsonrpc); misma semántica de métodos
+        """
+        if transport not in RPC_TRANSPORTS:
+            raise ValueError(f"Transporte no soportado: {transport}. Usa uno de {RPC_TRANSPORTS}")
+        
+        self.transport = transport
         self.url = url
         self.db = db
         self.username = username
@@ -17,17 +199,28 @@ class OdooXMLRPCClient:
         self.uid = None
         self.common = None
         self.models = None
+        self._http = None
         
+    def _server_proxy(self, service: str):
+        """Crea el proxy del servicio ('common' u 'object') según el transporte"""
+        if self.transport == 'jsonrpc':
+            if self._http is None:
+                # Un único cliente HTTP keep-alive compartido por ambos servicios
+                self._http = httpx.Client(timeout=30.0)
+            return JSONRPCServerProxy(self.url, service, self._http)
+        return xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/{service}')
+    
     def connect(self) -> bool:
         """Conecta y autentica con Odoo"""
         print(f"\n[ODOO CLIENT] Iniciando conexión...")
         print(f"[ODOO CLIENT] URL: {self.url}")
         print(f"[ODOO CLIENT] DB: {self.db}")
         print(f"[ODOO CLIENT] Username: {self.username}")
+        print(f"[ODOO CLIENT] Transporte: {self.transport}")
         
         try:
             # Endpoint común para autenticación
-            self.common = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/common')
+            self.common = self._server_proxy('common')
             
             # Verificar versión del servidor
             print(f"[ODOO CLIENT] Obteniendo versión del servidor...")
@@ -48,7 +241,7 @@ class OdooXMLRPCClient:
             print(f"[ODOO CLIENT] ✓ Autenticación exitosa. UID: {self.uid}")
             
             # Endpoint para llamar métodos
-            self.models = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/object')
+            self.models = self._server_proxy('object')
             print(f"[ODOO CLIENT] ✓ Cliente models configurado")
             
             return True
@@ -58,17 +251,22 @@ class OdooXMLRPCClient:
             print(f"[ODOO CLIENT] ERROR: {e}")
             return False
     
-    def search(self, model: str, domain: List = None, offset: int = 0, limit: int = 100) -> List[int]:
+    def search(self, model: str, domain: List = None, offset: int = 0, limit: int = 100,
+               order: str = None) -> List[int]:
 
         if domain is None:
             domain = []
             
         try:
+            options = {'offset': offset, 'limit': limit}
+            if order:
+                options['order'] = order
+                
             ids = self.models.execute_kw(
                 self.db, self.uid, self.password,
                 model, 'search',
                 [domain],
-                {'offset': offset, 'limit': limit}
+                options
             )
             return ids
         except Exception as e:
@@ -94,7 +292,7 @@ class OdooXMLRPCClient:
             return []
     
     def search_read(self, model: str, domain: List = None, fields: List[str] = None, 
-                    offset: int = 0, limit: int = 100) -> List[Dict]:
+                    offset: int = 0, limit: int = 100, order: str = None) -> List[Dict]:
 
         if domain is None:
             domain = []
@@ -103,6 +301,8 @@ class OdooXMLRPCClient:
             options = {'offset': offset, 'limit': limit}
             if fields:
                 options['fields'] = fields
+            if order:
+                options['order'] = order
                 
             records = self.models.execute_kw(
                 self.db, self.uid, self.password,
@@ -115,6 +315,52 @@ class OdooXMLRPCClient:
             logger.error(f"Error en search_read {model}: {e}")
             return []
     
+    def iter_search_read(self, model: str, domain: List = None, fields: List[str] = None,
+                         chunk_size: int = ODOO_ITER_CHUNK_SIZE, limit: int = None) -> Iterator[Dict]:
+        """
+        Recorre todos los registros que cumplen el dominio página a página, en orden de id
+        
+        Cada página se pide con id > último id leído en lugar de OFFSET, así que Odoo no
+        escanea las filas ya devueltas y la memoria usada no depende del total.
+        A diferencia de search_read, los errores se propagan: cortar el recorrido en
+        silencio dejaría el resultado incompleto.
+        
+        Args:
+            model: Modelo de Odoo
+            domain: Dominio de búsqueda
+            fields: Campos a leer (id siempre se incluye)
+            chunk_size: Registros por página
+            limit: Máximo de registros en total (None = todos)
+        """
+        domain = domain or []
+        last_id = 0
+        remaining = limit
+        
+        while remaining is None or remaining > 0:
+            page_size = chunk_size if remaining is None else min(chunk_size, remaining)
+            options = {'limit': page_size, 'order': 'id asc'}
+            if fields:
+                options['fields'] = fields
+            
+            try:
+                records = self.models.execute_kw(
+                    self.db, self.uid, self.password,
+                    model, 'search_read',
+                    [id_cursor_domain(domain, last_id)],
+                    options
+                )
+            except Exception as e:
+                logger.error(f"Error en iter_search_read {model} (id > {last_id}): {e}")
+                raise
+            
+            yield from records
+            
+            if len(records) < page_size:
+                return
+            last_id = records[-1]['id']
+            if remaining is not None:
+                remaining -= len(records)
+    
     def search_count(self, model: str, domain: List = None) -> int:
 
         if domain is None:
@@ -131,6 +377,58 @@ class OdooXMLRPCClient:
             logger.error(f"Error contando {model}: {e}")
             return 0
     
+    def read_group(self, model: str, domain: List = None, fields: List[str] = None,
+                   groupby: List[str] = None, offset: int = 0, limit: int = None,
+                   orderby: str = None, lazy: bool = True) -> List[Dict]:
+        """
+        Agrega registros en Odoo (GROUP BY en SQL): una fila por grupo en lugar de una por registro
+        
+        Args:
+            model: Modelo de Odoo
+            domain: Dominio de búsqueda
+            fields: Agregados, p. ej. ['quantity:sum', 'amount_total:sum']
+            groupby: Campos de agrupación, p. ej. ['location_id'] o ['date_order:month']
+            offset, limit: Paginación de los grupos
+            orderby: Orden de los grupos, p. ej. 'amount_total desc'
+            lazy: True agrupa solo por el primer campo de groupby; False por todos a la vez
+        """
+        try:
+            options = {'offset': offset, 'lazy': lazy}
+            if limit:
+                options['limit'] = limit
+            if orderby:
+                options['orderby'] = orderby
+            
+            return self.models.execute_kw(
+                self.db, self.uid, self.password,
+                model, 'read_group',
+                [domain or [], fields or [], groupby or []],
+                options
+            )
+        except Exception as e:
+            logger.error(f"Error en read_group {model}: {e}")
+            return []
+    
+    def get_stock_by_location(self, product_id: int = None, location_id: int = None,
+                              internal_only: bool = True) -> List[Dict]:
+        """Existencias y reservas sumadas por ubicación (todas las filas de stock.quant, sin límite)"""
+        groups = self.read_group(
+            'stock.quant', stock_location_domain(product_id, location_id, internal_only),
+            ['quantity:sum', 'reserved_quantity:sum'], ['location_id'],
+            orderby='location_id', lazy=False
+        )
+        return clean_groups(groups)
+    
+    def get_sales_by_customer(self, date_from: str = None, date_to: str = None,
+                              limit: int = None) -> List[Dict]:
+        """Importe total y número de ventas confirmadas por cliente, de mayor a menor"""
+        groups = self.read_group(
+            'sale.order', sales_domain(date_from, date_to),
+            ['amount_total:sum'], ['partner_id'],
+            limit=limit, orderby='amount_total desc', lazy=False
+        )
+        return clean_groups(groups)
+    
     def get_products(self, query: str = None, limit: int = 50) -> List[Dict]:
         """
         Obtiene productos del inventario
@@ -142,57 +440,32 @@ class OdooXMLRPCClient:
         Returns:
             Lista de productos con sus datos
         """
-        domain = []
-        
-        if query:
-            # Buscar en nombre, referencia interna, código de barras o categoría
-            domain = [
-                '|', '|', '|',
-                ['name', 'ilike', query],
-                ['default_code', 'ilike', query],
-                ['barcode', 'ilike', query],
-                ['categ_id.name', 'ilike', query]
-            ]
-        
-        fields = [
-            'name',           # Nombre del producto
-            'default_code',   # Referencia interna
-            'barcode',        # Código de barras
-            'type',           # Tipo (product, consu, service)
-            'categ_id',       # Categoría
-            'list_price',     # Precio de venta
-            'standard_price', # Costo
-            'qty_available',  # Cantidad disponible
-            'uom_id',         # Unidad de medida
-            'active',         # Activo
-        ]
+        # Etapas de la más selectiva a la más cara; se para en cuanto hay suficientes
+        products = []
+        stage = None
+        for stage, domain in product_search_plan(query):
+            if products:
+                # Lo ya encontrado no se repite y no consume el límite de la etapa
+                domain = [['id', 'not in', [p['id'] for p in products]]] + domain
+            
+            products += self.search_read('product.product', domain, PRODUCT_LIST_FIELDS,
+                                         limit=limit - len(products))
+            
+            if len(products) >= limit or (products and stage in EXACT_PRODUCT_STAGES):
+                break
         
-        products = self.search_read('product.product', domain, fields, limit=limit)
-        logger.info(f"Búsqueda: '{query}' - {len(products)} productos encontrados")
+        logger.info(f"Búsqueda: '{query}' - {len(products)} productos encontrados (etapa: {stage})")
         
         return products
     
     def get_product_by_id(self, product_id: int) -> Dict:
 
-        fields = [
-            'name', 'default_code', 'barcode', 'type', 'categ_id',
-            'list_price', 'standard_price', 'qty_available', 'uom_id',
-            'description', 'description_sale', 'active', 'company_id'
-        ]
-        
-        products = self.read('product.product', [product_id], fields)
+        products = self.read('product.product', [product_id], PRODUCT_DETAIL_FIELDS)
         return products[0] if products else {}
     
     def get_stock_quants(self, product_id: int = None, location_id: int = None) -> List[Dict]:
 
-        domain = []
-        
-        if product_id:
-            domain.append(['product_id', '=', product_id])
-        if location_id:
-            domain.append(['location_id', '=', location_id])
-            
-        fields = ['product_id', 'location_id', 'quantity', 'reserved_quantity', 'lot_id']
+        domain = stock_quant_domain(product_id, location_id)
         
-        quants = self.search_read('stock.quant', domain, fields, limit=100)
+        quants = self.search_read('stock.quant', domain, STOCK_QUANT_FIELDS, limit=100)
         return quants
@@ -8,6 +8,7 @@ from pydantic import BaseModel, Field
 from langchain_core.tools import BaseTool
 
 from .odoo_xmlrpc_client import OdooXMLRPCClient
+from .product_renderer import render_products, render_product_detail, PRODUCT_RENDER_COMPACT
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +17,7 @@ class SearchProductsInput(BaseModel):
     """Input para búsqueda de productos"""
     query: Optional[str] = Field(default=None, description="Término de búsqueda para productos (nombre, referencia, código de barras, o categoría)")
     limit: int = Field(default=50, description="Límite de resultados")
+    compact: bool = Field(default=PRODUCT_RENDER_COMPACT, description="Una línea por producto (útil para listados largos)")
 
 
 class GetProductByIdInput(BaseModel):
@@ -37,7 +39,7 @@ class SearchProductsTool(BaseTool):
     
     odoo_client: OdooXMLRPCClient = Field(exclude=True)
     
-    def _run(self, query: Optional[str] = None, limit: int = 10) -> str:
+    def _run(self, query: Optional[str] = None, limit: int = 10, compact: bool = PRODUCT_RENDER_COMPACT) -> str:
         """Ejecuta la búsqueda de productos"""
         try:
             products = self.odoo_client.get_products(query, limit)
@@ -45,35 +47,7 @@ class SearchProductsTool(BaseTool):
             if not products:
                 return f"No se encontraron productos{' con el término: ' + query if query else ''}."
             
-            # Formatear resultados con más detalle para diferenciar productos
-            result = f"Se encontraron {len(products)} producto(s):\n\n"
-            
-            for idx, product in enumerate(products, 1):
-                result += f"══════════════════════════════════════\n"
-                result += f"#{idx} - {product.get('name')} (ID: {product.get('id')})\n"
-                result += f"══════════════════════════════════════\n"
-                
-                if product.get('default_code'):
-                    result += f"📋 Referencia interna: {product.get('default_code')}\n"
-                if product.get('barcode'):
-                    result += f"🔢 Código de barras: {product.get('barcode')}\n"
-                    
-                result += f"💰 Precio de venta: ${product.get('list_price', 0):.2f}\n"
-                result += f"💵 Costo: ${product.get('standard_price', 0):.2f}\n"
-                result += f"📦 Stock disponible: {product.get('qty_available', 0)}\n"
-                
-                if product.get('categ_id'):
-                    result += f"🏷️  Categoría: {product['categ_id'][1]}\n"
-                if product.get('uom_id'):
-                    result += f"📏 Unidad: {product['uom_id'][1]}\n"
-                    
-                result += "\n"
-            
-            # Si hay múltiples productos con el mismo nombre, avisar al usuario
-            if len(products) > 1:
-                result += "ℹ️  Se encontraron múltiples productos. Verifica la referencia interna para identificar el correcto.\n"
-            
-            return result
+            return render_products(products, compact)
             
         except Exception as e:
             logger.error(f"Error buscando productos: {e}")
@@ -97,40 +71,89 @@ class GetProductByIdTool(BaseTool):
             if not product:
                 return f"No se encontró el producto con ID {product_id}."
             
-            # Formatear resultado
-            result = f"📦 PRODUCTO: {product.get('name')} (ID: {product.get('id')})\n\n"
+            return render_product_detail(product)
+            
+        except Exception as e:
+            logger.error(f"Error obteniendo producto {product_id}: {e}")
+            return f"Error al obtener información del producto: {str(e)}"
+
+
+class StockByLocationInput(BaseModel):
+    """Input para stock por ubicación"""
+    product_id: Optional[int] = Field(default=None, description="ID del producto (opcional, si no se indica suma todos)")
+    location_id: Optional[int] = Field(default=None, description="ID de la ubicación (opcional)")
+
+
+class SalesByCustomerInput(BaseModel):
+    """Input para ventas por cliente"""
+    date_from: Optional[str] = Field(default=None, description="Fecha inicial YYYY-MM-DD (opcional)")
+    date_to: Optional[str] = Field(default=None, description="Fecha final YYYY-MM-DD (opcional)")
+    limit: int = Field(default=20, description="Número máximo de clientes")
+
+
+class StockByLocationTool(BaseTool):
+    """Herramienta para obtener el stock agregado por ubicación"""
+    name: str = "odoo_stock_by_location"
+    description: str = """Obtiene el stock total por ubicación interna del almacén (cantidad y reservado).
+    La suma se calcula en Odoo sobre todos los registros, sin límite de filas.
+    Úsala para preguntas como "¿cuánto stock hay en cada ubicación?" o "¿dónde está el producto X?"."""
+    args_schema: Type[BaseModel] = StockByLocationInput
+    
+    odoo_client: OdooXMLRPCClient = Field(exclude=True)
+    
+    def _run(self, product_id: Optional[int] = None, location_id: Optional[int] = None) -> str:
+        """Obtiene el stock por ubicación"""
+        try:
+            groups = self.odoo_client.get_stock_by_location(product_id, location_id)
             
-            result += "INFORMACIÓN BÁSICA:\n"
-            if product.get('default_code'):
-                result += f"  • Referencia: {product.get('default_code')}\n"
-            if product.get('barcode'):
-                result += f"  • Código de barras: {product.get('barcode')}\n"
-            result += f"  • Tipo: {product.get('type')}\n"
-            result += f"  • Activo: {'Sí' if product.get('active') else 'No'}\n"
+            if not groups:
+                return "No hay stock en ubicaciones internas para esos filtros."
             
-            if product.get('categ_id'):
-                result += f"  • Categoría: {product['categ_id'][1]}\n"
+            total = sum(group.get('quantity') or 0 for group in groups)
+            result = f"Stock en {len(groups)} ubicación(es) (total: {total:g}):\n\n"
+            for group in groups:
+                location = group['location_id'][1] if group.get('location_id') else 'Sin ubicación'
+                result += (f"📍 {location}: {group.get('quantity') or 0:g} "
+                           f"(reservado: {group.get('reserved_quantity') or 0:g}, "
+                           f"{group.get('__count', 0)} registro(s))\n")
             
-            result += "\nPRECIOS:\n"
-            result += f"  • Precio de venta: ${product.get('list_price', 0):.2f}\n"
-            result += f"  • Costo: ${product.get('standard_price', 0):.2f}\n"
+            return result
             
-            result += "\nINVENTARIO:\n"
-            result += f"  • Cantidad disponible: {product.get('qty_available', 0)}\n"
-            if product.get('uom_id'):
-                result += f"  • Unidad de medida: {product['uom_id'][1]}\n"
+        except Exception as e:
+            logger.error(f"Error obteniendo stock por ubicación: {e}")
+            return f"Error al obtener el stock por ubicación: {str(e)}"
+
+
+class SalesByCustomerTool(BaseTool):
+    """Herramienta para obtener las ventas agregadas por cliente"""
+    name: str = "odoo_sales_by_customer"
+    description: str = """Obtiene el importe total y el número de pedidos de venta confirmados por cliente,
+    ordenados de mayor a menor. Acepta un rango de fechas opcional (YYYY-MM-DD).
+    Úsala para preguntas como "ventas por cliente este mes" o "mejores clientes del año"."""
+    args_schema: Type[BaseModel] = SalesByCustomerInput
+    
+    odoo_client: OdooXMLRPCClient = Field(exclude=True)
+    
+    def _run(self, date_from: Optional[str] = None, date_to: Optional[str] = None, limit: int = 20) -> str:
+        """Obtiene las ventas por cliente"""
+        try:
+            groups = self.odoo_client.get_sales_by_customer(date_from, date_to, limit)
             
-            if product.get('description'):
-                result += f"\nDESCRIPCIÓN:\n{product.get('description')}\n"
+            if not groups:
+                return "No hay ventas confirmadas en ese periodo."
             
-            if product.get('description_sale'):
-                result += f"\nDESCRIPCIÓN DE VENTA:\n{product.get('description_sale')}\n"
+            period = f" del {date_from or '...'} al {date_to or '...'}" if (date_from or date_to) else ""
+            result = f"Ventas por cliente{period} ({len(groups)} cliente(s)):\n\n"
+            for idx, group in enumerate(groups, 1):
+                customer = group['partner_id'][1] if group.get('partner_id') else 'Sin cliente'
+                result += (f"#{idx} {customer}: ${group.get('amount_total') or 0:,.2f} "
+                           f"en {group.get('__count', 0)} pedido(s)\n")
             
             return result
             
         except Exception as e:
-            logger.error(f"Error obteniendo producto {product_id}: {e}")
-            return f"Error al obtener información del producto: {str(e)}"
+            logger.error(f"Error obteniendo ventas por cliente: {e}")
+            return f"Error al obtener las ventas por cliente: {str(e)}"
 
 
 def create_odoo_xmlrpc_tools(url: str, db: str, username: str, password: str, auto_connect: bool = True):
@@ -156,6 +179,8 @@ def create_odoo_xmlrpc_tools(url: str, db: str, username: str, password: str, au
     tools = [
         SearchProductsTool(odoo_client=client),
         GetProductByIdTool(odoo_client=client),
+        StockByLocationTool(odoo_client=client),
+        SalesByCustomerTool(odoo_client=client),
     ]
     
     return client, tools
@@ -0,0 +1,177 @@
+"""
+Índice local de productos de Odoo (product.product) para búsquedas cortas sin ir a Odoo
+"""
+
+import heapq
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Campos de product.product que se guardan en el índice
+PRODUCT_INDEX_FIELDS = [
+    'name',
+    'default_code',
+    'barcode',
+    'categ_id',
+    'list_price',
+    'standard_price',
+    'qty_available',
+]
+
+
+def _normalize(text: Any) -> str:
+    """Normaliza texto para comparaciones sin distinguir mayúsculas"""
+    return str(text).casefold() if text else ""
+
+
+def _trigrams(text: str) -> Set[str]:
+    """Trigramas de un texto ya normalizado"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ProductIndex:
+    """
+    Índice en memoria de productos con:
+    - mapa hash por referencia interna (default_code)
+    - mapa hash por código de barras
+    - índice de trigramas sobre el nombre (equivalente a un ilike '%texto%')
+    """
+
+    def __init__(self):
+        self._records: Dict[int, Dict[str, Any]] = {}
+        self._names: Dict[int, str] = {}
+        self._by_code: Dict[str, Set[int]] = {}
+        self._by_barcode: Dict[str, Set[int]] = {}
+        self._trigrams: Dict[str, Set[int]] = {}
+        self.loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, product_id: int) -> bool:
+        return product_id in self._records
+
+    def load(self, records: Iterable[Dict[str, Any]]):
+        """Reemplaza el contenido del índice"""
+        self._records.clear()
+        self._names.clear()
+        self._by_code.clear()
+        self._by_barcode.clear()
+        self._trigrams.clear()
+        for record in records:
+            self.upsert(record)
+        self.loaded = True
+        logger.info(f"Índice de productos cargado: {len(self._records)} productos")
+
+    def upsert(self, record: Dict[str, Any]):
+        """Inserta o actualiza un producto"""
+        product_id = record['id']
+        if product_id in self._records:
+            self.remove(product_id)
+
+        self._records[product_id] = record
+
+        if record.get('default_code'):
+            self._by_code.setdefault(record['default_code'], set()).add(product_id)
+        if record.get('barcode'):
+            self._by_barcode.setdefault(record['barcode'], set()).add(product_id)
+
+        name = _normalize(record.get('name'))
+        self._names[product_id] = name
+        for trigram in _trigrams(name):
+            self._trigrams.setdefault(trigram, set()).add(product_id)
+
+    def remove(self, product_id: int):
+        """Elimina un producto del índice"""
+        record = self._records.pop(product_id, None)
+        if record is None:
+            return
+
+        for mapping, key in ((self._by_code, record.get('default_code')),
+                             (self._by_barcode, record.get('barcode'))):
+            if key and key in mapping:
+                mapping[key].discard(product_id)
+                if not mapping[key]:
+                    del mapping[key]
+
+        name = self._names.pop(product_id, "")
+        for trigram in _trigrams(name):
+            postings = self._trigrams.get(trigram)
+            if postings is not None:
+                postings.discard(product_id)
+                if not postings:
+                    del self._trigrams[trigram]
+
+    def get(self, product_id: int) -> Optional[Dict[str, Any]]:
+        """Obtiene un producto por ID"""
+        return self._records.get(product_id)
+
+    def _sorted(self, ids: Iterable[int], limit: int) -> List[Dict[str, Any]]:
+        """Ordena como Odoo (default_code, name, id) y aplica el límite"""
+        return heapq.nsmallest(
+            limit,
+            (self._records[i] for i in ids),
+            key=lambda r: (not r.get('default_code'), r.get('default_code') or "",
+                           self._names.get(r['id'], ""), r['id'])
+        )
+
+    def get_by_code(self, code: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Busca por referencia interna exacta"""
+        return self._sorted(self._by_code.get(code, ()), limit)
+
+    def get_by_barcode(self, barcode: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Busca por código de barras exacto"""
+        return self._sorted(self._by_barcode.get(barcode, ()), limit)
+
+    def search_name(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Busca productos cuyo nombre contiene el texto (como ilike)"""
+        needle = _normalize(query.strip())
+        if not needle:
+            return []
+
+        if len(needle) < 3:
+            candidates = self._names.keys()
+        else:
+            # Intersección de las listas de trigramas, empezando por la más corta
+            postings = []
+            for trigram in _trigrams(needle):
+                ids = self._trigrams.get(trigram)
+                if not ids:
+                    return []
+                postings.append(ids)
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for ids in postings[1:]:
+                candidates &= ids
+                if not candidates:
+                    return []
+
+        matches = [i for i in candidates if needle in self._names[i]]
+        return self._sorted(matches, limit)
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Búsqueda combinada: referencia exacta, código de barras exacto y nombre"""
+        query = query.strip()
+        results = (
+            self.get_by_code(query, limit)
+            or self.get_by_code(query.upper(), limit)
+            or self.get_by_barcode(query, limit)
+            or self.search_name(query, limit)
+        )
+        if results:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas del índice"""
+        return {
+            "products": len(self._records),
+            "trigrams": len(self._trigrams),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
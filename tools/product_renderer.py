@@ -0,0 +1,115 @@
+"""
+Formateo de productos para las herramientas XML-RPC con tamaño acotado
+"""
+
+import logging
+import os
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Formato compacto por defecto (una línea por producto)
+PRODUCT_RENDER_COMPACT = os.getenv("PRODUCT_RENDER_COMPACT", "false").lower() == "true"
+# Tamaño máximo en caracteres de la respuesta de una herramienta de productos
+PRODUCT_RENDER_MAX_CHARS = int(os.getenv("PRODUCT_RENDER_MAX_CHARS", "8000"))
+
+_SEPARATOR = "══════════════════════════════════════"
+_MULTIPLE_NOTICE = "ℹ️  Se encontraron múltiples productos. Verifica la referencia interna para identificar el correcto.\n"
+
+
+def _product_block(idx: int, product: Dict) -> str:
+    """Bloque detallado de un producto (mismo texto que el formato original), en un solo f-string"""
+    get = product.get
+    code = f"📋 Referencia interna: {get('default_code')}\n" if get('default_code') else ""
+    barcode = f"🔢 Código de barras: {get('barcode')}\n" if get('barcode') else ""
+    category = f"🏷️  Categoría: {product['categ_id'][1]}\n" if get('categ_id') else ""
+    uom = f"📏 Unidad: {product['uom_id'][1]}\n" if get('uom_id') else ""
+    return (
+        f"{_SEPARATOR}\n#{idx} - {get('name')} (ID: {get('id')})\n{_SEPARATOR}\n{code}{barcode}"
+        f"💰 Precio de venta: ${get('list_price', 0):.2f}\n💵 Costo: ${get('standard_price', 0):.2f}\n"
+        f"📦 Stock disponible: {get('qty_available', 0)}\n{category}{uom}\n"
+    )
+
+
+def _product_line(idx: int, product: Dict) -> str:
+    """Línea compacta de un producto"""
+    get = product.get
+    code = f" | {get('default_code')}" if get('default_code') else ""
+    category = f" | {product['categ_id'][1]}" if get('categ_id') else ""
+    return (f"#{idx} {get('name')} (ID: {get('id')}) | ${get('list_price', 0):.2f} | "
+            f"stock {get('qty_available', 0)}{code}{category}\n")
+
+
+def render_products(products: List[Dict], compact: bool = PRODUCT_RENDER_COMPACT,
+                    max_chars: int = PRODUCT_RENDER_MAX_CHARS) -> str:
+    """
+    Lista de productos en una sola pasada (un bloque por producto y un único join), acotada a max_chars
+
+    Args:
+        products: Productos con los campos de PRODUCT_LIST_FIELDS
+        compact: Una línea por producto en lugar del bloque detallado
+        max_chars: Tamaño máximo (0 = sin límite); el resto se resume como "N más"
+
+    Returns:
+        Texto para el LLM
+    """
+    render = _product_line if compact else _product_block
+    if compact:
+        header = f"Se encontraron {len(products)} producto(s) (precio | stock | referencia | categoría):\n"
+    else:
+        header = f"Se encontraron {len(products)} producto(s):\n\n"
+    footer = _MULTIPLE_NOTICE if len(products) > 1 else ""
+
+    # Se reserva sitio para la cabecera, el aviso final y la línea de omitidos
+    budget = max_chars - len(header) - len(footer) - 64 if max_chars > 0 else None
+    parts = [header]
+    used = 0
+    for idx, product in enumerate(products, 1):
+        block = render(idx, product)
+        used += len(block)
+        if budget is not None and used > budget and idx > 1:
+            parts.append(f"… y {len(products) - idx + 1} producto(s) más. Refina la búsqueda para verlos.\n")
+            break
+        parts.append(block)
+    parts.append(footer)
+
+    return "".join(parts)
+
+
+def render_product_detail(product: Dict, max_chars: int = PRODUCT_RENDER_MAX_CHARS) -> str:
+    """
+    Ficha de un producto; las descripciones se recortan para no pasar de max_chars
+    """
+    parts = [f"📦 PRODUCTO: {product.get('name')} (ID: {product.get('id')})\n", "INFORMACIÓN BÁSICA:"]
+    if product.get('default_code'):
+        parts.append(f"  • Referencia: {product['default_code']}")
+    if product.get('barcode'):
+        parts.append(f"  • Código de barras: {product['barcode']}")
+    parts.append(f"  • Tipo: {product.get('type')}")
+    parts.append(f"  • Activo: {'Sí' if product.get('active') else 'No'}")
+    if product.get('categ_id'):
+        parts.append(f"  • Categoría: {product['categ_id'][1]}")
+
+    parts.append("\nPRECIOS:")
+    parts.append(f"  • Precio de venta: ${product.get('list_price', 0):.2f}")
+    parts.append(f"  • Costo: ${product.get('standard_price', 0):.2f}")
+
+    parts.append("\nINVENTARIO:")
+    parts.append(f"  • Cantidad disponible: {product.get('qty_available', 0)}")
+    if product.get('uom_id'):
+        parts.append(f"  • Unidad de medida: {product['uom_id'][1]}")
+    parts.append("")
+
+    result = "\n".join(parts)
+    for field, title in (('description', 'DESCRIPCIÓN'), ('description_sale', 'DESCRIPCIÓN DE VENTA')):
+        text = product.get(field)
+        if not text:
+            continue
+        section = f"\n{title}:\n{text}\n"
+        remaining = max_chars - len(result) if max_chars > 0 else len(section)
+        if len(section) > remaining:
+            omitted = len(section) - max(remaining, 0)
+            section = f"{section[:max(remaining, 0)]}… [{omitted} caracteres omitidos]\n"
+        result += section
+
+    return result
@@ -0,0 +1,165 @@
+"""
+Codificación compacta de resultados de herramientas para devolverlos al LLM
+"""
+
+import ast
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Presupuesto aproximado de tokens por resultado de herramienta (0 = sin límite)
+TOOL_RESULT_MAX_TOKENS = int(os.getenv("TOOL_RESULT_MAX_TOKENS", "2000"))
+# Estimación de caracteres por token (texto mixto español/datos)
+CHARS_PER_TOKEN = 4
+
+RECORD_LIST_KEYS = ("records", "result", "data")
+# Espacio reservado para la línea de filas omitidas
+TRUNCATION_MARKER_CHARS = 64
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _is_many2one(value) -> bool:
+    return (isinstance(value, (list, tuple)) and len(value) == 2
+            and isinstance(value[0], int) and isinstance(value[1], str))
+
+
+def encode_value(value) -> str:
+    """Valor de una celda: many2one como 'Nombre (id)', False/None vacío, sin tabuladores ni saltos"""
+    if value is None or value is False:
+        return ""
+    if value is True:
+        return "sí"
+    if _is_many2one(value):
+        return f"{value[1]} ({value[0]})"
+    if isinstance(value, float):
+        text = repr(value)
+        return text[:-2] if text.endswith(".0") else text
+    if isinstance(value, (list, tuple)):
+        return ",".join(encode_value(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+    return " ".join(str(value).split())
+
+
+def encode_records(records: List[Dict[str, Any]], max_tokens: int = TOOL_RESULT_MAX_TOKENS) -> str:
+    """
+    Lista de registros como tabla separada por tabuladores con la cabecera una sola vez
+
+    Las columnas son la unión de las claves en orden de aparición. Si se supera el
+    presupuesto de tokens se cortan filas y se indica cuántas faltan.
+    """
+    columns: List[str] = []
+    seen = set()
+    for record in records:
+        for key in record:
+            if key not in seen:
+                seen.add(key)
+                columns.append(key)
+
+    title = f"{len(records)} registros"
+    header = "\t".join(columns)
+    lines = [title, header]
+    budget = max_tokens * CHARS_PER_TOKEN - TRUNCATION_MARKER_CHARS if max_tokens > 0 else None
+    used = len(title) + len(header) + 1
+
+    for index, record in enumerate(records):
+        line = "\t".join(encode_value(record.get(column)) for column in columns)
+        used += len(line) + 1
+        if budget is not None and used > budget and index > 0:
+            lines.append(f"… {len(records) - index} registros más omitidos (límite de tokens)")
+            break
+        lines.append(line)
+
+    return "\n".join(lines)
+
+
+def encode_record(record: Dict[str, Any]) -> str:
+    """Un registro suelto como líneas 'campo: valor' (omitiendo los vacíos)"""
+    return "\n".join(
+        f"{key}: {encode_value(value)}" for key, value in record.items()
+        # Por identidad: 0 y 0.0 son datos (stock o precio a cero), no valores vacíos
+        if value is not None and value is not False and value != "" and value != []
+    )
+
+
+def truncate_text(text: str, max_tokens: int = TOOL_RESULT_MAX_TOKENS) -> str:
+    """Corta un texto que supera el presupuesto de tokens y marca lo omitido"""
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max_tokens * CHARS_PER_TOKEN
+    return f"{text[:limit]}\n… [{len(text) - limit} caracteres omitidos (límite de tokens)]"
+
+
+def _result_text(result) -> Optional[str]:
+    """Texto de una respuesta MCP (CallToolResult del SDK o JSON de la API HTTP)"""
+    if isinstance(result, dict) and isinstance(result.get("content"), list):
+        content = result["content"]
+        return content[0].get("text") if content and isinstance(content[0], dict) else None
+    content = getattr(result, "content", None)
+    if isinstance(content, list) and content:
+        return getattr(content[0], "text", None)
+    return None
+
+
+def _parse(text: str):
+    """Interpreta un texto como JSON o repr de Python (None si no es ninguno)"""
+    stripped = text.strip()
+    if not stripped or stripped[0] not in "[{":
+        return None
+    try:
+        return json.loads(stripped)
+    except ValueError:
+        try:
+            return ast.literal_eval(stripped)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            return None
+
+
+def _encode_data(data, max_tokens: int) -> Optional[str]:
+    if isinstance(data, list) and data and all(isinstance(item, dict) for item in data):
+        return encode_records(data, max_tokens)
+    if isinstance(data, list) and not data:
+        return "0 registros"
+
+    if isinstance(data, dict):
+        for key in RECORD_LIST_KEYS:
+            records = data.get(key)
+            if isinstance(records, list) and all(isinstance(item, dict) for item in records):
+                # Metadatos (total, offset...) en una línea y los registros en tabla
+                extra = ", ".join(
+                    f"{k}: {encode_value(v)}" for k, v in data.items()
+                    if k != key and not isinstance(v, (list, dict))
+                )
+                remaining = max(1, max_tokens - estimate_tokens(extra)) if max_tokens > 0 else 0
+                table = encode_records(records, remaining) if records else "0 registros"
+                return f"{extra}\n{table}" if extra else table
+        if all(not isinstance(v, dict) or _is_many2one(v) for v in data.values()):
+            return encode_record(data)
+    return None
+
+
+def encode_result(result, max_tokens: int = TOOL_RESULT_MAX_TOKENS) -> str:
+    """
+    Resultado de una herramienta en el formato más compacto para el prompt
+
+    Acepta respuestas MCP, texto (JSON o repr de Python) y listas o dicts ya
+    decodificados. Las listas de registros se convierten en tabla; lo demás se
+    devuelve como texto recortado al presupuesto de tokens.
+    """
+    if not isinstance(result, (str, list, dict)) or (isinstance(result, dict) and isinstance(result.get("content"), list)):
+        text = _result_text(result)
+        result = text if text is not None else str(result)
+
+    data = _parse(result) if isinstance(result, str) else result
+    encoded = _encode_data(data, max_tokens) if data is not None else None
+    if encoded is None:
+        encoded = result if isinstance(result, str) else json.dumps(
+            result, ensure_ascii=False, separators=(",", ":"), default=str
+        )
+    return truncate_text(encoded, max_tokens)